@@ -0,0 +1,142 @@
+"""
+Agregados de la cartera: clientes, deuda total y mora por nivel de tono, por
+producto y por tramo de días de mora.
+
+Los backends los mantienen al día en cada escritura confirmada (se resta la
+fila anterior y se suma la nueva), así que consultarlos cuesta lo mismo con
+cien clientes que con un millón: no se recorre la cartera.
+"""
+import threading
+
+from tonos import TONOS, clasificar_tono, clasificar_tono_vectorizado
+
+DIMENSIONES = ("tono", "producto", "tramo_mora")
+
+# (límite superior en días, etiqueta); los cortes coinciden con los de los tonos
+TRAMOS_MORA = ((14, "0-14"), (30, "15-30"), (45, "31-45"), (90, "46-90"), (None, "91+"))
+
+
+def tramo_mora(dias_mora: int) -> str:
+    for limite, etiqueta in TRAMOS_MORA:
+        if limite is None or dias_mora <= limite:
+            return etiqueta
+
+
+def clave_producto(producto) -> str:
+    """Los productos se agrupan sin distinguir mayúsculas ni espacios extra."""
+    return " ".join(str(producto).lower().split())
+
+
+def _promedios(clientes, deuda, mora) -> dict:
+    return {
+        "clientes": clientes,
+        "deuda_total": round(deuda, 2),
+        "deuda_promedio": round(deuda / clientes, 2) if clientes else 0.0,
+        "mora_promedio": round(mora / clientes, 1) if clientes else 0.0,
+    }
+
+
+class AgregadosCartera:
+    """
+    Contadores por grupo ([clientes, deuda, días de mora]) de cada dimensión.
+    `cambiar(anterior, nuevo)` aplica una escritura; `cargar(df)` los
+    reconstruye desde cero. Seguro entre hilos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vaciar()
+
+    def _vaciar(self):
+        self._total = [0, 0.0, 0]
+        self._grupos = {dimension: {} for dimension in DIMENSIONES}
+
+    def _sumar(self, fila, signo):
+        deuda, mora = float(fila['deuda']), int(fila['dias_mora'])
+        claves = (
+            ("tono", clasificar_tono(deuda, mora)),
+            ("producto", clave_producto(fila['producto'])),
+            ("tramo_mora", tramo_mora(mora)),
+        )
+        for grupo in [self._total] + [self._grupos[d].setdefault(c, [0, 0.0, 0]) for d, c in claves]:
+            grupo[0] += signo
+            grupo[1] += signo * deuda
+            grupo[2] += signo * mora
+        for dimension, clave in claves:
+            if self._grupos[dimension][clave][0] == 0:
+                # Sin clientes no queda deuda: se descarta el residuo de redondeo
+                del self._grupos[dimension][clave]
+        if self._total[0] == 0:
+            self._total = [0, 0.0, 0]
+
+    def cambiar(self, anterior: dict = None, nuevo: dict = None):
+        """Refleja una escritura: alta (sin anterior), baja (sin nuevo) o modificación."""
+        with self._lock:
+            if anterior is not None:
+                self._sumar(anterior, -1)
+            if nuevo is not None:
+                self._sumar(nuevo, 1)
+
+    def cargar(self, df):
+        """
+        Reconstruye todo desde un DataFrame con deuda, dias_mora y producto
+        (producto puede ser categórico, como en CarteraCompacta.a_dataframe).
+        """
+        import numpy as np
+        import pandas as pd
+
+        deuda = df['deuda'].astype(float)
+        mora = df['dias_mora'].astype(int)
+        producto = df['producto']
+        if isinstance(producto.dtype, pd.CategoricalDtype):
+            # Se normalizan las categorías, no cada fila; el código -1 (sin producto) toma el último
+            claves = [clave_producto(c) for c in producto.cat.categories] + ["nan"]
+            producto = pd.Series(np.array(claves, dtype=object)[producto.cat.codes.to_numpy()], index=df.index)
+        else:
+            producto = producto.astype(str).str.lower().str.split().str.join(" ")
+        columnas = pd.DataFrame({
+            "tono": clasificar_tono_vectorizado(deuda, mora),
+            "producto": producto,
+            "tramo_mora": pd.cut(
+                mora,
+                bins=[-float("inf")] + [l for l, _ in TRAMOS_MORA[:-1]] + [float("inf")],
+                labels=[e for _, e in TRAMOS_MORA],
+            ).astype(str),
+            "deuda": deuda,
+            "dias_mora": mora,
+        })
+        grupos = {}
+        for dimension in DIMENSIONES:
+            suma = columnas.groupby(dimension)[["deuda", "dias_mora"]].agg(["count", "sum"])
+            grupos[dimension] = {
+                clave: [int(fila[("deuda", "count")]), float(fila[("deuda", "sum")]), int(fila[("dias_mora", "sum")])]
+                for clave, fila in suma.iterrows()
+            }
+        with self._lock:
+            self._total = [len(columnas), float(deuda.sum()), int(mora.sum())]
+            self._grupos = grupos
+
+    def resumen(self, por: str = None) -> dict:
+        """
+        {"clientes", "deuda_total", "deuda_promedio", "mora_promedio",
+        "por": {dimension: {grupo: {mismos campos}}}}. Con `por` solo esa dimensión.
+        """
+        if por is not None and por not in DIMENSIONES:
+            raise ValueError(f"No se puede agrupar por '{por}'. Opciones: {', '.join(DIMENSIONES)}")
+        with self._lock:
+            resultado = _promedios(*self._total)
+            resultado["por"] = {
+                dimension: {clave: _promedios(*g) for clave, g in self._grupos[dimension].items()}
+                for dimension in ([por] if por else DIMENSIONES)
+            }
+        orden = {
+            "tono": {t: i for i, t in enumerate(TONOS)}.get,
+            "tramo_mora": {e: i for i, (_, e) in enumerate(TRAMOS_MORA)}.get,
+        }
+        for dimension, grupos in resultado["por"].items():
+            if dimension in orden:
+                clave = lambda par, o=orden[dimension]: o(par[0])
+            else:
+                clave = lambda par: -par[1]["deuda_total"]
+            resultado["por"][dimension] = dict(sorted(grupos.items(), key=clave))
+        return resultado
@@ -0,0 +1,383 @@
+"""
+Benchmarks reproducibles y sin red.
+
+Mide las herramientas sobre carteras de distinto tamaño, el costo propio del
+grafo (router, nodos, checkpointer y el envoltorio resiliente) con un modelo
+falso que responde al instante, la construcción de los controles de la UI
+con tablas grandes y el tiempo de import en frío de cada punto de entrada.
+El resultado se guarda en JSON para comparar versiones.
+
+Uso:
+    python src/benchmark.py --filas 1000 10000 100000 1000000 --salida benchmark.json
+    python src/benchmark.py --filas 1000 --comparar benchmark_anterior.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import flet as ft
+import pandas as pd
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+import grafo
+import herramientas
+import ui
+from cache_speech import CacheSpeech, set_cache
+from cartera_compacta import CarteraCompacta
+from checkpointer import SQLiteSaverAcotado
+from cliente_store import CSVClienteStore, SQLiteClienteStore, set_store
+from envejecimiento import envejecer_cartera
+from plantillas import MotorPlantillas
+from resiliencia import ModeloResiliente
+
+FILAS_POR_DEFECTO = [1_000, 10_000, 100_000, 1_000_000]
+FILAS_TABLA_UI = [20, 100, 1_000]
+PRODUCTOS = ["Tarjeta", "Préstamo", "Hipoteca", "Crédito auto"]
+TAMANO_CARGA = 50_000
+# Una métrica empeoró si su mediana supera la anterior en este factor y,
+# para no reportar ruido en mediciones de microsegundos, en al menos MARGEN_MS
+UMBRAL_REGRESION = 1.25
+MARGEN_MS = 0.5
+
+# ==========================================
+# ⏱️ MEDICIÓN
+# ==========================================
+
+def medir(funcion, repeticiones: int = 20, calentamiento: int = 1) -> dict:
+    """Ejecuta `funcion(i)` varias veces y resume las duraciones en milisegundos."""
+    for i in range(calentamiento):
+        funcion(-1 - i)
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return resumir(tiempos)
+
+
+def resumir(tiempos) -> dict:
+    """Mediana, p95 y mínimo de una lista de duraciones en milisegundos."""
+    tiempos = sorted(tiempos)
+    return {
+        "n": len(tiempos),
+        "mediana_ms": round(statistics.median(tiempos), 4),
+        "p95_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 4),
+        "min_ms": round(tiempos[0], 4),
+    }
+
+
+def nombre_cliente(i: int) -> str:
+    return f"Cliente {i:07d}"
+
+
+def cartera_sintetica(filas: int, semilla: int = 7):
+    """Lotes de DataFrame con clientes reproducibles (misma semilla, mismos datos)."""
+    azar = random.Random(semilla)
+    for inicio in range(0, filas, TAMANO_CARGA):
+        rango = range(inicio, min(filas, inicio + TAMANO_CARGA))
+        yield pd.DataFrame({
+            "nombre": [nombre_cliente(i) for i in rango],
+            "deuda": [round(azar.uniform(50, 20_000), 2) for _ in rango],
+            "dias_mora": [azar.randint(0, 180) for _ in rango],
+            "producto": [azar.choice(PRODUCTOS) for _ in rango],
+        })
+
+
+def crear_store_bench(backend: str, directorio: str):
+    if backend == "csv":
+        return CSVClienteStore(os.path.join(directorio, "clientes.csv"))
+    return SQLiteClienteStore(os.path.join(directorio, "clientes.db"))
+
+# ==========================================
+# 🛠️ HERRAMIENTAS
+# ==========================================
+
+def bench_herramientas(filas: int, repeticiones: int, backend: str = "sqlite") -> dict:
+    """Tiempo de cada herramienta con `filas` clientes ya cargados."""
+    with tempfile.TemporaryDirectory() as directorio:
+        store = crear_store_bench(backend, directorio)
+        set_store(store)
+        set_cache(CacheSpeech(""))
+        try:
+            inicio = time.perf_counter()
+            for lote in cartera_sintetica(filas):
+                store.registrar_lote(lote)
+            resultado = {"carga_s": round(time.perf_counter() - inicio, 3)}
+            # Columnas tipadas frente al DataFrame de objetos (ver cartera_compacta.py)
+            resultado["memoria_mb"] = {
+                "dataframe": round(store.listar().memory_usage(deep=True).sum() / 1e6, 2),
+                "compacta": round(store.cartera().nbytes / 1e6, 2),
+            }
+            if backend == "sqlite":
+                resultado["cartera_recarga"] = medir(
+                    lambda i: CarteraCompacta.abrir(store.ruta_cartera), repeticiones
+                )
+
+            azar = random.Random(filas)
+            # Cada repetición toca un cliente distinto; la eliminación no repite nombres
+            existentes = azar.sample(range(filas), min(filas, 2 * (repeticiones + 1)))
+            a_actualizar, a_eliminar = existentes[0::2], existentes[1::2]
+
+            resultado["registrar_cliente"] = medir(lambda i: herramientas.registrar_cliente.invoke(
+                {"nombre": f"Nuevo {i}", "deuda": 100.0, "dias_mora": 5, "producto": "Tarjeta"}
+            ), repeticiones)
+            resultado["actualizar_deuda"] = medir(lambda i: herramientas.actualizar_deuda.invoke(
+                {"nombre": nombre_cliente(a_actualizar[i]), "nueva_deuda": 999.0}
+            ), repeticiones)
+            resultado["eliminar_cliente_pagado"] = medir(lambda i: herramientas.eliminar_cliente_pagado.invoke(
+                {"nombre": nombre_cliente(a_eliminar[i])}
+            ), repeticiones)
+            resultado["leer_base_datos"] = medir(
+                lambda i: herramientas.leer_base_datos.invoke({}), repeticiones
+            )
+            resultado["leer_base_datos_filtrado"] = medir(lambda i: herramientas.leer_base_datos.invoke(
+                {"mora_min": 60, "producto": "tarjeta", "ordenar_por": "deuda", "descendente": True}
+            ), repeticiones)
+            # Con acento: no coincide la clave exacta y resuelve el índice difuso
+            resultado["buscar_nombres"] = medir(lambda i: store.buscar_nombres(
+                nombre_cliente(a_actualizar[i]).replace("e", "é", 1)
+            ), repeticiones)
+            resultado["analizar_cartera"] = medir(
+                lambda i: herramientas.analizar_cartera.invoke({}), repeticiones
+            )
+            motor = MotorPlantillas()
+            resultado["speech_plantilla"] = medir(lambda i: motor.generar(
+                {"nombre": nombre_cliente(i), "deuda": 500.0, "dias_mora": 20, "producto": "Tarjeta"}
+            ), repeticiones)
+            # Al final porque cambia la cartera: cada corte es un día más, toda la mora avanza
+            resultado["envejecer_cartera"] = medir(
+                lambda i: envejecer_cartera(date.today() + timedelta(days=i + 1)), repeticiones
+            )
+            return resultado
+        finally:
+            set_store(None)
+            set_cache(None)
+            store.cerrar()
+
+# ==========================================
+# 🧠 GRAFO
+# ==========================================
+
+def _llamada_lectura():
+    return AIMessage(content="", tool_calls=[{
+        "name": "leer_base_datos", "args": {"mora_min": 30}, "id": f"call_{uuid.uuid4().hex[:8]}",
+    }])
+
+
+GUIONES = {
+    # El agente responde directo: una llamada al modelo
+    "respuesta_directa": ("¿qué puedes hacer?", lambda: [AIMessage(content="Puedo ayudarte con tu cartera.")]),
+    # El agente consulta la base y luego responde: dos llamadas al modelo
+    "con_herramienta": ("¿quiénes tienen más de 30 días de mora?", lambda: [
+        _llamada_lectura(), AIMessage(content="Estos son los clientes con más mora."),
+    ]),
+    # El router responde sin modelo; el guion solo evita bloquearse si no lo hiciera
+    "ruta_local": ("hola", lambda: [AIMessage(content="Hola.")]),
+}
+
+
+def bench_grafo(repeticiones: int, filas: int = 1_000) -> dict:
+    """
+    Ida y vuelta completa por el grafo con un modelo guionado instantáneo:
+    lo medido es el costo propio del grafo, no la latencia del proveedor.
+    """
+    resultado = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        store = crear_store_bench("sqlite", directorio)
+        for lote in cartera_sintetica(filas):
+            store.registrar_lote(lote)
+        set_store(store)
+        set_cache(CacheSpeech(""))
+        grafo.set_checkpointer(SQLiteSaverAcotado(":memory:"))
+        try:
+            for escenario, (texto, guion) in GUIONES.items():
+                respuestas = itertools.chain.from_iterable(guion() for _ in itertools.count())
+                grafo.set_modelo_agente(ModeloResiliente(GenericFakeChatModel(messages=respuestas)))
+
+                def ida_y_vuelta(i):
+                    # Hilo nuevo en cada repetición: el historial no crece entre mediciones
+                    grafo.get_app().invoke(
+                        {"messages": [HumanMessage(content=texto)]},
+                        {"configurable": {"thread_id": f"bench_{escenario}_{i}"}},
+                    )
+
+                resultado[escenario] = medir(ida_y_vuelta, repeticiones)
+            return resultado
+        finally:
+            grafo.set_modelo_agente(None)
+            grafo.set_checkpointer(None)
+            set_store(None)
+            set_cache(None)
+            store.cerrar()
+
+# ==========================================
+# 🎨 UI
+# ==========================================
+
+def _tabla_markdown(filas: int) -> str:
+    lote = next(cartera_sintetica(filas))
+    return "TABLA_DATOS | total={0}\n{1}".format(filas, lote.to_markdown(index=False))
+
+
+def _artifact(filas: int) -> dict:
+    lote = next(cartera_sintetica(filas))
+    return {
+        "consulta": {}, "resumen": {"total": filas * 10, "deuda_total": 0.0},
+        "columnas": list(lote.columns), "filas": lote.to_dict("split")["data"],
+        "offset": 0, "limite": filas,
+    }
+
+
+def bench_ui(repeticiones: int, filas_tabla=FILAS_TABLA_UI) -> dict:
+    """
+    Construcción de controles Flet sin abrir ventana. `mensaje` es la burbuja
+    más su alta en HistorialChat, igual que en main().
+    """
+    resultado = {}
+    for filas in filas_tabla:
+        md = _tabla_markdown(filas)
+        artifact = _artifact(filas)
+        resultado[f"render_table_{filas}"] = medir(lambda i: ui.render_table(md), repeticiones)
+        resultado[f"tabla_paginada_{filas}"] = medir(
+            lambda i: ui.TablaPaginada(artifact, paginar=None), repeticiones
+        )
+
+        historial = ui.HistorialChat(ft.ListView(), ui.crear_burbuja)
+
+        def mensaje(i):
+            fila = ui.crear_burbuja(md, "bot", 400)
+            historial.agregar(fila, (md, "bot"))
+
+        resultado[f"mensaje_{filas}"] = medir(mensaje, repeticiones)
+
+    # Chat largo: cada mensaje nuevo desplaza uno antiguo al archivo
+    historial = ui.HistorialChat(ft.ListView(), ui.crear_burbuja)
+    resultado["mensaje_texto_historial_lleno"] = medir(lambda i: historial.agregar(
+        ui.crear_burbuja(f"Respuesta {i} del bot", "bot", 400), (f"Respuesta {i}", "bot")
+    ), max(repeticiones, ui.MAX_BURBUJAS * 2))
+    return resultado
+
+# ==========================================
+# 🚀 ARRANQUE
+# ==========================================
+
+# Lo que cada uso importa antes de poder trabajar, medido en un intérprete nuevo
+ARRANQUES = {
+    "herramientas": "import herramientas",
+    "ui": "import ui",
+    "grafo": "import grafo; grafo.get_app()",
+}
+
+
+def bench_arranque(repeticiones: int = 5) -> dict:
+    """Tiempo de import en frío por caso de uso (sin contar el arranque de Python)."""
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    resultado = {}
+    with tempfile.TemporaryDirectory() as trabajo:
+        for nombre, codigo in ARRANQUES.items():
+            programa = (
+                f"import sys, time; sys.path.insert(0, {directorio!r}); t = time.perf_counter(); {codigo}; "
+                "print((time.perf_counter() - t) * 1000)"
+            )
+            resultado[nombre] = resumir([
+                float(subprocess.run([sys.executable, "-c", programa], capture_output=True, text=True,
+                                     cwd=trabajo, check=True).stdout.split()[-1])
+                for _ in range(repeticiones)
+            ])
+    return resultado
+
+# ==========================================
+# 📊 RESULTADOS
+# ==========================================
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def ejecutar_benchmark(filas=FILAS_POR_DEFECTO, repeticiones: int = 20, backend: str = "sqlite",
+                       filas_tabla=FILAS_TABLA_UI, repeticiones_arranque: int = 5) -> dict:
+    resultados = {
+        "meta": {
+            "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "backend": backend,
+            "repeticiones": repeticiones,
+        },
+        "herramientas": {},
+    }
+    for n in filas:
+        print(f"⏱️ herramientas con {n:,} filas...", file=sys.stderr)
+        resultados["herramientas"][str(n)] = bench_herramientas(n, repeticiones, backend)
+    print("⏱️ grafo...", file=sys.stderr)
+    resultados["grafo"] = bench_grafo(repeticiones)
+    print("⏱️ UI...", file=sys.stderr)
+    resultados["ui"] = bench_ui(repeticiones, filas_tabla)
+    print("⏱️ arranque en frío...", file=sys.stderr)
+    resultados["arranque"] = bench_arranque(repeticiones_arranque)
+    return resultados
+
+
+def _medianas(resultados: dict, prefijo: str = ""):
+    for clave, valor in resultados.items():
+        if clave == "meta" or not isinstance(valor, dict):
+            continue
+        if "mediana_ms" in valor:
+            yield f"{prefijo}{clave}", valor["mediana_ms"]
+        else:
+            yield from _medianas(valor, f"{prefijo}{clave}.")
+
+
+def comparar(actual: dict, anterior: dict, umbral: float = UMBRAL_REGRESION) -> list:
+    """Métricas cuya mediana empeoró más que `umbral` respecto del resultado anterior."""
+    previas = dict(_medianas(anterior))
+    return [
+        (metrica, previas[metrica], mediana)
+        for metrica, mediana in _medianas(actual)
+        if previas.get(metrica) and mediana > max(previas[metrica] * umbral, previas[metrica] + MARGEN_MS)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de COBRA-BOT sin red")
+    parser.add_argument("--filas", type=int, nargs="+", default=FILAS_POR_DEFECTO)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--backend", choices=["sqlite", "csv"], default="sqlite")
+    parser.add_argument("--salida", default="benchmark.json")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+
+    resultados = ejecutar_benchmark(args.filas, args.repeticiones, args.backend)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"✅ Resultados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(resultados, json.load(f))
+        for metrica, antes, ahora in regresiones:
+            print(f"⚠️ {metrica}: {antes:.3f} ms → {ahora:.3f} ms")
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Caché de speeches por perfil de cliente.
+
+La clave combina los campos normalizados del cliente (nombre, deuda, mora,
+producto), el tono y la versión del prompt: si cambia cualquiera de ellos el
+speech anterior deja de servir sin necesidad de invalidarlo. Hay dos niveles:
+un LRU en memoria y una tabla SQLite acotada en disco, ambos con TTL.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from cliente_store import normalizar_nombre
+from modelos import MODELO, TEMPERATURA
+from prompts import PROMPT_SPEECH
+from tonos import clasificar_tono
+
+CACHE_PATH = os.environ.get("COBRA_CACHE_SPEECH", "speeches_cache.db")
+MAX_MEMORIA = 256
+MAX_DISCO = int(os.environ.get("COBRA_CACHE_SPEECH_MAX", "5000"))
+TTL_S = float(os.environ.get("COBRA_CACHE_SPEECH_TTL_S", str(7 * 24 * 3600)))
+
+# Cambiar el prompt o el modelo invalida todo el caché
+VERSION_PROMPT = hashlib.sha1(f"{PROMPT_SPEECH}|{MODELO}|{TEMPERATURA}".encode("utf-8")).hexdigest()[:12]
+
+
+def clave_speech(cliente: dict, version: str = VERSION_PROMPT) -> str:
+    """Clave estable del perfil del cliente para un prompt dado."""
+    tono = clasificar_tono(cliente["deuda"], cliente["dias_mora"])
+    partes = [
+        normalizar_nombre(cliente["nombre"]),
+        f"{float(cliente['deuda']):.2f}",
+        str(int(cliente["dias_mora"])),
+        normalizar_nombre(cliente["producto"]),
+        tono,
+        version,
+    ]
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
+
+
+class CacheSpeech:
+    """LRU en memoria respaldado por SQLite (ruta vacía = solo memoria)."""
+
+    def __init__(self, ruta: str = CACHE_PATH, max_memoria: int = MAX_MEMORIA,
+                 max_disco: int = MAX_DISCO, ttl_s: float = TTL_S):
+        self.max_memoria = max_memoria
+        self.max_disco = max_disco
+        self.ttl_s = ttl_s
+        self._memoria = OrderedDict()  # clave -> (creado, nombre_norm, speech)
+        self._lock = threading.Lock()
+        self._conn = None
+        if ruta:
+            self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+            if ruta != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS speeches (
+                    clave TEXT PRIMARY KEY,
+                    nombre_norm TEXT NOT NULL,
+                    speech TEXT NOT NULL,
+                    creado REAL NOT NULL,
+                    usado REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_speeches_nombre ON speeches(nombre_norm);
+                CREATE INDEX IF NOT EXISTS ix_speeches_usado ON speeches(usado);
+            """)
+
+    def obtener(self, cliente: dict) -> Optional[str]:
+        """Speech vigente para el perfil del cliente, o None."""
+        clave = clave_speech(cliente)
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                if ahora - entrada[0] <= self.ttl_s:
+                    self._memoria.move_to_end(clave)
+                    return entrada[2]
+                del self._memoria[clave]
+
+            if self._conn is None:
+                return None
+            fila = self._conn.execute(
+                "SELECT nombre_norm, speech, creado FROM speeches WHERE clave = ? AND creado >= ?",
+                (clave, ahora - self.ttl_s),
+            ).fetchone()
+            if fila is None:
+                return None
+            self._conn.execute("UPDATE speeches SET usado = ? WHERE clave = ?", (ahora, clave))
+            self._recordar(clave, fila[2], fila[0], fila[1])
+            return fila[1]
+
+    def guardar(self, cliente: dict, speech: str):
+        clave = clave_speech(cliente)
+        nombre_norm = normalizar_nombre(cliente["nombre"])
+        ahora = time.time()
+        with self._lock:
+            self._recordar(clave, ahora, nombre_norm, speech)
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO speeches VALUES (?, ?, ?, ?, ?)",
+                (clave, nombre_norm, speech, ahora, ahora),
+            )
+            self._podar_disco(ahora)
+
+    def invalidar(self, nombre: str) -> int:
+        """Descarta los speeches de un cliente (p. ej. tras cambiar su deuda)."""
+        nombre_norm = normalizar_nombre(nombre)
+        with self._lock:
+            claves = [c for c, (_, n, _) in self._memoria.items() if n == nombre_norm]
+            for clave in claves:
+                del self._memoria[clave]
+            if self._conn is None:
+                return len(claves)
+            cursor = self._conn.execute("DELETE FROM speeches WHERE nombre_norm = ?", (nombre_norm,))
+            return cursor.rowcount
+
+    def invalidar_varios(self, nombres) -> int:
+        """Como invalidar, para muchos clientes a la vez (una sola pasada por memoria y disco)."""
+        nombres_norm = {normalizar_nombre(n) for n in nombres}
+        if not nombres_norm:
+            return 0
+        with self._lock:
+            claves = [c for c, (_, n, _) in self._memoria.items() if n in nombres_norm]
+            for clave in claves:
+                del self._memoria[clave]
+            if self._conn is None:
+                return len(claves)
+            antes = self._conn.total_changes
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM speeches WHERE nombre_norm = ?", ((n,) for n in nombres_norm))
+            self._conn.execute("COMMIT")
+            return self._conn.total_changes - antes
+
+    def _recordar(self, clave, creado, nombre_norm, speech):
+        self._memoria[clave] = (creado, nombre_norm, speech)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _podar_disco(self, ahora):
+        self._conn.execute("DELETE FROM speeches WHERE creado < ?", (ahora - self.ttl_s,))
+        exceso = self._conn.execute("SELECT COUNT(*) FROM speeches").fetchone()[0] - self.max_disco
+        if exceso > 0:
+            self._conn.execute(
+                "DELETE FROM speeches WHERE clave IN (SELECT clave FROM speeches ORDER BY usado LIMIT ?)",
+                (exceso,),
+            )
+
+    def contar(self) -> int:
+        with self._lock:
+            if self._conn is None:
+                return len(self._memoria)
+            return self._conn.execute("SELECT COUNT(*) FROM speeches").fetchone()[0]
+
+    def cerrar(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[CacheSpeech] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> CacheSpeech:
+    """Caché compartido por el chat y los procesos por lote."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheSpeech()
+    return _cache
+
+
+def set_cache(cache: Optional[CacheSpeech]):
+    """Reemplaza el caché compartido (útil en pruebas)."""
+    global _cache
+    _cache = cache
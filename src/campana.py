@@ -0,0 +1,175 @@
+"""
+Campañas de speeches reanudables.
+
+Cada speech se agrega al archivo de salida (JSONL o CSV) apenas termina, y su
+id queda registrado en un checkpoint SQLite junto al archivo. Si la campaña
+se interrumpe (cuota agotada, caída de red), volver a ejecutarla salta los
+clientes ya completados. La cartera se recorre por lotes y el checkpoint se
+consulta lote a lote, así que la memoria no crece con el tamaño de la cartera.
+
+Por defecto los speeches salen de las plantillas locales y el modelo solo
+redacta los de clientes sin plantilla que aplique; con --creativo los
+redacta todos el modelo.
+
+Uso:
+    python src/campana.py --salida campana_octubre.jsonl --concurrencia 8 --rpm 600
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sqlite3
+from typing import Iterable, Iterator, Optional
+
+from generacion_lote import SinkJSONL, generar_speeches
+from resiliencia import TokenBucket
+
+CAMPOS_SALIDA = ['id', 'nombre', 'tono', 'speech', 'latencia_s', 'tokens_entrada', 'tokens_salida']
+
+
+class SinkCSV:
+    """Agrega filas a un CSV; escribe la cabecera solo si el archivo es nuevo."""
+
+    def __init__(self, ruta: str):
+        nuevo = not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+        self._archivo = open(ruta, "a", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._archivo, fieldnames=CAMPOS_SALIDA, extrasaction="ignore")
+        if nuevo:
+            self._writer.writeheader()
+
+    def escribir(self, resultado: dict):
+        self._writer.writerow(resultado)
+        self._archivo.flush()
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class Checkpoint:
+    """Ids de clientes ya completados en una campaña."""
+
+    def __init__(self, ruta: str):
+        self._conn = sqlite3.connect(ruta, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS completados (id TEXT PRIMARY KEY)")
+
+    def marcar(self, id_cliente):
+        self._conn.execute("INSERT OR IGNORE INTO completados (id) VALUES (?)", (str(id_cliente),))
+
+    def contar(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM completados").fetchone()[0]
+
+    def pendientes(self, clientes: Iterable[dict], tamano_lote: int = 500) -> Iterator[dict]:
+        """Filtra los clientes completados consultando el checkpoint por lotes."""
+        lote = []
+        for cliente in clientes:
+            lote.append(cliente)
+            if len(lote) >= tamano_lote:
+                yield from self._filtrar(lote)
+                lote = []
+        if lote:
+            yield from self._filtrar(lote)
+
+    def _filtrar(self, lote):
+        ids = [str(c['id']) for c in lote]
+        marcas = ",".join("?" * len(ids))
+        hechos = {
+            fila[0] for fila in
+            self._conn.execute(f"SELECT id FROM completados WHERE id IN ({marcas})", ids)
+        }
+        return [c for c in lote if str(c['id']) not in hechos]
+
+    def cerrar(self):
+        self._conn.close()
+
+
+class SinkConCheckpoint:
+    """
+    Escribe los speeches exitosos y luego los marca como completados.
+    Los fallidos no se escriben ni se marcan: se reintentan en la próxima
+    ejecución. Ante una caída entre ambos pasos un speech puede repetirse,
+    pero nunca perderse.
+    """
+
+    def __init__(self, sink, checkpoint: Checkpoint):
+        self.sink = sink
+        self.checkpoint = checkpoint
+        self.errores = 0
+
+    def escribir(self, resultado: dict):
+        if resultado.get("error"):
+            self.errores += 1
+            return
+        self.sink.escribir(resultado)
+        self.checkpoint.marcar(resultado["id"])
+
+    def cerrar(self):
+        self.sink.cerrar()
+
+
+def crear_sink(ruta: str):
+    """JSONL o CSV según la extensión del archivo de salida."""
+    if ruta.lower().endswith(".csv"):
+        return SinkCSV(ruta)
+    return SinkJSONL(ruta)
+
+
+async def ejecutar_campana(llm, clientes: Iterable[dict], salida: str, concurrencia: int = 8,
+                           limitador: Optional[TokenBucket] = None, reintentos: int = 4,
+                           backoff_base: float = 0.5, cache=None, motor=None) -> dict:
+    """
+    Genera los speeches pendientes de `clientes` y los agrega a `salida`.
+    El checkpoint se guarda en `<salida>.ckpt`.
+    """
+    checkpoint = Checkpoint(salida + ".ckpt")
+    sink = SinkConCheckpoint(crear_sink(salida), checkpoint)
+    ya_completados = checkpoint.contar()
+    try:
+        resumen = await generar_speeches(
+            llm,
+            checkpoint.pendientes(clientes),
+            sink,
+            concurrencia=concurrencia,
+            limitador=limitador,
+            reintentos=reintentos,
+            backoff_base=backoff_base,
+            cache=cache,
+            motor=motor,
+        )
+    finally:
+        sink.cerrar()
+        checkpoint.cerrar()
+
+    resumen["omitidos_por_checkpoint"] = ya_completados
+    return resumen
+
+
+def main():
+    from cache_speech import get_cache
+    from cliente_store import get_store
+    from modelos import crear_llm
+    from plantillas import get_motor_plantillas
+
+    parser = argparse.ArgumentParser(description="Genera (o reanuda) una campaña de speeches para toda la cartera.")
+    parser.add_argument("--salida", default="speeches.jsonl", help="Archivo de salida .jsonl o .csv")
+    parser.add_argument("--concurrencia", type=int, default=8, help="Llamadas simultáneas al modelo")
+    parser.add_argument("--rpm", type=float, default=600, help="Solicitudes por minuto permitidas")
+    parser.add_argument("--sin-cache", action="store_true", help="Regenera todos los speeches sin usar el caché")
+    parser.add_argument("--creativo", action="store_true", help="Todos los speeches los redacta el modelo")
+    args = parser.parse_args()
+
+    resumen = asyncio.run(ejecutar_campana(
+        crear_llm(),
+        get_store().iterar(),
+        args.salida,
+        concurrencia=args.concurrencia,
+        limitador=TokenBucket(args.rpm / 60.0, capacidad=args.concurrencia),
+        cache=None if args.sin_cache else get_cache(),
+        motor=None if args.creativo else get_motor_plantillas(),
+    ))
+    print(json.dumps(resumen, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
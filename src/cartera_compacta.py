@@ -0,0 +1,253 @@
+"""
+Representación compacta y tipada de la cartera, de solo lectura.
+
+Cada columna es un arreglo numpy en lugar de un objeto Python por celda:
+
+* deuda: centavos en int64 (punto fijo; las sumas son exactas)
+* dias_mora: int16
+* producto: códigos de categoría + la lista de categorías
+* fecha_registro: datetime64[s]
+* nombre: un único buffer UTF-8 con desplazamientos (como las columnas de
+  texto de Arrow); solo se decodifican los nombres que se muestran
+
+Los backends la arman una vez por versión de la cartera y la comparten entre
+las herramientas y la analítica (ver ClienteStore.cartera). `guardar` la deja
+en un archivo columnar que `abrir` mapea en memoria sin parsear nada.
+"""
+import json
+import os
+import struct
+import tempfile
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from tonos import clasificar_tono_vectorizado
+
+COLUMNAS = ['nombre', 'deuda', 'dias_mora', 'producto', 'fecha_registro']
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+# Archivo: firma, largo del encabezado JSON, encabezado y los buffers de cada
+# columna alineados a 64 bytes
+FIRMA = b"COBRACOL"
+VERSION_FORMATO = 1
+ALINEACION = 64
+_BUFFERS = ("nombres_datos", "nombres_offsets", "deuda_centavos", "dias_mora", "producto_codigos", "fecha_registro")
+
+
+class CarteraCompacta:
+    """Columnas tipadas de la cartera. `version` identifica el estado del que salió."""
+
+    def __init__(self, buffers: dict, categorias, version=None):
+        for nombre in _BUFFERS:
+            arreglo = buffers[nombre]
+            if arreglo.flags.writeable:
+                arreglo.flags.writeable = False
+            setattr(self, nombre, arreglo)
+        self.categorias = tuple(categorias)
+        self.version = version
+        self._rango_nombre = None
+
+    # ------------------------------------------------------------------
+    # Construcción y conversión
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def desde_dataframe(cls, df: pd.DataFrame, version=None) -> "CarteraCompacta":
+        """Convierte un DataFrame con las COLUMNAS de la cartera (en su orden de filas)."""
+        codificados = [str(n).encode() for n in df['nombre']]
+        offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(n) for n in codificados], out=offsets[1:])
+        producto = pd.Categorical(df['producto'].astype(object).where(df['producto'].notna(), None))
+        fechas = pd.to_datetime(df['fecha_registro'], errors="coerce", format="ISO8601")
+        mora = pd.to_numeric(df['dias_mora']).to_numpy(dtype=np.int64)
+        return cls({
+            "nombres_datos": np.frombuffer(b"".join(codificados), dtype=np.uint8),
+            "nombres_offsets": offsets,
+            "deuda_centavos": np.rint(pd.to_numeric(df['deuda']).to_numpy(dtype=float) * 100).astype(np.int64),
+            "dias_mora": np.clip(mora, np.iinfo(np.int16).min, np.iinfo(np.int16).max).astype(np.int16),
+            "producto_codigos": np.asarray(producto.codes, dtype=np.int32),
+            "fecha_registro": fechas.to_numpy().astype("datetime64[s]"),
+        }, producto.categories.astype(str).tolist(), version)
+
+    def __len__(self):
+        return len(self.deuda_centavos)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes que ocupan las columnas (sin contar las categorías)."""
+        return sum(getattr(self, nombre).nbytes for nombre in _BUFFERS)
+
+    @property
+    def deuda(self) -> np.ndarray:
+        return self.deuda_centavos / 100
+
+    def nombre(self, i: int) -> str:
+        inicio, fin = self.nombres_offsets[i], self.nombres_offsets[i + 1]
+        return self.nombres_datos[inicio:fin].tobytes().decode()
+
+    def _nombres_bytes(self, indices=None) -> list:
+        datos = self.nombres_datos.tobytes()
+        offsets = self.nombres_offsets.tolist()
+        if indices is None:
+            indices = range(len(self))
+        return [datos[offsets[i]:offsets[i + 1]] for i in indices]
+
+    def a_dataframe(self, columnas=None, indices=None) -> pd.DataFrame:
+        """
+        DataFrame tipado (producto categórico, dias_mora int16, fechas
+        datetime64) de las filas `indices` (todas por defecto).
+        """
+        seleccion = slice(None) if indices is None else np.asarray(indices, dtype=np.int64)
+        datos = {}
+        for columna in columnas or COLUMNAS:
+            if columna == 'nombre':
+                datos[columna] = np.array([n.decode() for n in self._nombres_bytes(
+                    None if indices is None else seleccion.tolist()
+                )], dtype=object)
+            elif columna == 'deuda':
+                datos[columna] = self.deuda_centavos[seleccion] / 100
+            elif columna == 'dias_mora':
+                datos[columna] = np.array(self.dias_mora[seleccion])
+            elif columna == 'producto':
+                datos[columna] = pd.Categorical.from_codes(self.producto_codigos[seleccion], self.categorias)
+            elif columna == 'fecha_registro':
+                datos[columna] = np.array(self.fecha_registro[seleccion])
+            else:
+                raise ValueError(f"Columna desconocida: '{columna}'")
+        return pd.DataFrame(datos, columns=list(datos))
+
+    def filas(self, indices) -> pd.DataFrame:
+        """Filas con los tipos de siempre (textos y números Python), para mostrar."""
+        df = self.a_dataframe(indices=indices)
+        return df.assign(
+            dias_mora=df['dias_mora'].astype(np.int64),
+            producto=df['producto'].astype(object).where(df['producto'].notna(), None),
+            fecha_registro=df['fecha_registro'].dt.strftime(FORMATO_FECHA).astype(object)
+            .where(df['fecha_registro'].notna(), None),
+        )
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _clave_orden(self, columna):
+        """(clave int64, faltantes) para ordenar por `columna` como lo haría pandas."""
+        if columna == 'nombre':
+            if self._rango_nombre is None:
+                # Comparar los bytes UTF-8 ordena igual que comparar los textos
+                orden = np.argsort(np.array(self._nombres_bytes(), dtype=object), kind="stable")
+                rango = np.empty(len(self), dtype=np.int64)
+                rango[orden] = np.arange(len(self))
+                self._rango_nombre = rango
+            return self._rango_nombre, None
+        if columna == 'deuda':
+            return self.deuda_centavos, None
+        if columna == 'dias_mora':
+            return self.dias_mora.astype(np.int64), None
+        if columna == 'producto':
+            # Las categorías ya están ordenadas: el código ordena como el texto
+            return self.producto_codigos.astype(np.int64), self.producto_codigos < 0
+        fechas = self.fecha_registro.view(np.int64)
+        return fechas, np.isnat(self.fecha_registro)
+
+    def consultar(self, deuda_min: float = None, mora_min: int = None, mora_max: int = None,
+                  producto: str = None, tono: str = None, ordenar_por: str = None,
+                  descendente: bool = False, limite: int = None, offset: int = 0) -> tuple:
+        """Mismo contrato que ClienteStore.consultar: (pagina, resumen)."""
+        mascara = np.ones(len(self), dtype=bool)
+        if deuda_min is not None:
+            mascara &= self.deuda_centavos >= np.ceil(round(float(deuda_min) * 100, 6))
+        if mora_min is not None:
+            mascara &= self.dias_mora >= np.int64(mora_min)
+        if mora_max is not None:
+            mascara &= self.dias_mora <= np.int64(mora_max)
+        if producto:
+            buscado = producto.strip().lower()
+            codigos = [i for i, c in enumerate(self.categorias) if c.lower() == buscado]
+            mascara &= np.isin(self.producto_codigos, codigos)
+        if tono:
+            mascara &= clasificar_tono_vectorizado(self.deuda, self.dias_mora) == tono
+        indices = np.flatnonzero(mascara)
+
+        resumen = {"total": len(indices), "deuda_total": int(self.deuda_centavos[indices].sum()) / 100}
+        if ordenar_por:
+            clave, faltantes = self._clave_orden(ordenar_por)
+            clave = clave[indices]
+            if descendente:
+                clave = -clave
+            # lexsort es estable; los faltantes van al final en ambos sentidos
+            indices = indices[np.lexsort((clave, faltantes[indices])) if faltantes is not None
+                              else np.argsort(clave, kind="stable")]
+        fin = None if limite is None else offset + limite
+        return self.filas(indices[offset:fin]), resumen
+
+    # ------------------------------------------------------------------
+    # Instantánea en disco
+    # ------------------------------------------------------------------
+
+    def guardar(self, ruta: str):
+        """Escribe la instantánea columnar (reemplazo atómico del archivo)."""
+        columnas, posicion = {}, 0
+        for nombre in _BUFFERS:
+            arreglo = getattr(self, nombre)
+            columnas[nombre] = {"dtype": arreglo.dtype.str, "offset": posicion, "largo": len(arreglo)}
+            posicion += -(-arreglo.nbytes // ALINEACION) * ALINEACION
+        encabezado = json.dumps({
+            "formato": VERSION_FORMATO,
+            "version": self.version,
+            "categorias": list(self.categorias),
+            "columnas": columnas,
+        }).encode()
+        inicio_datos = -(-(len(FIRMA) + 8 + len(encabezado)) // ALINEACION) * ALINEACION
+
+        # Temporal propio: otro proceso puede estar guardando la misma instantánea
+        descriptor, temporal = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(ruta)), prefix=os.path.basename(ruta), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(FIRMA + struct.pack("<Q", len(encabezado)) + encabezado)
+                for nombre in _BUFFERS:
+                    f.seek(inicio_datos + columnas[nombre]["offset"])
+                    f.write(np.ascontiguousarray(getattr(self, nombre)).tobytes())
+                f.truncate(inicio_datos + posicion)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, ruta)
+        except BaseException:
+            os.unlink(temporal)
+            raise
+
+    @classmethod
+    def abrir(cls, ruta: str) -> "CarteraCompacta":
+        """
+        Mapea la instantánea en memoria: no se copia ni se parsea nada, las
+        páginas se leen del disco a medida que se usan.
+        """
+        with open(ruta, "rb") as f:
+            cabecera = f.read(len(FIRMA) + 8)
+            if len(cabecera) < len(FIRMA) + 8 or not cabecera.startswith(FIRMA):
+                raise ValueError(f"{ruta} no es una instantánea de cartera")
+            largo = struct.unpack("<Q", cabecera[len(FIRMA):])[0]
+            encabezado = json.loads(f.read(largo))
+        if encabezado.get("formato") != VERSION_FORMATO:
+            raise ValueError(f"Formato de instantánea no soportado: {encabezado.get('formato')}")
+        inicio_datos = -(-(len(FIRMA) + 8 + largo) // ALINEACION) * ALINEACION
+        mapa = np.memmap(ruta, dtype=np.uint8, mode="r")
+        buffers = {}
+        for nombre, columna in encabezado["columnas"].items():
+            tipo = np.dtype(columna["dtype"])
+            inicio = inicio_datos + columna["offset"]
+            buffers[nombre] = mapa[inicio:inicio + columna["largo"] * tipo.itemsize].view(tipo)
+        return cls(buffers, encabezado["categorias"], encabezado["version"])
+
+
+def abrir_si_vigente(ruta: str, version) -> Optional[CarteraCompacta]:
+    """La instantánea de `ruta` si existe, es legible y corresponde a `version`."""
+    try:
+        cartera = CarteraCompacta.abrir(ruta)
+    except (OSError, ValueError, KeyError):
+        return None
+    return cartera if cartera.version == version else None
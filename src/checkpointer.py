@@ -0,0 +1,273 @@
+"""
+Checkpointer durable y acotado para el grafo del agente.
+
+Guarda en SQLite solo el último checkpoint de cada hilo de conversación (la
+app no usa "viaje en el tiempo") y desaloja los hilos inactivos: por TTL y,
+si se supera `max_hilos`, los de uso más antiguo (LRU). Así la memoria del
+proceso y el tamaño del archivo quedan acotados en despliegues largos.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+import metricas
+
+CHECKPOINT_PATH = os.environ.get("COBRA_CHECKPOINT_PATH", "conversaciones.db")
+MAX_HILOS = int(os.environ.get("COBRA_MAX_HILOS", "200"))
+TTL_HILOS_S = float(os.environ.get("COBRA_TTL_HILOS_S", str(8 * 3600)))
+
+
+class SQLiteSaverAcotado(BaseCheckpointSaver):
+    """Checkpointer SQLite con un checkpoint por hilo y desalojo LRU/TTL."""
+
+    def __init__(self, ruta: str = CHECKPOINT_PATH, max_hilos: int = MAX_HILOS,
+                 ttl_s: float = TTL_HILOS_S, serde=None):
+        super().__init__(serde=serde)
+        self.max_hilos = max_hilos
+        self.ttl_s = ttl_s
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        if ruta != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_id TEXT,
+                tipo TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                tipo_metadata TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                canal TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                valor BLOB NOT NULL,
+                task_path TEXT NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS hilos (
+                thread_id TEXT PRIMARY KEY,
+                ultimo_uso REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_hilos_ultimo_uso ON hilos(ultimo_uso);
+        """)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT checkpoint_id, parent_id, tipo, checkpoint, tipo_metadata, metadata "
+                "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+            if fila is None:
+                return None
+            pedido = get_checkpoint_id(config)
+            if pedido and pedido != fila[0]:
+                # Solo se conserva el último checkpoint del hilo
+                return None
+            self._tocar(thread_id)
+            return self._construir_tupla(thread_id, checkpoint_ns, fila)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        consulta = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, tipo, checkpoint, "
+                    "tipo_metadata, metadata FROM checkpoints")
+        params = []
+        if config:
+            consulta += " WHERE thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if "checkpoint_ns" in config["configurable"]:
+                consulta += " AND checkpoint_ns = ?"
+                params.append(config["configurable"]["checkpoint_ns"])
+        with self._lock:
+            filas = self._conn.execute(consulta, params).fetchall()
+
+        antes_de = get_checkpoint_id(before) if before else None
+        entregados = 0
+        for thread_id, checkpoint_ns, *resto in filas:
+            if antes_de and resto[0] >= antes_de:
+                continue
+            with self._lock:
+                tupla = self._construir_tupla(thread_id, checkpoint_ns, resto)
+            if filter and any(tupla.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            if limit is not None and entregados >= limit:
+                return
+            entregados += 1
+            yield tupla
+
+    def _construir_tupla(self, thread_id, checkpoint_ns, fila) -> CheckpointTuple:
+        checkpoint_id, parent_id, tipo, checkpoint, tipo_metadata, metadata = fila
+        writes = self._conn.execute(
+            "SELECT task_id, canal, tipo, valor FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint=self.serde.loads_typed((tipo, checkpoint)),
+            metadata=self.serde.loads_typed((tipo_metadata, metadata)),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_id,
+                }}
+                if parent_id else None
+            ),
+            pending_writes=[
+                (task_id, canal, self.serde.loads_typed((tipo_valor, valor)))
+                for task_id, canal, tipo_valor, valor in writes
+            ],
+        )
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        tipo, datos = self.serde.dumps_typed(checkpoint)
+        tipo_metadata, datos_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        metricas.contar("bytes_escritos_total", len(datos) + len(datos_metadata), destino="checkpoints")
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                     tipo, datos, tipo_metadata, datos_metadata),
+                )
+                # Las escrituras pendientes de checkpoints anteriores ya no sirven
+                self._conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?",
+                    (thread_id, checkpoint_ns, checkpoint["id"]),
+                )
+                self._tocar(thread_id)
+                self._desalojar()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            for idx, (canal, valor) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(canal, idx)
+                # Igual que InMemorySaver: los writes normales no se sobrescriben
+                verbo = "INSERT OR IGNORE" if idx >= 0 else "INSERT OR REPLACE"
+                tipo, datos = self.serde.dumps_typed(valor)
+                metricas.contar("bytes_escritos_total", len(datos), destino="checkpoints")
+                self._conn.execute(
+                    f"{verbo} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, canal, tipo, datos, task_path),
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._borrar_hilos([thread_id])
+
+    # ------------------------------------------------------------------
+    # Desalojo
+    # ------------------------------------------------------------------
+
+    def _tocar(self, thread_id):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO hilos (thread_id, ultimo_uso) VALUES (?, ?)",
+            (thread_id, time.time()),
+        )
+
+    def _desalojar(self):
+        vencidos = [fila[0] for fila in self._conn.execute(
+            "SELECT thread_id FROM hilos WHERE ultimo_uso < ?", (time.time() - self.ttl_s,)
+        )]
+        exceso = self._conn.execute("SELECT COUNT(*) FROM hilos").fetchone()[0] - len(vencidos) - self.max_hilos
+        if exceso > 0:
+            vencidos += [fila[0] for fila in self._conn.execute(
+                "SELECT thread_id FROM hilos WHERE ultimo_uso >= ? ORDER BY ultimo_uso LIMIT ?",
+                (time.time() - self.ttl_s, exceso),
+            )]
+        if vencidos:
+            self._borrar_hilos(vencidos)
+
+    def _borrar_hilos(self, thread_ids):
+        for tabla in ("checkpoints", "writes", "hilos"):
+            self._conn.executemany(f"DELETE FROM {tabla} WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    def contar_hilos(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM hilos").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Variantes asíncronas: SQLite local responde en microsegundos
+    # ------------------------------------------------------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for tupla in self.list(config, filter=filter, before=before, limit=limit):
+            yield tupla
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
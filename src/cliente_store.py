@@ -0,0 +1,1112 @@
+"""
+Almacenamiento de la cartera de clientes.
+
+SQLite es el backend por defecto: índice único sobre el nombre normalizado,
+búsquedas puntuales y escrituras transaccionales sin reescribir todo el archivo.
+El CSV se conserva como formato de importación/exportación y como backend
+alternativo (COBRA_STORE=csv), con diario de escritura anticipada para que
+varias sesiones o procesos puedan escribir sin perder actualizaciones.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+import metricas
+from analitica import AgregadosCartera
+from cartera_compacta import COLUMNAS, CarteraCompacta, abrir_si_vigente
+from indice_nombres import IndiceNombres
+from tonos import clasificar_tono_vectorizado, condicion_sql_tono, expresion_sql_tono
+
+# ==========================================
+# ⚙️ CONFIGURACIÓN
+# ==========================================
+# Columna interna: desde cuándo corre la mora (hoy - dias_mora al registrar o
+# actualizar la mora). envejecer_mora recalcula dias_mora a partir de ella.
+VENCIMIENTO = 'fecha_vencimiento'
+
+DB_PATH = os.environ.get("COBRA_DB_PATH", "clientes.db")
+CSV_PATH = "clientes.csv"
+STORE_BACKEND = os.environ.get("COBRA_STORE", "sqlite")
+
+
+def normalizar_nombre(nombre: str) -> str:
+    """Clave de búsqueda: minúsculas y espacios colapsados."""
+    return " ".join(str(nombre).lower().split())
+
+
+def _ahora() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _vencimiento(dias_mora: int) -> str:
+    return (date.today() - timedelta(days=int(dias_mora))).isoformat()
+
+
+def _fechas_lote(filas: pd.DataFrame) -> tuple:
+    """
+    (fechas de registro, vencimientos) de un lote, como texto. Se respeta la
+    fecha_registro del lote si la trae (p. ej. al migrar un CSV); si no, es
+    ahora. El vencimiento es esa fecha menos los días de mora.
+    """
+    ahora = pd.Timestamp(_ahora())
+    if 'fecha_registro' in filas.columns:
+        registro = pd.to_datetime(filas['fecha_registro'].astype("string"), errors="coerce", format="ISO8601")
+        registro = registro.fillna(ahora)
+    else:
+        registro = pd.Series(ahora, index=filas.index)
+    dias_mora = pd.to_timedelta(filas['dias_mora'].astype(int).to_numpy(), unit="D")
+    return (
+        registro.dt.strftime("%Y-%m-%d %H:%M:%S").tolist(),
+        (registro.dt.normalize() - dias_mora).dt.strftime("%Y-%m-%d").tolist(),
+    )
+
+
+def _mora_al(corte, vencimientos, dias_mora, fechas_registro):
+    """
+    Días de mora a la fecha `corte` para toda la cartera (vectorizado). Las
+    filas sin vencimiento guardado (anteriores a la columna) lo toman de
+    fecha_registro - dias_mora. Retorna (mora, vencimientos completos).
+    """
+    dias_mora = np.asarray(dias_mora, dtype=np.int64)
+    vencimientos = pd.to_datetime(pd.Series(vencimientos, dtype=object), format="%Y-%m-%d", errors="coerce")
+    faltan = vencimientos.isna().to_numpy()
+    if faltan.any():
+        registro = pd.to_datetime(pd.Series(fechas_registro, dtype=object)[faltan].str.slice(0, 10), errors="coerce")
+        vencimientos[faltan] = registro - pd.to_timedelta(dias_mora[faltan], unit="D")
+    corte = pd.Timestamp(corte or date.today())
+    mora = (corte - vencimientos).dt.days.to_numpy(dtype=float, na_value=np.nan)
+    # Sin fecha utilizable se conserva la mora guardada
+    mora = np.where(np.isnan(mora), dias_mora, np.maximum(mora, 0)).astype(np.int64)
+    return mora, vencimientos.dt.strftime("%Y-%m-%d")
+
+
+def _validar_orden(ordenar_por):
+    # La columna va interpolada en el SQL, así que solo se aceptan las conocidas
+    if ordenar_por is not None and ordenar_por not in COLUMNAS:
+        raise ValueError(f"No se puede ordenar por '{ordenar_por}'. Columnas: {', '.join(COLUMNAS)}")
+
+
+# ==========================================
+# 🗄️ INTERFAZ
+# ==========================================
+
+class ClienteStore:
+    """
+    Interfaz común de los backends. Cada cliente se identifica por su
+    nombre normalizado (ver normalizar_nombre).
+    """
+
+    def registrar(self, nombre: str, deuda: float, dias_mora: int, producto: str) -> bool:
+        """Inserta o reemplaza un cliente. Retorna True si era nuevo."""
+        raise NotImplementedError
+
+    def registrar_lote(self, filas: pd.DataFrame) -> tuple:
+        """
+        Upsert de un lote ya validado y sin nombres repetidos, en un solo
+        commit. Retorna (insertados, actualizados).
+        """
+        raise NotImplementedError
+
+    def obtener(self, nombre: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def actualizar(self, nombre: str, deuda: float = None, dias_mora: int = None) -> bool:
+        """Retorna False si el cliente no existe."""
+        raise NotImplementedError
+
+    def eliminar(self, nombre: str) -> bool:
+        """Retorna False si el cliente no existe."""
+        raise NotImplementedError
+
+    def listar(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def contar(self) -> int:
+        raise NotImplementedError
+
+    def iterar(self, tamano_lote: int = 500) -> Iterator[dict]:
+        """Recorre la cartera por lotes sin cargarla completa en memoria."""
+        raise NotImplementedError
+
+    def cartera(self) -> CarteraCompacta:
+        """
+        La cartera en columnas tipadas (ver cartera_compacta.py), de solo
+        lectura. Los backends la arman una vez y la comparten hasta la
+        próxima escritura confirmada.
+        """
+        return CarteraCompacta.desde_dataframe(self.listar())
+
+    def consultar(self, deuda_min: float = None, mora_min: int = None, mora_max: int = None,
+                  producto: str = None, tono: str = None, ordenar_por: str = None,
+                  descendente: bool = False, limite: int = None, offset: int = 0) -> tuple:
+        """
+        Filtra, ordena y pagina la cartera. Retorna (pagina, resumen), donde
+        resumen tiene el total de coincidencias y la suma de sus deudas.
+        """
+        _validar_orden(ordenar_por)
+        if tono:
+            condicion_sql_tono(tono)  # valida el nombre del tono
+        pagina, resumen = self.cartera().consultar(
+            deuda_min=deuda_min, mora_min=mora_min, mora_max=mora_max, producto=producto, tono=tono,
+            ordenar_por=ordenar_por, descendente=descendente, limite=limite, offset=offset,
+        )
+        metricas.contar("store_filas_total", len(pagina), operacion="lectura")
+        return pagina, resumen
+
+    def agregados(self, por: str = None) -> dict:
+        """
+        Totales por tono, producto y tramo de mora (ver analitica.py). Se
+        mantienen al confirmar cada escritura, sin recorrer la cartera.
+        """
+        raise NotImplementedError
+
+    def envejecer_mora(self, corte: date = None) -> dict:
+        """
+        Recalcula dias_mora de toda la cartera a la fecha `corte` (hoy por
+        defecto) y guarda solo las filas que cambian. Retorna {"revisados",
+        "actualizados", "cambios_tono": [(nombre, tono_anterior, tono_nuevo)]}.
+        """
+        raise NotImplementedError
+
+    def envejecido_al(self) -> Optional[date]:
+        """Corte del último envejecimiento, o None si el backend no lo guarda."""
+        return None
+
+    def buscar_nombres(self, nombre: str, limite: int = 5) -> list:
+        """
+        Clientes con nombre parecido a `nombre` (sin importar acentos,
+        mayúsculas ni errores menores): [(nombre, similitud)] de mayor a menor.
+        """
+        raise NotImplementedError
+
+    def transaccion(self):
+        """Context manager que agrupa varias escrituras en un único commit."""
+        raise NotImplementedError
+
+    def importar_csv(self, ruta: str) -> int:
+        """Carga (upsert) los clientes de un CSV. Retorna filas procesadas."""
+        df = pd.read_csv(ruta)
+        if df.empty:
+            return 0
+        df = df.assign(nombre=df['nombre'].astype(str).str.strip())
+        df = df.loc[~df['nombre'].map(normalizar_nombre).duplicated(keep="last")]
+        self.registrar_lote(df)
+        return len(df)
+
+    def exportar_csv(self, ruta: str) -> int:
+        """Vuelca la cartera completa a CSV. Retorna filas escritas."""
+        df = self.listar()
+        df.to_csv(ruta, index=False)
+        return len(df)
+
+    def cerrar(self):
+        pass
+
+
+# ==========================================
+# 🪶 BACKEND SQLITE (por defecto)
+# ==========================================
+
+class SQLiteClienteStore(ClienteStore):
+    """Backend SQLite con índice único sobre nombre_norm."""
+
+    def __init__(self, ruta: str = DB_PATH):
+        self.ruta = ruta
+        # Instantánea de la cartera compacta junto a la base (no para bases temporales)
+        self.ruta_cartera = ruta + ".cartera" if ruta not in ("", ":memory:") else None
+        self._lock = threading.RLock()
+        self._profundidad = 0
+        # Derivados de lo confirmado (agregados e índice de nombres) y cambios de
+        # la transacción en curso; None en _cambios pide reconstruirlos (lotes,
+        # lecturas a mitad de transacción)
+        self._agregados = None
+        self._indice = None
+        self._version_derivados = None
+        self._cambios = []
+        self._cartera = None
+        self._cambios_previos = 0
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if ruta != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS clientes (
+                id INTEGER PRIMARY KEY,
+                nombre TEXT NOT NULL,
+                nombre_norm TEXT NOT NULL,
+                deuda REAL NOT NULL,
+                dias_mora INTEGER NOT NULL,
+                producto TEXT NOT NULL,
+                fecha_registro TEXT NOT NULL,
+                fecha_vencimiento TEXT
+            )
+        """)
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_clientes_nombre_norm ON clientes(nombre_norm)"
+        )
+        # base: identifica el archivo; version: sube con cada commit que cambia filas
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor NOT NULL)")
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta VALUES ('base', ?), ('version', 0)", (uuid.uuid4().hex,)
+        )
+        columnas = {fila["name"] for fila in self._conn.execute("PRAGMA table_info(clientes)")}
+        if VENCIMIENTO not in columnas:
+            # Bases anteriores: la mora se tomó el día del registro
+            with self.transaccion():
+                self._conn.execute(f"ALTER TABLE clientes ADD COLUMN {VENCIMIENTO} TEXT")
+                self._conn.execute(
+                    f"UPDATE clientes SET {VENCIMIENTO} = date(substr(fecha_registro, 1, 10), '-' || dias_mora || ' days')"
+                )
+
+    @contextmanager
+    def transaccion(self):
+        with self._lock:
+            if self._profundidad == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._cambios_previos = self._conn.total_changes
+            self._profundidad += 1
+            try:
+                yield self
+            except BaseException:
+                self._profundidad -= 1
+                if self._profundidad == 0:
+                    self._conn.execute("ROLLBACK")
+                    self._cerrar_cambios(confirmados=False)
+                raise
+            else:
+                self._profundidad -= 1
+                if self._profundidad == 0:
+                    if self._conn.total_changes != self._cambios_previos:
+                        self._conn.execute("UPDATE meta SET valor = valor + 1 WHERE clave = 'version'")
+                    self._conn.execute("COMMIT")
+                    self._cerrar_cambios(confirmados=True)
+
+    def _cerrar_cambios(self, confirmados):
+        cambios, self._cambios = self._cambios, []
+        if not cambios:
+            return
+        if None in cambios:
+            self._agregados = self._indice = None
+        elif confirmados:
+            for clave, anterior, nuevo in cambios:
+                if self._agregados is not None:
+                    self._agregados.cambiar(anterior, nuevo)
+                if self._indice is not None:
+                    self._indice.cambiar(clave, anterior, nuevo)
+
+    def _con_derivados(self):
+        return self._agregados is not None or self._indice is not None
+
+    def _sincronizar_derivados(self):
+        # data_version cambia solo cuando otra conexión confirma escrituras
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._version_derivados:
+            self._agregados = self._indice = None
+            self._version_derivados = version
+
+    def _fila_previa(self, clave):
+        fila = self._conn.execute(
+            "SELECT deuda, dias_mora, producto FROM clientes WHERE nombre_norm = ?", (clave,)
+        ).fetchone()
+        return dict(fila) if fila else None
+
+    def registrar(self, nombre, deuda, dias_mora, producto):
+        nombre = str(nombre).strip()
+        with self.transaccion():
+            previo = self._fila_previa(normalizar_nombre(nombre))
+            self._conn.execute(
+                """
+                INSERT INTO clientes (nombre, nombre_norm, deuda, dias_mora, producto, fecha_registro, fecha_vencimiento)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(nombre_norm) DO UPDATE SET
+                    nombre = excluded.nombre,
+                    deuda = excluded.deuda,
+                    dias_mora = excluded.dias_mora,
+                    producto = excluded.producto,
+                    fecha_vencimiento = excluded.fecha_vencimiento
+                """,
+                (nombre, normalizar_nombre(nombre), float(deuda), int(dias_mora), producto, _ahora(),
+                 _vencimiento(dias_mora)),
+            )
+            if self._con_derivados():
+                nuevo = {'deuda': deuda, 'dias_mora': dias_mora, 'producto': producto}
+                self._cambios.append((normalizar_nombre(nombre), previo, nuevo))
+        metricas.contar("store_filas_total", 1, operacion="escritura")
+        return previo is None
+
+    def registrar_lote(self, filas):
+        if filas.empty:
+            return 0, 0
+        claves = filas['nombre'].map(normalizar_nombre)
+        fechas_registro, vencimientos = _fechas_lote(filas)
+        registros = list(zip(
+            filas['nombre'].astype(str),
+            claves,
+            filas['deuda'].astype(float),
+            filas['dias_mora'].astype(int),
+            filas['producto'].astype(str),
+            fechas_registro,
+            vencimientos,
+        ))
+        with self.transaccion():
+            antes = self.contar()
+            self._conn.executemany(
+                """
+                INSERT INTO clientes (nombre, nombre_norm, deuda, dias_mora, producto, fecha_registro, fecha_vencimiento)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(nombre_norm) DO UPDATE SET
+                    nombre = excluded.nombre,
+                    deuda = excluded.deuda,
+                    dias_mora = excluded.dias_mora,
+                    producto = excluded.producto,
+                    fecha_vencimiento = excluded.fecha_vencimiento
+                """,
+                registros,
+            )
+            insertados = self.contar() - antes
+            if self._con_derivados():
+                # Un lote grande se reagrupa de una vez en la próxima lectura
+                self._cambios.append(None)
+        metricas.contar("store_filas_total", len(registros), operacion="escritura")
+        return insertados, len(registros) - insertados
+
+    def obtener(self, nombre):
+        with self._lock:
+            fila = self._conn.execute(
+                f"SELECT {', '.join(COLUMNAS)} FROM clientes WHERE nombre_norm = ?",
+                (normalizar_nombre(nombre),),
+            ).fetchone()
+        return dict(fila) if fila else None
+
+    def actualizar(self, nombre, deuda=None, dias_mora=None):
+        campos, valores = [], []
+        if deuda is not None:
+            campos.append("deuda = ?")
+            valores.append(float(deuda))
+        if dias_mora is not None:
+            campos.append("dias_mora = ?")
+            valores.append(int(dias_mora))
+            campos.append(f"{VENCIMIENTO} = ?")
+            valores.append(_vencimiento(dias_mora))
+        if not campos:
+            return self.obtener(nombre) is not None
+
+        with self.transaccion():
+            previo = self._fila_previa(normalizar_nombre(nombre)) if self._con_derivados() else None
+            cur = self._conn.execute(
+                f"UPDATE clientes SET {', '.join(campos)} WHERE nombre_norm = ?",
+                (*valores, normalizar_nombre(nombre)),
+            )
+            if previo is not None:
+                nuevo = dict(previo)
+                if deuda is not None:
+                    nuevo['deuda'] = float(deuda)
+                if dias_mora is not None:
+                    nuevo['dias_mora'] = int(dias_mora)
+                self._cambios.append((normalizar_nombre(nombre), previo, nuevo))
+        metricas.contar("store_filas_total", cur.rowcount, operacion="escritura")
+        return cur.rowcount > 0
+
+    def eliminar(self, nombre):
+        with self.transaccion():
+            previo = self._fila_previa(normalizar_nombre(nombre)) if self._con_derivados() else None
+            cur = self._conn.execute(
+                "DELETE FROM clientes WHERE nombre_norm = ?", (normalizar_nombre(nombre),)
+            )
+            if previo is not None:
+                self._cambios.append((normalizar_nombre(nombre), previo, None))
+        metricas.contar("store_filas_total", cur.rowcount, operacion="escritura")
+        return cur.rowcount > 0
+
+    def migrar_csv(self, ruta: str) -> int:
+        """
+        Importa el CSV si la base está vacía, una sola vez por base: la marca
+        queda en meta, así que borrar luego a todos los clientes no los trae
+        de vuelta. Retorna filas importadas.
+        """
+        with self.transaccion():
+            if self._conn.execute("SELECT 1 FROM meta WHERE clave = 'csv_migrado'").fetchone():
+                return 0
+            importados = self.importar_csv(ruta) if self.contar() == 0 and os.path.exists(ruta) else 0
+            self._conn.execute("INSERT INTO meta VALUES ('csv_migrado', ?)", (_ahora(),))
+        return importados
+
+    def listar(self):
+        with self._lock:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNAS)} FROM clientes ORDER BY id", self._conn
+            )
+
+    def consultar(self, deuda_min=None, mora_min=None, mora_max=None, producto=None, tono=None,
+                  ordenar_por=None, descendente=False, limite=None, offset=0):
+        _validar_orden(ordenar_por)
+        condiciones, params = [], []
+        if deuda_min is not None:
+            condiciones.append("deuda >= ?")
+            params.append(float(deuda_min))
+        if mora_min is not None:
+            condiciones.append("dias_mora >= ?")
+            params.append(int(mora_min))
+        if mora_max is not None:
+            condiciones.append("dias_mora <= ?")
+            params.append(int(mora_max))
+        if producto:
+            condiciones.append("producto = ? COLLATE NOCASE")
+            params.append(producto.strip())
+        if tono:
+            condiciones.append(condicion_sql_tono(tono))
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        orden = f"{ordenar_por} {'DESC' if descendente else 'ASC'}, id" if ordenar_por else "id"
+        paginacion, params_pagina = "", []
+        if limite is not None or offset:
+            # LIMIT -1 = sin límite en SQLite
+            paginacion = "LIMIT ? OFFSET ?"
+            params_pagina = [-1 if limite is None else int(limite), int(offset)]
+
+        with self._lock:
+            total, deuda_total = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(deuda), 0) FROM clientes {where}", params
+            ).fetchone()
+            pagina = pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNAS)} FROM clientes {where} ORDER BY {orden} {paginacion}",
+                self._conn,
+                params=params + params_pagina,
+            )
+        metricas.contar("store_filas_total", len(pagina), operacion="lectura")
+        return pagina, {"total": total, "deuda_total": float(deuda_total)}
+
+    def contar(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
+
+    def agregados(self, por=None):
+        with self._lock:
+            self._sincronizar_derivados()
+            if self._agregados is None:
+                self._agregados = AgregadosCartera()
+                self._agregados.cargar(self.cartera().a_dataframe(["deuda", "dias_mora", "producto"]))
+                if self._profundidad > 0:
+                    # Incluye lo no confirmado: se vuelve a armar al cerrar la transacción
+                    self._cambios.append(None)
+            return self._agregados.resumen(por)
+
+    def cartera(self):
+        with self._lock:
+            if self._profundidad > 0:
+                # Incluye lo no confirmado: no se guarda ni se comparte
+                return CarteraCompacta.desde_dataframe(self.listar())
+            meta = dict(self._conn.execute("SELECT clave, valor FROM meta").fetchall())
+            version = f"{meta['base']}:{meta['version']}"
+            if self._cartera is None or self._cartera.version != version:
+                cartera = abrir_si_vigente(self.ruta_cartera, version) if self.ruta_cartera else None
+                if cartera is None:
+                    cartera = CarteraCompacta.desde_dataframe(self.listar(), version)
+                    if self.ruta_cartera:
+                        try:
+                            cartera.guardar(self.ruta_cartera)
+                        except OSError:
+                            pass  # sin instantánea solo se pierde la recarga rápida
+                self._cartera = cartera
+            return self._cartera
+
+    def envejecer_mora(self, corte=None):
+        # Todo en SQL: no se traen a Python las filas, solo las que cambian de tono
+        mora = f"MAX(0, CAST(julianday(:corte) - julianday({VENCIMIENTO}) AS INTEGER))"
+        parametros = {"corte": (corte or date.today()).isoformat()}
+        with self.transaccion():
+            revisados = self.contar()
+            cambios_tono = self._conn.execute(
+                f"""
+                SELECT nombre, antes, despues FROM (
+                    SELECT nombre, {expresion_sql_tono()} AS antes,
+                           {expresion_sql_tono(dias_mora=mora)} AS despues
+                    FROM clientes WHERE {VENCIMIENTO} IS NOT NULL
+                ) WHERE antes != despues
+                """,
+                parametros,
+            ).fetchall()
+            actualizados = self._conn.execute(
+                f"UPDATE clientes SET dias_mora = {mora} WHERE {VENCIMIENTO} IS NOT NULL AND dias_mora != {mora}",
+                parametros,
+            ).rowcount
+            self._conn.execute(
+                "INSERT INTO meta VALUES ('envejecido_al', :corte)"
+                " ON CONFLICT(clave) DO UPDATE SET valor = excluded.valor",
+                parametros,
+            )
+            if actualizados:
+                # Cambian los tramos y sumas de mora; el índice de nombres sigue valiendo.
+                # Se descartan con el candado tomado y antes del commit: nadie los rearma
+                # con las filas sin envejecer
+                self._agregados = None
+        metricas.contar("store_filas_total", actualizados, operacion="escritura")
+        return {
+            "revisados": revisados,
+            "actualizados": actualizados,
+            "cambios_tono": [tuple(fila) for fila in cambios_tono],
+        }
+
+    def envejecido_al(self):
+        with self._lock:
+            fila = self._conn.execute("SELECT valor FROM meta WHERE clave = 'envejecido_al'").fetchone()
+        return date.fromisoformat(fila[0]) if fila else None
+
+    def buscar_nombres(self, nombre, limite=5):
+        with self._lock:
+            self._sincronizar_derivados()
+            if self._indice is None:
+                self._indice = IndiceNombres()
+                self._indice.cargar(c for (c,) in self._conn.execute("SELECT nombre_norm FROM clientes ORDER BY id"))
+                if self._profundidad > 0:
+                    self._cambios.append(None)
+            similares = self._indice.buscar(nombre, limite)
+            if not similares:
+                return []
+            nombres = dict(self._conn.execute(
+                f"SELECT nombre_norm, nombre FROM clientes WHERE nombre_norm IN ({', '.join('?' * len(similares))})",
+                [clave for clave, _ in similares],
+            ).fetchall())
+        return [(nombres[clave], similitud) for clave, similitud in similares if clave in nombres]
+
+    def iterar(self, tamano_lote=500):
+        ultimo_id = 0
+        while True:
+            # Paginación por clave: cada lote es una búsqueda sobre la PK
+            with self._lock:
+                filas = self._conn.execute(
+                    f"SELECT id, {', '.join(COLUMNAS)} FROM clientes WHERE id > ? ORDER BY id LIMIT ?",
+                    (ultimo_id, tamano_lote),
+                ).fetchall()
+            if not filas:
+                return
+            for fila in filas:
+                yield dict(fila)
+            ultimo_id = filas[-1]['id']
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ==========================================
+# 🔒 BLOQUEO ENTRE PROCESOS
+# ==========================================
+
+try:
+    import fcntl
+
+    def _bloquear(archivo):
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX)
+
+    def _desbloquear(archivo):
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _bloquear(archivo):
+        archivo.seek(0)
+        while True:
+            try:
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK se rinde tras ~10 s; se sigue esperando
+
+    def _desbloquear(archivo):
+        archivo.seek(0)
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class BloqueoArchivo:
+    """Candado exclusivo entre procesos sobre un archivo; reentrante dentro del proceso."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.RLock()
+        self._nivel = 0
+        self._archivo = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._nivel == 0:
+            self._archivo = open(self.ruta, "a+b")
+            _bloquear(self._archivo)
+        self._nivel += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._nivel -= 1
+        if self._nivel == 0:
+            _desbloquear(self._archivo)
+            self._archivo.close()
+        self._lock.release()
+
+
+# ==========================================
+# 📄 BACKEND CSV CON DIARIO (compatibilidad)
+# ==========================================
+
+def _linea_diario(registro: dict) -> bytes:
+    datos = json.dumps(registro, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return b"%08x " % zlib.crc32(datos) + datos + b"\n"
+
+
+class CSVClienteStore(ClienteStore):
+    """
+    Backend sobre el CSV original con un diario de escritura anticipada.
+
+    Cada commit agrega un registro al diario (`<csv>.journal`) con el estado
+    final de las filas tocadas y hace fsync; el CSV es solo la última
+    instantánea. Las escrituras sueltas pasan por un único hilo escritor que
+    las agrupa en un commit cada `ventana_commit_s`. Un candado de archivo
+    serializa los commits entre procesos y, antes de escribir, cada proceso
+    aplica lo que los demás agregaron al diario: no se pierden actualizaciones.
+    Al superar `max_registros_diario` el diario se compacta en el CSV.
+    """
+
+    def __init__(self, ruta: str = CSV_PATH, ventana_commit_s: float = 0.002,
+                 max_registros_diario: int = 1000):
+        self.ruta = ruta
+        self.ruta_diario = ruta + ".journal"
+        self.ventana_commit_s = ventana_commit_s
+        self.max_registros_diario = max_registros_diario
+        self.commits = 0
+        self._lock = threading.RLock()
+        self._bloqueo = BloqueoArchivo(ruta + ".lock")
+        self._profundidad = 0
+        self._dueno = None
+        self._pendientes = []   # operaciones del commit en curso
+        self._deshacer = {}     # clave -> fila previa, para revertir
+        self._filas = {}
+        self._agregados = None  # derivados de lo confirmado; se arman en la primera consulta
+        self._indice = None
+        self._cartera = None
+        self._diario_ino = None
+        self._diario_offset = 0
+        self._registros_diario = 0
+        self._cola = queue.Queue()
+        self._escritor = None
+        with self._lock, self._bloqueo:
+            self._recargar(reparar=True)
+
+    # ------------------------------------------------------------------
+    # Diario: recuperación y sincronización
+    # ------------------------------------------------------------------
+
+    def _recargar(self, reparar: bool = False):
+        """Carga la instantánea y reaplica el diario completo."""
+        self._filas = {}
+        self._agregados = self._indice = self._cartera = None
+        if os.path.exists(self.ruta) and os.path.getsize(self.ruta) > 0:
+            for fila in pd.read_csv(self.ruta).to_dict("records"):
+                self._filas[normalizar_nombre(fila['nombre'])] = fila
+        if not os.path.exists(self.ruta_diario):
+            open(self.ruta_diario, "ab").close()
+        self._diario_ino = os.stat(self.ruta_diario).st_ino
+        self._diario_offset = 0
+        self._registros_diario = 0
+        self._leer_diario()
+        if reparar and os.path.getsize(self.ruta_diario) > self._diario_offset:
+            # Cola de un commit interrumpido: nunca se confirmó, se descarta
+            with open(self.ruta_diario, "r+b") as f:
+                f.truncate(self._diario_offset)
+
+    def _leer_diario(self):
+        with open(self.ruta_diario, "rb") as f:
+            f.seek(self._diario_offset)
+            datos = f.read()
+        for linea in datos.splitlines(keepends=True):
+            if not linea.endswith(b"\n"):
+                break
+            crc, _, cuerpo = linea[:-1].partition(b" ")
+            try:
+                valido = int(crc, 16) == zlib.crc32(cuerpo)
+                registro = json.loads(cuerpo) if valido else None
+            except ValueError:
+                registro = None
+            if registro is None:
+                break  # lo que sigue a un registro dañado no es confiable
+            for op in registro["ops"]:
+                self._reflejar(op["clave"], self._filas.get(op["clave"]), op.get("fila"))
+                if op["op"] == "poner":
+                    self._filas[op["clave"]] = op["fila"]
+                else:
+                    self._filas.pop(op["clave"], None)
+            self._diario_offset += len(linea)
+            self._registros_diario += 1
+
+    def _ponerse_al_dia(self):
+        """Aplica lo que otros procesos agregaron al diario desde la última lectura."""
+        try:
+            estado = os.stat(self.ruta_diario)
+        except FileNotFoundError:
+            return
+        if estado.st_ino == self._diario_ino and estado.st_size == self._diario_offset:
+            return
+        with self._lock:
+            if estado.st_ino != self._diario_ino:
+                # Otro proceso compactó: nueva instantánea y nuevo diario
+                with self._bloqueo:
+                    self._recargar()
+            else:
+                self._leer_diario()
+
+    def _anexar(self, registros):
+        datos = b"".join(_linea_diario({"ops": ops}) for ops in registros if ops)
+        if not datos:
+            return
+        with open(self.ruta_diario, "ab") as f:
+            f.write(datos)
+            f.flush()
+            os.fsync(f.fileno())
+        self._diario_offset += len(datos)
+        self._registros_diario += sum(1 for ops in registros if ops)
+        self.commits += 1
+        metricas.contar("store_filas_total", sum(len(ops) for ops in registros), operacion="escritura")
+        metricas.contar("bytes_escritos_total", len(datos), destino="diario_csv")
+        if self._registros_diario >= self.max_registros_diario:
+            self.compactar()
+
+    def compactar(self):
+        """Escribe la instantánea en el CSV y empieza un diario vacío."""
+        with self._lock, self._bloqueo:
+            self._ponerse_al_dia()
+            temporal = self.ruta + ".tmp"
+            pd.DataFrame(list(self._filas.values()), columns=COLUMNAS + [VENCIMIENTO]).to_csv(temporal, index=False)
+            metricas.contar("bytes_escritos_total", os.path.getsize(temporal), destino="csv")
+            os.replace(temporal, self.ruta)
+            # Si el proceso cae aquí, reaplicar el diario viejo sobre la
+            # instantánea nueva da el mismo resultado (operaciones idempotentes)
+            with open(self.ruta_diario + ".tmp", "wb") as f:
+                os.fsync(f.fileno())
+            os.replace(self.ruta_diario + ".tmp", self.ruta_diario)
+            self._diario_ino = os.stat(self.ruta_diario).st_ino
+            self._diario_offset = 0
+            self._registros_diario = 0
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def _poner(self, clave, fila):
+        self._deshacer.setdefault(clave, self._filas.get(clave))
+        self._filas[clave] = fila
+        self._pendientes.append({"op": "poner", "clave": clave, "fila": fila})
+
+    def _borrar(self, clave):
+        self._deshacer.setdefault(clave, self._filas.get(clave))
+        self._filas.pop(clave, None)
+        self._pendientes.append({"op": "borrar", "clave": clave})
+
+    def _revertir(self):
+        for clave, fila in self._deshacer.items():
+            if fila is None:
+                self._filas.pop(clave, None)
+            else:
+                self._filas[clave] = fila
+        self._pendientes, self._deshacer = [], {}
+
+    def _reflejar(self, clave, anterior, nuevo):
+        """Lleva un cambio confirmado a los agregados y al índice de nombres."""
+        self._cartera = None
+        if self._agregados is not None:
+            self._agregados.cambiar(anterior, nuevo)
+        if self._indice is not None:
+            self._indice.cambiar(clave, anterior, nuevo)
+
+    def _tomar_pendientes(self):
+        for clave, previa in self._deshacer.items():
+            self._reflejar(clave, previa, self._filas.get(clave))
+        ops = self._pendientes
+        self._pendientes, self._deshacer = [], {}
+        return ops
+
+    @contextmanager
+    def transaccion(self):
+        with self._lock:
+            if self._profundidad == 0:
+                self._bloqueo.__enter__()
+                self._ponerse_al_dia()
+                self._dueno = threading.get_ident()
+            self._profundidad += 1
+            try:
+                yield self
+            except BaseException:
+                self._profundidad -= 1
+                if self._profundidad == 0:
+                    self._revertir()
+                    self._dueno = None
+                    self._bloqueo.__exit__(None, None, None)
+                raise
+            else:
+                self._profundidad -= 1
+                if self._profundidad == 0:
+                    try:
+                        # La transacción completa es un único registro del diario
+                        self._anexar([self._tomar_pendientes()])
+                    except BaseException:
+                        self._recargar()
+                        raise
+                    finally:
+                        self._dueno = None
+                        self._bloqueo.__exit__(None, None, None)
+
+    def _escribir(self, aplicar):
+        """Ejecuta `aplicar` en el commit en curso o lo encola al hilo escritor."""
+        if self._profundidad > 0 and self._dueno == threading.get_ident():
+            return aplicar()
+        futuro = Future()
+        self._cola.put((aplicar, futuro))
+        if self._escritor is None:
+            with self._lock:
+                if self._escritor is None:
+                    self._escritor = threading.Thread(target=self._bucle_escritor, name="escritor-csv", daemon=True)
+                    self._escritor.start()
+        return futuro.result()
+
+    def _bucle_escritor(self):
+        while True:
+            primero = self._cola.get()
+            if primero is None:
+                return
+            lote, fin = [primero], False
+            limite = time.monotonic() + self.ventana_commit_s
+            while not fin:
+                try:
+                    item = self._cola.get(timeout=max(limite - time.monotonic(), 0.0001))
+                except queue.Empty:
+                    break
+                if item is None:
+                    fin = True
+                else:
+                    lote.append(item)
+            self._commit_grupal(lote)
+            if fin:
+                return
+
+    def _commit_grupal(self, lote):
+        """Aplica un lote de escrituras y las confirma con un solo fsync."""
+        resultados, registros = [], []
+        with self._lock, self._bloqueo:
+            self._ponerse_al_dia()
+            for aplicar, futuro in lote:
+                try:
+                    resultados.append((futuro, aplicar(), None))
+                    registros.append(self._tomar_pendientes())
+                except Exception as e:
+                    self._revertir()
+                    resultados.append((futuro, None, e))
+            try:
+                self._anexar(registros)
+            except Exception as e:
+                self._recargar()
+                resultados = [(futuro, None, e) for futuro, _, _ in resultados]
+        for futuro, valor, error in resultados:
+            if error is not None:
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(valor)
+
+    def registrar(self, nombre, deuda, dias_mora, producto):
+        nombre = str(nombre).strip()
+        clave = normalizar_nombre(nombre)
+
+        return self._escribir(lambda: self._poner_cliente(clave, nombre, deuda, dias_mora, producto))
+
+    def _poner_cliente(self, clave, nombre, deuda, dias_mora, producto, fecha_registro=None, vencimiento=None):
+        """Upsert en el commit en curso; conserva la fecha_registro de un cliente existente."""
+        previo = self._filas.get(clave)
+        self._poner(clave, {
+            'nombre': nombre,
+            'deuda': float(deuda),
+            'dias_mora': int(dias_mora),
+            'producto': producto,
+            'fecha_registro': previo['fecha_registro'] if previo else fecha_registro or _ahora(),
+            VENCIMIENTO: vencimiento or _vencimiento(dias_mora),
+        })
+        return previo is None
+
+    def registrar_lote(self, filas):
+        insertados = 0
+        fechas_registro, vencimientos = _fechas_lote(filas)
+        with self.transaccion():
+            for (nombre, deuda, dias_mora, producto), fecha_registro, vencimiento in zip(
+                filas[['nombre', 'deuda', 'dias_mora', 'producto']].itertuples(index=False), fechas_registro, vencimientos
+            ):
+                nombre = str(nombre).strip()
+                insertados += self._poner_cliente(
+                    normalizar_nombre(nombre), nombre, deuda, dias_mora, producto, fecha_registro, vencimiento
+                )
+        return insertados, len(filas) - insertados
+
+    def actualizar(self, nombre, deuda=None, dias_mora=None):
+        clave = normalizar_nombre(nombre)
+
+        def aplicar():
+            fila = self._filas.get(clave)
+            if fila is None:
+                return False
+            fila = dict(fila)
+            if deuda is not None:
+                fila['deuda'] = float(deuda)
+            if dias_mora is not None:
+                fila['dias_mora'] = int(dias_mora)
+                fila[VENCIMIENTO] = _vencimiento(dias_mora)
+            self._poner(clave, fila)
+            return True
+
+        return self._escribir(aplicar)
+
+    def eliminar(self, nombre):
+        clave = normalizar_nombre(nombre)
+
+        def aplicar():
+            if clave not in self._filas:
+                return False
+            self._borrar(clave)
+            return True
+
+        return self._escribir(aplicar)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def obtener(self, nombre):
+        self._ponerse_al_dia()
+        fila = self._filas.get(normalizar_nombre(nombre))
+        return {c: fila.get(c) for c in COLUMNAS} if fila else None
+
+    def listar(self):
+        self._ponerse_al_dia()
+        return pd.DataFrame(list(self._filas.values()), columns=COLUMNAS)
+
+    def contar(self):
+        self._ponerse_al_dia()
+        return len(self._filas)
+
+    def agregados(self, por=None):
+        self._ponerse_al_dia()
+        with self._lock:
+            if self._agregados is None:
+                agregados = AgregadosCartera()
+                agregados.cargar(self.cartera().a_dataframe(["deuda", "dias_mora", "producto"]))
+                # A mitad de una transacción propia se descuenta lo no confirmado
+                for clave, previa in self._deshacer.items():
+                    agregados.cambiar(self._filas.get(clave), previa)
+                self._agregados = agregados
+            return self._agregados.resumen(por)
+
+    def envejecer_mora(self, corte=None):
+        # Casi todas las filas cambian: en vez de un registro enorme en el
+        # diario se escribe una instantánea nueva bajo el candado de archivo
+        with self._lock, self._bloqueo:
+            if self._profundidad > 0:
+                raise RuntimeError("envejecer_mora no puede ejecutarse dentro de una transacción")
+            self._ponerse_al_dia()
+            claves = list(self._filas)
+            df = pd.DataFrame([self._filas[c] for c in claves], columns=COLUMNAS + [VENCIMIENTO])
+            mora, vencimientos = _mora_al(corte, df[VENCIMIENTO], df['dias_mora'], df['fecha_registro'])
+            cambia = mora != df['dias_mora'].to_numpy()
+            sin_vencimiento = df[VENCIMIENTO].isna().to_numpy()
+            indices = np.flatnonzero(cambia | sin_vencimiento)
+            for i, dias, vencimiento in zip(
+                indices.tolist(), mora[indices].tolist(), vencimientos.to_numpy()[indices].tolist()
+            ):
+                self._filas[claves[i]] = {**self._filas[claves[i]], 'dias_mora': dias, VENCIMIENTO: vencimiento}
+            if (cambia | sin_vencimiento).any():
+                self._agregados = self._cartera = None
+                self.compactar()
+        metricas.contar("store_filas_total", int(cambia.sum()), operacion="escritura")
+        antes = clasificar_tono_vectorizado(df['deuda'], df['dias_mora'])
+        despues = clasificar_tono_vectorizado(df['deuda'], mora)
+        cambia_tono = antes != despues
+        return {
+            "revisados": len(df),
+            "actualizados": int(cambia.sum()),
+            "cambios_tono": list(zip(df['nombre'][cambia_tono], antes[cambia_tono], despues[cambia_tono])),
+        }
+
+    def cartera(self):
+        self._ponerse_al_dia()
+        with self._lock:
+            if self._deshacer:
+                # A mitad de una transacción propia: incluye lo no confirmado y no se comparte
+                return CarteraCompacta.desde_dataframe(pd.DataFrame(list(self._filas.values()), columns=COLUMNAS))
+            if self._cartera is None:
+                self._cartera = CarteraCompacta.desde_dataframe(
+                    pd.DataFrame(list(self._filas.values()), columns=COLUMNAS)
+                )
+            return self._cartera
+
+    def buscar_nombres(self, nombre, limite=5):
+        self._ponerse_al_dia()
+        with self._lock:
+            if self._indice is None:
+                indice = IndiceNombres()
+                indice.cargar(self._filas)
+                for clave, previa in self._deshacer.items():
+                    indice.cambiar(clave, self._filas.get(clave), previa)
+                self._indice = indice
+            return [
+                (self._filas[clave]['nombre'], similitud)
+                for clave, similitud in self._indice.buscar(nombre, limite) if clave in self._filas
+            ]
+
+    def iterar(self, tamano_lote=500):
+        self._ponerse_al_dia()
+        for clave, fila in list(self._filas.items()):
+            yield {'id': clave, **{c: fila.get(c) for c in COLUMNAS}}
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._cola.put(None)
+            self._escritor.join()
+            self._escritor = None
+
+
+# ==========================================
+# 🔌 INSTANCIA COMPARTIDA
+# ==========================================
+
+_store: Optional[ClienteStore] = None
+_store_lock = threading.Lock()
+
+
+def crear_store(backend: str = STORE_BACKEND) -> ClienteStore:
+    """Crea el backend configurado. Migra clientes.csv a SQLite la primera vez."""
+    if backend == "csv":
+        return CSVClienteStore(CSV_PATH)
+
+    store = SQLiteClienteStore(DB_PATH)
+    store.migrar_csv(CSV_PATH)
+    return store
+
+
+def get_store() -> ClienteStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = crear_store()
+    return _store
+
+
+def set_store(store: Optional[ClienteStore]):
+    """Reemplaza la instancia compartida (útil en pruebas)."""
+    global _store
+    _store = store
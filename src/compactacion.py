@@ -0,0 +1,87 @@
+"""
+Política de historial de la conversación.
+
+Antes de cada llamada al modelo:
+* las tablas de turnos anteriores (TABLA_DATOS) se reemplazan por un marcador,
+* si el historial supera el presupuesto de tokens, los turnos más antiguos se
+  condensan en un resumen y se eliminan del estado.
+
+Los cambios se devuelven como actualizaciones del estado (mensajes con el
+mismo id o RemoveMessage), así el checkpointer tampoco crece sin límite.
+"""
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+
+PRESUPUESTO_TOKENS_HISTORIAL = int(os.environ.get("COBRA_PRESUPUESTO_HISTORIAL", "3000"))
+MAX_CARACTERES_RESUMEN = 2000
+TABLA_OMITIDA = "CONSULTA_ANTERIOR_OMITIDA | vuelve a llamar a leer_base_datos si necesitas los datos"
+
+
+def estimar_tokens(mensajes) -> int:
+    """Aproximación barata: ~4 caracteres por token más un costo fijo por mensaje."""
+    total = 0
+    for m in mensajes:
+        total += len(m.text) // 4 + 4
+        for call in getattr(m, "tool_calls", None) or []:
+            total += len(str(call.get("args", ""))) // 4 + 4
+    return total
+
+
+def _recortar(texto: str, largo: int = 150) -> str:
+    texto = " ".join(texto.split())
+    return texto if len(texto) <= largo else texto[:largo - 1] + "…"
+
+
+def resumir_turnos(mensajes) -> str:
+    """Resumen extractivo: pedido del usuario, resultado de herramientas y respuesta."""
+    lineas = []
+    for m in mensajes:
+        if isinstance(m, HumanMessage):
+            lineas.append(f"- Usuario: {_recortar(m.text)}")
+        elif isinstance(m, ToolMessage) and m.content != TABLA_OMITIDA:
+            lineas.append(f"  ↳ {_recortar(m.text.split(chr(10))[0], 120)}")
+        elif isinstance(m, AIMessage) and m.text.strip():
+            lineas.append(f"  Bot: {_recortar(m.text)}")
+    return "\n".join(lineas)
+
+
+def _unir_resumen(previo: str, nuevo: str) -> str:
+    resumen = "\n".join(parte for parte in (previo, nuevo) if parte)
+    if len(resumen) <= MAX_CARACTERES_RESUMEN:
+        return resumen
+    # Se conservan las líneas más recientes
+    resumen = resumen[-MAX_CARACTERES_RESUMEN:]
+    return resumen[resumen.find("\n") + 1:]
+
+
+def compactar_historial(mensajes, resumen: str = "", presupuesto: int = PRESUPUESTO_TOKENS_HISTORIAL):
+    """
+    Retorna (mensajes_para_el_modelo, resumen, actualizaciones_de_estado).
+    El turno actual (desde el último mensaje del usuario) nunca se recorta.
+    """
+    inicios = [i for i, m in enumerate(mensajes) if isinstance(m, HumanMessage)]
+    turno_actual = inicios[-1] if inicios else 0
+
+    visibles, actualizaciones = [], []
+    for i, m in enumerate(mensajes):
+        if i < turno_actual and isinstance(m, ToolMessage) and "TABLA_DATOS" in m.text:
+            m = ToolMessage(content=TABLA_OMITIDA, tool_call_id=m.tool_call_id, id=m.id, name=m.name)
+            actualizaciones.append(m)
+        visibles.append(m)
+
+    # Primer inicio de turno desde el cual el historial entra en el presupuesto
+    corte = turno_actual
+    for inicio in inicios:
+        if estimar_tokens(visibles[inicio:]) <= presupuesto:
+            corte = inicio
+            break
+
+    if corte > 0:
+        resumen = _unir_resumen(resumen, resumir_turnos(visibles[:corte]))
+        eliminados = {m.id for m in visibles[:corte]}
+        actualizaciones = [m for m in actualizaciones if m.id not in eliminados]
+        actualizaciones += [RemoveMessage(id=m.id) for m in visibles[:corte]]
+        visibles = visibles[corte:]
+
+    return visibles, resumen, actualizaciones
@@ -0,0 +1,82 @@
+"""
+Enrutamiento de los turnos del agente entre dos niveles de modelo.
+
+* ligero: elegir herramientas y confirmar lo que hicieron. Modelo más barato,
+  temperatura 0, pocas palabras de salida y un prompt sin las reglas de
+  redacción del speech.
+* completo: los turnos en que el usuario pide un texto redactado. El speech
+  tras registrar un cliente lo arma generar_speech (plantillas, caché o
+  modelo), así que ese turno es una confirmación más.
+
+Cada decisión queda en el logger "enrutamiento" (nivel INFO) con su nivel,
+motivo y latencia, y con COBRA_METRICAS=1 también en las métricas junto con
+los tokens; resumen_enrutamiento estima lo que se ahorró.
+"""
+import logging
+import os
+import re
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+import metricas
+
+ENRUTAMIENTO_ACTIVO = os.environ.get("COBRA_ENRUTAMIENTO", "1") != "0"
+NIVELES = ("ligero", "completo")
+
+_log = logging.getLogger(__name__)
+
+# Pedidos que pueden terminar en un texto redactado por el agente
+_PIDE_REDACCION = re.compile(r"speech|mensaje|redact|escrib|carta|correo|gui[oó]n", re.IGNORECASE)
+
+
+def elegir_nivel(mensajes) -> tuple:
+    """(nivel, motivo) para el próximo turno del agente según el historial."""
+    if not ENRUTAMIENTO_ACTIVO:
+        return "completo", "desactivado"
+    ultimo = mensajes[-1]
+    if isinstance(ultimo, ToolMessage):
+        return "ligero", "confirmacion"
+    if isinstance(ultimo, HumanMessage) and _PIDE_REDACCION.search(ultimo.text):
+        return "completo", "redaccion"
+    return "ligero", "seleccion_herramienta"
+
+
+def registrar_ruta(nivel: str, motivo: str, segundos: float, respuesta):
+    """Deja constancia de la decisión, su latencia y los tokens de la respuesta."""
+    _log.info("turno del agente: nivel=%s motivo=%s segundos=%.3f", nivel, motivo, segundos)
+    metricas.contar("enrutamiento_total", nivel=nivel, motivo=motivo)
+    metricas.observar("enrutamiento_segundos", segundos, nivel=nivel)
+    uso = getattr(respuesta, "usage_metadata", None) or {}
+    metricas.contar("enrutamiento_tokens_total", uso.get("input_tokens", 0), nivel=nivel, tipo="entrada")
+    metricas.contar("enrutamiento_tokens_total", uso.get("output_tokens", 0), nivel=nivel, tipo="salida")
+
+
+def resumen_enrutamiento() -> dict:
+    """
+    Turnos, latencia y tokens promedio por nivel. Si ambos niveles tienen
+    turnos, "ahorro" estima lo que costaron de menos los turnos ligeros
+    frente al promedio del completo (los turnos completos suelen ser más
+    largos, así que es una cota superior).
+    """
+    registro = metricas.get_registro()
+    series = registro.resumen()["series"]
+    resumen = {}
+    for nivel in NIVELES:
+        serie = series.get(f"enrutamiento_segundos[nivel={nivel}]")
+        turnos = serie["cuenta"] if serie else 0
+        resumen[nivel] = {
+            "turnos": turnos,
+            "segundos_promedio": serie["suma"] / turnos if turnos else 0.0,
+            **{
+                f"tokens_{tipo}_promedio": registro.total("enrutamiento_tokens_total", nivel=nivel, tipo=tipo) / turnos
+                if turnos else 0.0
+                for tipo in ("entrada", "salida")
+            },
+        }
+    ligero, completo = resumen["ligero"], resumen["completo"]
+    if ligero["turnos"] and completo["turnos"]:
+        resumen["ahorro"] = {
+            clave: round(ligero["turnos"] * (completo[clave] - ligero[clave]), 4)
+            for clave in ("segundos_promedio", "tokens_entrada_promedio", "tokens_salida_promedio")
+        }
+    return resumen
@@ -0,0 +1,86 @@
+"""
+Envejecimiento diario de la mora.
+
+dias_mora se guarda como un número, pero la mora corre sola: cada cliente
+lleva su fecha de vencimiento (hoy - dias_mora al registrarlo o al corregir
+la mora) y este proceso recalcula los días de toda la cartera a una fecha de
+corte en una sola pasada vectorizada. Solo se escriben las filas cuya mora
+cambió; de las que además cambian de tono se descartan los speeches en caché
+y los agregados de la cartera se recalculan en la próxima consulta.
+
+Es idempotente: ejecutarlo dos veces el mismo día no cambia nada, y
+envejecer_si_pendiente ni siquiera escribe si el store ya registró el corte
+de hoy (la UI lo usa al arrancar).
+
+Uso (p. ej. desde cron, una vez al día):
+    python src/envejecimiento.py
+    python src/envejecimiento.py --fecha 2024-07-01
+"""
+import argparse
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional
+
+import metricas
+from cliente_store import ClienteStore, get_store
+
+
+@dataclass
+class ResultadoEnvejecimiento:
+    corte: date
+    revisados: int = 0
+    actualizados: int = 0
+    speeches_invalidados: int = 0
+    cambios_tono: List[tuple] = field(default_factory=list)  # (nombre, tono_antes, tono_despues)
+
+    def resumen(self) -> str:
+        return (
+            f"MORA_ACTUALIZADA | corte={self.corte.isoformat()} | revisados={self.revisados}"
+            f" | actualizados={self.actualizados} | cambios_tono={len(self.cambios_tono)}"
+        )
+
+
+def envejecer_cartera(corte: Optional[date] = None, store: Optional[ClienteStore] = None,
+                      cache=None) -> ResultadoEnvejecimiento:
+    """Lleva la mora de toda la cartera a `corte` (hoy por defecto)."""
+    if cache is None:
+        from cache_speech import get_cache
+        cache = get_cache()
+    corte = corte or date.today()
+    store = store or get_store()
+
+    with metricas.cronometrar("proceso_segundos", proceso="envejecimiento"):
+        cambios = store.envejecer_mora(corte)
+    resultado = ResultadoEnvejecimiento(
+        corte=corte,
+        revisados=cambios["revisados"],
+        actualizados=cambios["actualizados"],
+        cambios_tono=cambios["cambios_tono"],
+    )
+    if resultado.cambios_tono:
+        resultado.speeches_invalidados = cache.invalidar_varios(n for n, _, _ in resultado.cambios_tono)
+    metricas.contar("cambios_tono_total", len(resultado.cambios_tono))
+    return resultado
+
+
+def envejecer_si_pendiente(corte: Optional[date] = None, store: Optional[ClienteStore] = None,
+                           cache=None) -> Optional[ResultadoEnvejecimiento]:
+    """Como envejecer_cartera, pero None sin escribir si la cartera ya está a `corte`."""
+    corte = corte or date.today()
+    store = store or get_store()
+    if store.envejecido_al() == corte:
+        return None
+    return envejecer_cartera(corte, store, cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Actualiza los días de mora de toda la cartera.")
+    parser.add_argument("--fecha", type=date.fromisoformat, default=None,
+                        help="Fecha de corte AAAA-MM-DD (por defecto, hoy)")
+    args = parser.parse_args()
+
+    print(envejecer_cartera(args.fecha).resumen())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Generación de speeches para toda la cartera, fuera del chat.
+
+Los clientes se leen del ClienteStore en streaming y se reparten entre un
+número fijo de workers asíncronos; cada llamada al modelo pasa por un
+limitador de tasa y se reintenta con backoff ante fallos transitorios.
+Con un motor de plantillas (plantillas.py) el speech se arma localmente y el
+modelo solo se llama para los clientes sin plantilla que aplique. Los
+resultados se entregan a un sink a medida que terminan.
+
+Para ejecutarlo desde la terminal (con reanudación) ver campana.py.
+"""
+import asyncio
+import json
+import time
+from typing import Iterable, Optional
+
+from prompts import mensajes_speech
+from tonos import clasificar_tono
+from resiliencia import TokenBucket, reintentar_async
+
+
+class SinkLista:
+    """Acumula los resultados en memoria (pruebas y lotes pequeños)."""
+
+    def __init__(self):
+        self.resultados = []
+
+    def escribir(self, resultado: dict):
+        self.resultados.append(resultado)
+
+    def cerrar(self):
+        pass
+
+
+class SinkJSONL:
+    """Escribe un resultado por línea y hace flush inmediato."""
+
+    def __init__(self, ruta: str):
+        self._archivo = open(ruta, "a", encoding="utf-8")
+
+    def escribir(self, resultado: dict):
+        self._archivo.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+        self._archivo.flush()
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+def _uso_tokens(respuesta) -> dict:
+    uso = getattr(respuesta, "usage_metadata", None) or {}
+    return {
+        "tokens_entrada": uso.get("input_tokens", 0),
+        "tokens_salida": uso.get("output_tokens", 0),
+    }
+
+
+async def generar_speech(llm, cliente: dict, limitador: Optional[TokenBucket] = None,
+                         reintentos: int = 4, backoff_base: float = 0.5, cache=None,
+                         regenerar: bool = False, motor=None) -> dict:
+    """
+    Genera el speech de un cliente y retorna el registro de resultado.
+    Con `motor` se intenta primero una plantilla local; con `cache` se
+    reutiliza el speech de un perfil idéntico, salvo que se pida `regenerar`.
+    """
+
+    async def llamar():
+        if limitador is not None:
+            await limitador.adquirir()
+        return await llm.ainvoke(mensajes_speech(cliente))
+
+    inicio = time.perf_counter()
+    resultado = {
+        "id": cliente.get("id"),
+        "nombre": cliente["nombre"],
+        "tono": clasificar_tono(cliente["deuda"], cliente["dias_mora"]),
+        "plantilla": False,
+    }
+    local = motor.generar(cliente, regenerar) if motor is not None else None
+    speech = None
+    if cache is not None and not regenerar and local is None:
+        # El caché es SQLite síncrono: fuera del loop que comparten los workers y el limitador
+        speech = await asyncio.to_thread(cache.obtener, cliente)
+    if local is not None:
+        resultado.update(speech=local, error=None, tokens_entrada=0, tokens_salida=0, cache=False,
+                         plantilla=True)
+    elif speech is not None:
+        resultado.update(speech=speech, error=None, tokens_entrada=0, tokens_salida=0, cache=True)
+    else:
+        try:
+            respuesta = await reintentar_async(llamar, intentos=reintentos, base=backoff_base)
+            resultado.update(speech=respuesta.text, error=None, cache=False, **_uso_tokens(respuesta))
+            if cache is not None:
+                await asyncio.to_thread(cache.guardar, cliente, respuesta.text)
+        except Exception as e:
+            resultado.update(speech=None, error=f"{type(e).__name__}: {e}", tokens_entrada=0, tokens_salida=0,
+                             cache=False)
+    resultado["latencia_s"] = round(time.perf_counter() - inicio, 4)
+    return resultado
+
+
+async def generar_speeches(llm, clientes: Iterable[dict], sink, concurrencia: int = 8,
+                           limitador: Optional[TokenBucket] = None, reintentos: int = 4,
+                           backoff_base: float = 0.5, cache=None, motor=None) -> dict:
+    """
+    Procesa `clientes` con a lo sumo `concurrencia` llamadas simultáneas.
+    La cola acotada evita leer la cartera más rápido de lo que se consume.
+    Retorna un resumen con totales, fallos y duración.
+    """
+    cola = asyncio.Queue(maxsize=concurrencia * 2)
+    resumen = {"procesados": 0, "fallidos": 0, "desde_cache": 0, "desde_plantilla": 0,
+               "tokens_entrada": 0, "tokens_salida": 0}
+    inicio = time.perf_counter()
+
+    async def worker():
+        while True:
+            cliente = await cola.get()
+            try:
+                if cliente is None:
+                    return
+                resultado = await generar_speech(llm, cliente, limitador, reintentos, backoff_base, cache,
+                                                 motor=motor)
+                sink.escribir(resultado)
+                resumen["procesados"] += 1
+                resumen["fallidos"] += resultado["error"] is not None
+                resumen["desde_cache"] += resultado["cache"]
+                resumen["desde_plantilla"] += resultado["plantilla"]
+                resumen["tokens_entrada"] += resultado["tokens_entrada"]
+                resumen["tokens_salida"] += resultado["tokens_salida"]
+            finally:
+                cola.task_done()
+
+    async def productor():
+        for cliente in clientes:
+            await cola.put(cliente)
+        for _ in range(concurrencia):
+            await cola.put(None)
+
+    # Si un worker falla (p. ej. el sink), gather cancela al resto y al productor
+    tareas = [asyncio.create_task(productor())]
+    tareas += [asyncio.create_task(worker()) for _ in range(concurrencia)]
+    try:
+        await asyncio.gather(*tareas)
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+
+    resumen["duracion_s"] = round(time.perf_counter() - inicio, 3)
+    return resumen
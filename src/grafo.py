@@ -0,0 +1,307 @@
+"""
+Grafo LangGraph del agente: router local, agente y nodo de herramientas.
+
+Cada turno del agente va al nivel de modelo ligero o al completo según
+enrutamiento.elegir_nivel. Los modelos con herramientas, el checkpointer y
+el grafo compilado se construyen en el primer uso (get_modelo_agente, get_checkpointer, get_app) y
+se pueden reemplazar con los set_* correspondientes en pruebas y benchmarks.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from typing import Annotated, List, Optional, TypedDict
+
+from typing_extensions import NotRequired
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages
+
+from checkpointer import SQLiteSaverAcotado, CHECKPOINT_PATH
+from cliente_store import get_store
+from compactacion import compactar_historial
+from enrutamiento import NIVELES, elegir_nivel, registrar_ruta
+from herramientas import HERRAMIENTAS_ESCRITURA, TOOLS, TOOLS_POR_NOMBRE
+from intenciones import detectar_intencion, respuesta_local
+from metricas import cronometrar
+from modelos import get_llm, get_llm_ligero
+from prompts import SYSTEM_PROMPT, SYSTEM_PROMPT_LIGERO
+
+# ==========================================
+# 🤖 MODELO DEL AGENTE
+# ==========================================
+
+_modelos_agente = {}  # nivel -> modelo con herramientas
+_lock = threading.Lock()
+
+
+def get_modelo_agente(nivel: str = "completo"):
+    """Modelo compartido del nivel con las herramientas enlazadas; se crea en el primer turno."""
+    modelo = _modelos_agente.get(nivel)
+    if modelo is None:
+        with _lock:
+            modelo = _modelos_agente.get(nivel)
+            if modelo is None:
+                llm = get_llm() if nivel == "completo" else get_llm_ligero()
+                modelo = _modelos_agente[nivel] = llm.bind_tools(TOOLS)
+    return modelo
+
+
+def set_modelo_agente(modelo, nivel: Optional[str] = None):
+    """
+    Reemplaza el modelo del agente de un nivel, o de ambos si no se indica
+    (útil en pruebas y benchmarks). None vuelve al modelo por defecto.
+    """
+    for n in ([nivel] if nivel else NIVELES):
+        if modelo is None:
+            _modelos_agente.pop(n, None)
+        else:
+            _modelos_agente[n] = modelo
+
+# ==========================================
+# 🧠 AGENTE
+# ==========================================
+
+class AgentState(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+    # Resumen de los turnos que se quitaron del historial
+    resumen: NotRequired[str]
+
+def preparar_mensajes(state: AgentState, nivel: str = "completo"):
+    """
+    Aplica la política de historial: retorna los mensajes para el modelo,
+    el resumen vigente y las actualizaciones que recortan el estado.
+    """
+    visibles, resumen, cambios = compactar_historial(state["messages"], state.get("resumen", ""))
+    prompt = SYSTEM_PROMPT if nivel == "completo" else SYSTEM_PROMPT_LIGERO
+    if resumen:
+        prompt += f"\n\nRESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{resumen}"
+    return [SystemMessage(content=prompt)] + visibles, resumen, cambios
+
+def agent_node(state: AgentState):
+    nivel, motivo = elegir_nivel(state["messages"])
+    with cronometrar("nodo_segundos", nodo="agent"):
+        messages, resumen, cambios = preparar_mensajes(state, nivel)
+        inicio = time.perf_counter()
+        respuesta = get_modelo_agente(nivel).invoke(messages)
+        registrar_ruta(nivel, motivo, time.perf_counter() - inicio, respuesta)
+        return {"messages": cambios + [respuesta], "resumen": resumen}
+
+async def agent_node_async(state: AgentState):
+    """Versión asíncrona: la espera al modelo no ocupa un hilo del sistema."""
+    nivel, motivo = elegir_nivel(state["messages"])
+    with cronometrar("nodo_segundos", nodo="agent"):
+        messages, resumen, cambios = preparar_mensajes(state, nivel)
+        inicio = time.perf_counter()
+        respuesta = await get_modelo_agente(nivel).ainvoke(messages)
+        registrar_ruta(nivel, motivo, time.perf_counter() - inicio, respuesta)
+        return {"messages": cambios + [respuesta], "resumen": resumen}
+
+def _segmentos(tool_calls):
+    """Agrupa las llamadas consecutivas del mismo tipo, respetando el orden del modelo."""
+    segmentos = []
+    for call in tool_calls:
+        escribe = call["name"] in HERRAMIENTAS_ESCRITURA
+        if segmentos and segmentos[-1][0] == escribe:
+            segmentos[-1][1].append(call)
+        else:
+            segmentos.append((escribe, [call]))
+    return segmentos
+
+def _tool_call(call):
+    # Invocar con el ToolCall completo devuelve un ToolMessage con su artifact
+    return {"name": call["name"], "args": call["args"], "id": call["id"], "type": "tool_call"}
+
+def _ejecutar_llamada(call):
+    herramienta = TOOLS_POR_NOMBRE.get(call["name"])
+    if not herramienta:
+        return ToolMessage(content="ERROR_TOOL", tool_call_id=call["id"])
+    with cronometrar("herramienta_segundos", herramienta=call["name"]):
+        return herramienta.invoke(_tool_call(call))
+
+async def _ejecutar_llamada_async(call):
+    herramienta = TOOLS_POR_NOMBRE.get(call["name"])
+    if not herramienta:
+        return ToolMessage(content="ERROR_TOOL", tool_call_id=call["id"])
+    with cronometrar("herramienta_segundos", herramienta=call["name"]):
+        return await herramienta.ainvoke(_tool_call(call))
+
+def _ejecutar_escrituras(calls):
+    """Escrituras consecutivas en una sola transacción (un único commit)."""
+    with get_store().transaccion():
+        return [_ejecutar_llamada(call) for call in calls]
+
+def _respuesta_directa(tool_calls, resultados):
+    """Si el turno solo pidió speeches, se entregan tal cual sin otra vuelta al modelo."""
+    if not all(call["name"] == "generar_speech" for call in tool_calls):
+        return []
+    if not all(r.text.startswith("SPEECH |") for r in resultados):
+        return []
+    return [AIMessage(content="\n\n".join(r.text.split("\n", 1)[1] for r in resultados))]
+
+def tools_node(state: AgentState):
+    last = state["messages"][-1]
+    resultados = []
+
+    with cronometrar("nodo_segundos", nodo="tools"):
+        for escribe, calls in _segmentos(last.tool_calls):
+            if escribe:
+                resultados += _ejecutar_escrituras(calls)
+            else:
+                resultados += [_ejecutar_llamada(call) for call in calls]
+
+    return {"messages": resultados + _respuesta_directa(last.tool_calls, resultados)}
+
+async def tools_node_async(state: AgentState):
+    """
+    Las lecturas consecutivas se ejecutan en paralelo y las escrituras
+    consecutivas se agrupan en un solo commit. Los ToolMessage conservan
+    el orden de las llamadas.
+    """
+    last = state["messages"][-1]
+    resultados = []
+
+    with cronometrar("nodo_segundos", nodo="tools"):
+        for escribe, calls in _segmentos(last.tool_calls):
+            if escribe:
+                resultados += await asyncio.to_thread(_ejecutar_escrituras, calls)
+            else:
+                resultados += await asyncio.gather(*[_ejecutar_llamada_async(call) for call in calls])
+
+    return {"messages": resultados + _respuesta_directa(last.tool_calls, resultados)}
+
+def _intencion_local(state: AgentState):
+    """Intención inequívoca del último mensaje del usuario y su llamada a herramienta."""
+    ultimo = state["messages"][-1]
+    if not isinstance(ultimo, HumanMessage):
+        return None, None
+    intencion = detectar_intencion(ultimo.text)
+    if intencion is None or intencion.herramienta is None:
+        return intencion, None
+    call = {"name": intencion.herramienta, "args": intencion.args, "id": f"local_{uuid.uuid4().hex}"}
+    return intencion, call
+
+def _mensajes_locales(intencion, call, resultado=None):
+    # La llamada y su resultado quedan en el historial como si los hubiera pedido el modelo
+    mensajes = [AIMessage(content="", tool_calls=[call]), resultado] if call else []
+    return {"messages": mensajes + [AIMessage(content=respuesta_local(intencion, resultado))]}
+
+def router_node(state: AgentState):
+    """Atiende sin modelo los saludos y comandos simples; el resto sigue al agente."""
+    intencion, call = _intencion_local(state)
+    if intencion is None:
+        return {}
+    resultado = None
+    if call:
+        escribe = call["name"] in HERRAMIENTAS_ESCRITURA
+        resultado = _ejecutar_escrituras([call])[0] if escribe else _ejecutar_llamada(call)
+    return _mensajes_locales(intencion, call, resultado)
+
+async def router_node_async(state: AgentState):
+    intencion, call = _intencion_local(state)
+    if intencion is None:
+        return {}
+    resultado = None
+    if call:
+        if call["name"] in HERRAMIENTAS_ESCRITURA:
+            resultado = (await asyncio.to_thread(_ejecutar_escrituras, [call]))[0]
+        else:
+            resultado = await _ejecutar_llamada_async(call)
+    return _mensajes_locales(intencion, call, resultado)
+
+def route_router(state: AgentState):
+    # Si la ruta local respondió, el último mensaje ya es la respuesta del bot
+    return "agent" if isinstance(state["messages"][-1], HumanMessage) else END
+
+def route(state: AgentState):
+    return "tools" if state["messages"][-1].tool_calls else END
+
+def route_tools(state: AgentState):
+    # Los speeches ya entregados por tools_node no necesitan otra vuelta al modelo
+    return END if isinstance(state["messages"][-1], AIMessage) else "agent"
+
+# ==========================================
+# 🕸️ GRAFO
+# ==========================================
+
+def crear_grafo(checkpointer=None):
+    """Compila el grafo del agente con el checkpointer indicado."""
+    workflow = StateGraph(AgentState)
+    # Cada nodo tiene versión síncrona (app.invoke) y asíncrona (app.ainvoke / astream)
+    workflow.add_node("router", RunnableLambda(router_node, afunc=router_node_async, name="router"))
+    workflow.add_node("agent", RunnableLambda(agent_node, afunc=agent_node_async, name="agent"))
+    workflow.add_node("tools", RunnableLambda(tools_node, afunc=tools_node_async, name="tools"))
+    workflow.set_entry_point("router")
+
+    workflow.add_conditional_edges("router", route_router)
+    workflow.add_conditional_edges("agent", route)
+    workflow.add_conditional_edges("tools", route_tools)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+_checkpointer: Optional[SQLiteSaverAcotado] = None
+_app = None
+
+
+def get_checkpointer() -> SQLiteSaverAcotado:
+    """Un checkpoint por hilo, en disco, con desalojo de hilos inactivos."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _lock:
+            if _checkpointer is None:
+                _checkpointer = SQLiteSaverAcotado(CHECKPOINT_PATH)
+    return _checkpointer
+
+
+def set_checkpointer(checkpointer: Optional[SQLiteSaverAcotado]):
+    """Reemplaza el checkpointer; el grafo se vuelve a compilar en el próximo uso."""
+    global _checkpointer, _app
+    with _lock:
+        _checkpointer, _app = checkpointer, None
+
+
+def get_app():
+    """Grafo compilado compartido por la UI, el servidor y los benchmarks."""
+    global _app
+    if _app is None:
+        checkpointer = get_checkpointer()
+        with _lock:
+            if _app is None:
+                _app = crear_grafo(checkpointer)
+    return _app
+
+# ==========================================
+# 📡 STREAMING DE RESPUESTAS
+# ==========================================
+
+async def transmitir_respuesta(inputs, config):
+    """
+    Recorre el grafo en modo streaming y produce eventos para la UI:
+    ("tabla", tool_message) cuando una herramienta devuelve TABLA_DATOS,
+    ("texto", acumulado) a medida que llegan tokens del agente y
+    ("fin", texto_final) con la respuesta final completa.
+    """
+    texto, mensaje_id, texto_final = "", None, ""
+
+    async for modo, dato in get_app().astream(inputs, config, stream_mode=["messages", "updates"]):
+        if modo == "messages":
+            chunk, meta = dato
+            if meta.get("langgraph_node") != "agent" or not isinstance(chunk, AIMessageChunk):
+                continue
+            if chunk.id != mensaje_id:
+                # Cada turno del agente reemplaza el texto del anterior
+                mensaje_id, texto = chunk.id, ""
+            if chunk.text:
+                texto += chunk.text
+                yield "texto", texto
+        else:
+            for nodo, salida in dato.items():
+                for msg in (salida or {}).get("messages", []):
+                    if isinstance(msg, AIMessage):
+                        texto_final = msg.text
+                    elif nodo != "agent" and isinstance(msg, ToolMessage) and "TABLA_DATOS" in msg.content:
+                        yield "tabla", msg
+
+    yield "fin", texto_final
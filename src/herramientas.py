@@ -0,0 +1,289 @@
+"""
+Herramientas del agente de cobranzas: CRUD de la cartera, consulta paginada,
+agregados de la cartera y generación de speeches.
+
+No depende del grafo, de la UI ni del cliente de Gemini: los procesos por
+lote y las pruebas pueden importarlas sin ese costo. Los speeches se arman
+con plantillas locales (plantillas.py); el modelo se construye recién cuando
+se pide un speech creativo o ninguna plantilla aplica (modelos.get_llm).
+"""
+import asyncio
+from typing import List, Optional
+
+from langchain_core.tools import StructuredTool, tool
+
+from cache_speech import get_cache
+from cliente_store import get_store
+from importacion import ClienteEntrada, importar_clientes, resolver_ruta_importacion
+from indice_nombres import clave_difusa
+from modelos import get_llm
+from plantillas import get_motor_plantillas
+from prompts import mensajes_speech
+
+# ==========================================
+# 🛠️ HERRAMIENTAS
+# ==========================================
+
+def _resolver_cliente(nombre: str):
+    """
+    (cliente, None) si `nombre` identifica a un único cliente, exacto o
+    salvo acentos y signos; si no, (None, respuesta) con los candidatos:
+    nunca se modifica ni se borra a un cliente por aproximación.
+    """
+    store = get_store()
+    cliente = store.obtener(nombre)
+    if cliente:
+        return cliente, None
+    similares = store.buscar_nombres(nombre)
+    iguales = [n for n, _ in similares if clave_difusa(n) == clave_difusa(nombre)]
+    if len(iguales) == 1:
+        return store.obtener(iguales[0]), None
+    if iguales:
+        return None, f"CLIENTE_AMBIGUO | candidatos={'; '.join(iguales)}"
+    if similares:
+        sugerencias = "; ".join(f"{n} ({s:.0%})" for n, s in similares)
+        return None, f"CLIENTE_NO_ENCONTRADO | sugerencias={sugerencias}"
+    return None, "CLIENTE_NO_ENCONTRADO"
+
+@tool
+def registrar_cliente(nombre: str, deuda: float, dias_mora: int, producto: str, reemplazar: bool = False):
+    """
+    Registra un nuevo cliente deudor en la base de datos. Si ya existe un
+    cliente con ese nombre no lo modifica (CLIENTE_EXISTENTE con sus datos);
+    usa reemplazar=True solo si el usuario confirmó reemplazar esos datos.
+    """
+    store = get_store()
+    existente = store.obtener(nombre)
+    if existente and not reemplazar:
+        return (
+            f"CLIENTE_EXISTENTE | nombre={existente['nombre']} | deuda={existente['deuda']}"
+            f" | dias_mora={existente['dias_mora']} | producto={existente['producto']}"
+        )
+    if store.registrar(nombre, deuda, dias_mora, producto):
+        return f"CLIENTE_REGISTRADO | nombre={nombre} | deuda={deuda}"
+    # Ya existía y sus datos cambiaron: el speech guardado no sirve
+    get_cache().invalidar(nombre)
+    return f"CLIENTE_ACTUALIZADO | nombre={nombre} | deuda={deuda} | dias_mora={dias_mora}"
+
+@tool
+def registrar_clientes_lote(clientes: Optional[List[ClienteEntrada]] = None, ruta_archivo: Optional[str] = None):
+    """
+    Registra muchos clientes en una sola operación, desde una lista de registros
+    o desde un archivo CSV/XLSX de la carpeta de importaciones (ruta_archivo es
+    relativa a ella). Los nombres ya existentes se actualizan.
+    """
+    if not clientes and not ruta_archivo:
+        return "LOTE_VACIO"
+
+    try:
+        resultado = importar_clientes(resolver_ruta_importacion(ruta_archivo) if ruta_archivo else clientes)
+    except (ValueError, OSError) as e:
+        return f"LOTE_INVALIDO | {e}"
+
+    return resultado.resumen()
+
+@tool
+def eliminar_cliente_pagado(nombre: str):
+    """
+    Elimina un cliente cuando ya pagó.
+    """
+    cliente, respuesta = _resolver_cliente(nombre)
+    if cliente is None:
+        return respuesta
+    nombre = cliente['nombre']
+    if not get_store().eliminar(nombre):
+        return "CLIENTE_NO_ENCONTRADO"
+    get_cache().invalidar(nombre)
+
+    # Retornar solo confirmación
+    return f"CLIENTE_ELIMINADO | nombre={nombre}"
+
+# Filas que ve el modelo por consulta; el resultado completo va directo a la UI
+LIMITE_PAGINA = 20
+LIMITE_PAGINA_MAX = 100
+
+def acotar_pagina(limite: int, offset: int) -> tuple:
+    """(limite, offset) dentro de los márgenes de una página de leer_base_datos."""
+    return max(1, min(limite, LIMITE_PAGINA_MAX)), max(0, offset)
+
+@tool(response_format="content_and_artifact")
+def leer_base_datos(
+    deuda_min: Optional[float] = None,
+    mora_min: Optional[int] = None,
+    mora_max: Optional[int] = None,
+    producto: Optional[str] = None,
+    tono: Optional[str] = None,
+    ordenar_por: Optional[str] = None,
+    descendente: bool = False,
+    limite: int = LIMITE_PAGINA,
+    offset: int = 0,
+):
+    """
+    Lista clientes. Retorna TABLA_DATOS con un resumen y una página de la tabla.
+    Filtros opcionales: deuda_min, mora_min/mora_max (días), producto y tono
+    ('empatico', 'firme' o 'serio'). Orden con ordenar_por (nombre, deuda,
+    dias_mora, producto, fecha_registro) y descendente. Paginación con limite y offset.
+    """
+    consulta = {
+        clave: valor for clave, valor in {
+            "deuda_min": deuda_min,
+            "mora_min": mora_min,
+            "mora_max": mora_max,
+            "producto": producto,
+            "tono": tono,
+            "ordenar_por": ordenar_por,
+        }.items() if valor is not None
+    }
+    if ordenar_por:
+        consulta["descendente"] = descendente
+
+    limite, offset = acotar_pagina(limite, offset)
+    try:
+        pagina, resumen = get_store().consultar(**consulta, limite=limite, offset=offset)
+    except ValueError as e:
+        return f"CONSULTA_INVALIDA | {e}", None
+
+    if resumen["total"] == 0:
+        return ("SIN_RESULTADOS" if consulta else "SIN_CLIENTES"), None
+
+    mostrando = f"{offset + 1}-{offset + len(pagina)}" if len(pagina) else "0"
+    contenido = (
+        f"TABLA_DATOS | total={resumen['total']} | deuda_total=${resumen['deuda_total']:,.2f}"
+        f" | mostrando={mostrando}\n{pagina.to_markdown(index=False)}"
+    )
+    # La UI recibe filas estructuradas y la consulta para paginar el resultado
+    # completo, sin pasar por el modelo ni por markdown
+    artifact = {
+        "consulta": consulta,
+        "resumen": resumen,
+        "columnas": list(pagina.columns),
+        "filas": pagina.to_dict("split")["data"],
+        "offset": offset,
+        "limite": limite,
+    }
+    return contenido, artifact
+
+@tool
+def actualizar_deuda(nombre: str, nueva_deuda: float = None, nuevos_dias_mora: int = None):
+    """
+    Actualiza el monto de deuda y/o días de mora de un cliente existente.
+    Se pueden actualizar ambos campos o solo uno de ellos.
+    """
+    # Actualizar campos según lo que se proporcione
+    cambios = []
+    if nueva_deuda is not None:
+        cambios.append(f"deuda={nueva_deuda}")
+    
+    if nuevos_dias_mora is not None:
+        cambios.append(f"dias_mora={nuevos_dias_mora}")
+    
+    if not cambios:
+        return "NO_SE_ESPECIFICARON_CAMBIOS"
+
+    cliente, respuesta = _resolver_cliente(nombre)
+    if cliente is None:
+        return respuesta
+    nombre = cliente['nombre']
+    if not get_store().actualizar(nombre, deuda=nueva_deuda, dias_mora=nuevos_dias_mora):
+        return "CLIENTE_NO_ENCONTRADO"
+    # El speech guardado ya no corresponde a los datos nuevos
+    get_cache().invalidar(nombre)
+    
+    cambios_str = " | ".join(cambios)
+    return f"DATOS_ACTUALIZADOS | nombre={nombre} | {cambios_str}"
+
+def _preparar_speech(nombre: str, regenerar: bool, creativo: bool):
+    """
+    (respuesta, None) si no hace falta el modelo: cliente no resuelto,
+    plantilla que aplica o speech en caché. Si no, (None, cliente).
+    """
+    cliente, respuesta = _resolver_cliente(nombre)
+    if cliente is None:
+        return respuesta, None
+
+    motor = None if creativo else get_motor_plantillas()
+    speech = motor.generar(cliente, regenerar) if motor is not None else None
+    # Speech creativo, o sin plantilla que aplique: del caché o del modelo
+    if speech is None and not regenerar:
+        speech = get_cache().obtener(cliente)
+    if speech is not None:
+        return f"SPEECH | nombre={cliente['nombre']}\n{speech}", None
+    return None, cliente
+
+def _guardar_speech(cliente: dict, speech: str) -> str:
+    get_cache().guardar(cliente, speech)
+    return f"SPEECH | nombre={cliente['nombre']}\n{speech}"
+
+def _generar_speech(nombre: str, regenerar: bool = False, creativo: bool = False):
+    """
+    Genera el speech de cobranza de un cliente ya registrado.
+    Usa regenerar=True solo si el usuario pide explícitamente otra versión, y
+    creativo=True solo si pide un speech creativo o premium.
+    """
+    respuesta, cliente = _preparar_speech(nombre, regenerar, creativo)
+    if cliente is None:
+        return respuesta
+    return _guardar_speech(cliente, get_llm().invoke(mensajes_speech(cliente)).text)
+
+async def _generar_speech_async(nombre: str, regenerar: bool = False, creativo: bool = False):
+    # El grafo async y el servidor esperan al modelo sin ocupar un hilo; lo
+    # local (store y caché en SQLite) va a un hilo para no frenar el loop
+    respuesta, cliente = await asyncio.to_thread(_preparar_speech, nombre, regenerar, creativo)
+    if cliente is None:
+        return respuesta
+    speech = (await get_llm().ainvoke(mensajes_speech(cliente))).text
+    return await asyncio.to_thread(_guardar_speech, cliente, speech)
+
+generar_speech = StructuredTool.from_function(
+    func=_generar_speech, coroutine=_generar_speech_async, name="generar_speech"
+)
+
+def _linea_agregado(etiqueta: str, datos: dict) -> str:
+    return (
+        f"{etiqueta}: clientes={datos['clientes']} | deuda_total=${datos['deuda_total']:,.2f}"
+        f" | deuda_promedio=${datos['deuda_promedio']:,.2f} | mora_promedio={datos['mora_promedio']}"
+    )
+
+@tool
+def analizar_cartera(por: Optional[str] = None):
+    """
+    Totales, cantidad de clientes y promedios de deuda y mora de la cartera,
+    calculados localmente. Agrupa por 'tono' (empatico, firme, serio),
+    'producto' o 'tramo_mora' (días de mora: 0-14, 15-30, 31-45, 46-90, 91+);
+    sin `por` devuelve las tres agrupaciones.
+    """
+    try:
+        resumen = get_store().agregados(por)
+    except ValueError as e:
+        return f"CONSULTA_INVALIDA | {e}"
+    if resumen["clientes"] == 0:
+        return "SIN_CLIENTES"
+
+    lineas = ["ANALITICA | " + _linea_agregado("cartera", resumen)]
+    for dimension, grupos in resumen["por"].items():
+        lineas.append(f"[{dimension}]")
+        lineas.extend("- " + _linea_agregado(grupo, datos) for grupo, datos in grupos.items())
+    return "\n".join(lineas)
+
+# ==========================================
+# 🧰 CATÁLOGO
+# ==========================================
+
+TOOLS = [
+    registrar_cliente,
+    registrar_clientes_lote,
+    eliminar_cliente_pagado,
+    leer_base_datos,
+    actualizar_deuda,
+    generar_speech,
+    analizar_cartera,
+]
+TOOLS_POR_NOMBRE = {t.name: t for t in TOOLS}
+
+# Herramientas que modifican la cartera; el resto son de solo lectura
+HERRAMIENTAS_ESCRITURA = {
+    "registrar_cliente",
+    "registrar_clientes_lote",
+    "eliminar_cliente_pagado",
+    "actualizar_deuda",
+}
@@ -0,0 +1,152 @@
+"""
+Importación masiva de deudores desde CSV, XLSX o una lista de registros.
+
+La validación y la deduplicación se hacen de forma vectorizada con pandas y
+el lote completo se guarda en un único commit del ClienteStore.
+
+Uso sin LLM:
+    python src/importacion.py cartera_mensual.xlsx
+"""
+import argparse
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
+
+import pandas as pd
+from typing_extensions import TypedDict
+
+from cliente_store import ClienteStore, get_store, normalizar_nombre
+
+CAMPOS = ['nombre', 'deuda', 'dias_mora', 'producto']
+# Única carpeta de la que el agente puede leer archivos (ver resolver_ruta_importacion)
+DIRECTORIO_IMPORTACION = os.environ.get("COBRA_DIR_IMPORTACION", "importaciones")
+
+
+class ClienteEntrada(TypedDict):
+    nombre: str
+    deuda: float
+    dias_mora: int
+    producto: str
+
+
+@dataclass
+class ResultadoImportacion:
+    insertados: int = 0
+    actualizados: int = 0
+    rechazados: int = 0
+    duplicados: int = 0
+    motivos_rechazo: dict = field(default_factory=dict)
+
+    def resumen(self) -> str:
+        texto = (
+            f"LOTE_REGISTRADO | insertados={self.insertados} | actualizados={self.actualizados}"
+            f" | rechazados={self.rechazados} | duplicados={self.duplicados}"
+        )
+        if self.motivos_rechazo:
+            motivos = ", ".join(f"{k}={v}" for k, v in self.motivos_rechazo.items())
+            texto += f" | motivos={motivos}"
+        return texto
+
+
+def resolver_ruta_importacion(ruta: str) -> str:
+    """
+    Ruta real de `ruta` dentro de DIRECTORIO_IMPORTACION (relativa a ella).
+    ValueError si apunta fuera de la carpeta, para que el modelo no pueda
+    leer otros archivos del equipo.
+    """
+    carpeta = os.path.realpath(DIRECTORIO_IMPORTACION)
+    real = os.path.realpath(os.path.join(carpeta, ruta))
+    if os.path.commonpath([carpeta, real]) != carpeta:
+        raise ValueError(f"Solo se importan archivos de la carpeta '{DIRECTORIO_IMPORTACION}'")
+    return real
+
+
+def cargar_fuente(fuente: Union[str, List[dict], pd.DataFrame]) -> pd.DataFrame:
+    """Lee un archivo CSV/XLSX o convierte una lista de registros en DataFrame."""
+    if isinstance(fuente, pd.DataFrame):
+        df = fuente.copy()
+    elif isinstance(fuente, (str, os.PathLike)):
+        extension = os.path.splitext(str(fuente))[1].lower()
+        if extension in (".xlsx", ".xlsm"):
+            df = pd.read_excel(fuente)
+        elif extension == ".xls":
+            # Leerlo requiere xlrd, que no es dependencia del proyecto
+            raise ValueError("Formato .xls no soportado: guarde el archivo como .xlsx o .csv")
+        elif extension == ".csv":
+            df = pd.read_csv(fuente)
+        else:
+            raise ValueError(f"Formato no soportado: {extension or fuente}")
+    else:
+        df = pd.DataFrame(list(fuente))
+
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    faltantes = [c for c in CAMPOS if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+    return df[CAMPOS]
+
+
+def validar_lote(df: pd.DataFrame):
+    """
+    Valida y deduplica el lote sin iterar fila por fila.
+    Retorna (validos, motivos_rechazo, duplicados).
+    """
+    nombre = df['nombre'].astype("string").str.strip()
+    producto = df['producto'].astype("string").str.strip()
+    deuda = pd.to_numeric(df['deuda'], errors="coerce")
+    dias_mora = pd.to_numeric(df['dias_mora'], errors="coerce")
+
+    reglas = {
+        "nombre_vacio": nombre.isna() | (nombre == ""),
+        "producto_vacio": producto.isna() | (producto == ""),
+        "deuda_invalida": deuda.isna() | (deuda < 0),
+        "mora_invalida": dias_mora.isna() | (dias_mora < 0) | (dias_mora % 1 != 0),
+    }
+
+    rechazado = pd.Series(False, index=df.index)
+    motivos = {}
+    for motivo, mascara in reglas.items():
+        # Cada fila se cuenta una sola vez, con el primer motivo que falle
+        nuevos = mascara.fillna(True) & ~rechazado
+        if nuevos.any():
+            motivos[motivo] = int(nuevos.sum())
+        rechazado |= nuevos
+
+    validos = pd.DataFrame({
+        'nombre': nombre,
+        'deuda': deuda,
+        'dias_mora': dias_mora,
+        'producto': producto,
+    })[~rechazado]
+
+    # Ante nombres repetidos gana la última aparición, igual que un upsert
+    repetido = validos['nombre'].map(normalizar_nombre).duplicated(keep="last")
+    validos = validos[~repetido].astype({'dias_mora': int, 'deuda': float})
+    return validos, motivos, int(repetido.sum())
+
+
+def importar_clientes(fuente, store: Optional[ClienteStore] = None) -> ResultadoImportacion:
+    """Valida, deduplica y guarda el lote en un único commit."""
+    store = store or get_store()
+    validos, motivos, duplicados = validar_lote(cargar_fuente(fuente))
+    insertados, actualizados = store.registrar_lote(validos)
+    return ResultadoImportacion(
+        insertados=insertados,
+        actualizados=actualizados,
+        rechazados=sum(motivos.values()),
+        duplicados=duplicados,
+        motivos_rechazo=motivos,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa deudores desde un archivo CSV o XLSX.")
+    parser.add_argument("archivo", help="Ruta del archivo .csv o .xlsx")
+    args = parser.parse_args()
+
+    resultado = importar_clientes(args.archivo)
+    print(resultado.resumen())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Índice difuso de nombres de clientes: resuelve "Maria Lopez" a "María López"
+y sugiere "Juan Pérez" cuando se escribió "Juan Peres".
+
+Los nombres se pliegan (sin acentos ni signos, en minúsculas) y se parten en
+palabras. Cada palabra del vocabulario tiene su lista ordenada de ids de
+cliente (arreglos numpy; las altas posteriores a la carga van a listas
+pequeñas y las bajas a un conjunto de borrados hasta el próximo rearmado).
+Una búsqueda intersecta las listas de sus palabras empezando por la más
+rara, así que cuesta según la palabra más selectiva y no según el tamaño de
+la cartera. Solo si no hay coincidencia exacta se buscan variantes de cada
+palabra por trigramas sobre el vocabulario y, como último recurso, se
+tolera que falte una palabra.
+"""
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+
+import numpy as np
+
+# Similitud mínima (Dice) para sugerir un nombre o aceptar una variante de palabra
+UMBRAL_SIMILITUD = 0.6
+UMBRAL_PALABRA = 0.6
+VARIANTES_POR_PALABRA = 5
+# Altas/bajas pendientes (fracción de la cartera) que disparan el rearmado
+FRACCION_REARMADO = 0.2
+
+
+def clave_difusa(nombre) -> str:
+    """Nombre sin acentos ni signos, en minúsculas y con espacios simples."""
+    sin_acentos = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode("ascii")
+    return " ".join("".join(c if c.isalnum() else " " for c in sin_acentos.lower()).split())
+
+
+def _trigramas(palabra: str) -> set:
+    relleno = "  " + palabra + " "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def _contiene(ordenada, valores):
+    """Máscara de `valores` presentes en el arreglo ordenado `ordenada`."""
+    if len(ordenada) == 0:
+        return np.zeros(len(valores), dtype=bool)
+    posiciones = np.minimum(np.searchsorted(ordenada, valores), len(ordenada) - 1)
+    return ordenada[posiciones] == valores
+
+
+class IndiceNombres:
+    """
+    Palabras -> ids de cliente. Cada id corresponde a una clave del store
+    (nombre normalizado); `cambiar` refleja altas y bajas confirmadas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._armar([])
+
+    def __len__(self):
+        return len(self._posicion)
+
+    # ------------------------------------------------------------------
+    # Carga y mantenimiento
+    # ------------------------------------------------------------------
+
+    def cargar(self, claves):
+        """Rearma el índice desde las claves del store."""
+        claves = list(claves)
+        with self._lock:
+            self._armar(claves)
+
+    def _armar(self, claves):
+        self._claves = claves               # id -> clave del store (None si se borró)
+        self._posicion = {clave: i for i, clave in enumerate(claves)}
+        self._vocabulario = {}              # palabra plegada -> id de palabra
+        self._palabras = []                 # id de palabra -> (palabra, trigramas)
+        self._trigramas = {}                # trigrama -> ids de palabra
+        self._extra = {}                    # id de palabra -> ids de cliente agregados tras la carga
+        self._borrados = set()
+        self._pendientes = 0
+
+        vocabulario = self._vocabulario
+        plegadas = {}  # palabras con acentos o signos -> ids de sus partes plegadas
+        palabras = array("i")
+        self._num_palabras = array("H")
+        for clave in claves:
+            ids = set()
+            for palabra in clave.split():
+                id_palabra = vocabulario.get(palabra)
+                if id_palabra is not None:
+                    ids.add(id_palabra)
+                    continue
+                pliegue = plegadas.get(palabra)
+                if pliegue is None:
+                    pliegue = plegadas[palabra] = self._ids_palabra(palabra)
+                ids.update(pliegue)
+            palabras.extend(ids)
+            self._num_palabras.append(len(ids))
+
+        # Listas por palabra en formato CSR: ids de cliente ordenados
+        cantidades = np.frombuffer(self._num_palabras, dtype=np.uint16)
+        filas = np.repeat(np.arange(len(claves), dtype=np.int32), cantidades)
+        palabras = np.frombuffer(palabras, dtype=np.int32)
+        orden = np.argsort(palabras, kind="stable")  # las filas ya vienen en orden
+        self._ids = filas[orden]
+        self._inicios = np.searchsorted(palabras[orden], np.arange(len(self._palabras) + 1))
+        self._base = len(self._palabras)
+
+    def _ids_palabra(self, palabra):
+        ids = []
+        partes = (palabra.lower(),) if palabra.isascii() and palabra.isalnum() else clave_difusa(palabra).split()
+        for parte in partes:
+            id_palabra = self._vocabulario.get(parte)
+            if id_palabra is None:
+                id_palabra = self._vocabulario[parte] = len(self._palabras)
+                trigramas = _trigramas(parte) if parte.isalpha() else ()
+                self._palabras.append((parte, len(trigramas)))
+                # Números de documento o de cuenta solo coinciden exactos
+                for trigrama in trigramas:
+                    self._trigramas.setdefault(trigrama, []).append(id_palabra)
+            ids.append(id_palabra)
+        return ids
+
+    def cambiar(self, clave: str, anterior: dict = None, nuevo: dict = None):
+        """Refleja una escritura del store sobre `clave` (alta, baja o modificación)."""
+        if (anterior is None) == (nuevo is None):
+            return  # modificación: el nombre normalizado no cambia
+        with self._lock:
+            if nuevo is not None:
+                self._agregar(clave)
+            else:
+                self._quitar(clave)
+            if self._pendientes > max(1000, FRACCION_REARMADO * len(self._posicion)):
+                self._armar([c for c in self._claves if c is not None])
+
+    def _agregar(self, clave):
+        if clave in self._posicion:
+            return
+        nuevo_id = len(self._claves)
+        ids = set(self._ids_palabra(clave))
+        self._claves.append(clave)
+        self._posicion[clave] = nuevo_id
+        self._num_palabras.append(len(ids))
+        for id_palabra in ids:
+            self._extra.setdefault(id_palabra, []).append(nuevo_id)
+        self._pendientes += 1
+
+    def _quitar(self, clave):
+        viejo_id = self._posicion.pop(clave, None)
+        if viejo_id is None:
+            return
+        self._claves[viejo_id] = None
+        self._borrados.add(viejo_id)
+        self._pendientes += 1
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+
+    def _lista(self, id_palabra):
+        if id_palabra < self._base:
+            base = self._ids[self._inicios[id_palabra]:self._inicios[id_palabra + 1]]
+        else:
+            base = self._ids[:0]
+        extra = self._extra.get(id_palabra)
+        # Los ids nuevos son siempre mayores: la concatenación sigue ordenada
+        return np.concatenate([base, np.array(extra, dtype=np.int32)]) if extra else base
+
+    def _variantes(self, palabra):
+        """[(id de palabra, similitud)] del vocabulario parecidas a `palabra`, incluida ella misma."""
+        if not palabra.isalpha():
+            exacta = self._vocabulario.get(palabra)
+            return [(exacta, 1.0)] if exacta is not None else []
+        consulta = _trigramas(palabra)
+        comunes = Counter()
+        for trigrama in consulta:
+            comunes.update(self._trigramas.get(trigrama, ()))
+        similares = []
+        for id_palabra, n in comunes.most_common():
+            # Ordenadas por trigramas en común: pasado este punto ninguna alcanza el umbral
+            if 2 * n / (len(consulta) + n) < UMBRAL_PALABRA:
+                break
+            similitud = 2 * n / (len(consulta) + self._palabras[id_palabra][1])
+            if similitud >= UMBRAL_PALABRA:
+                similares.append((id_palabra, similitud))
+        return sorted(similares, key=lambda v: -v[1])[:VARIANTES_POR_PALABRA]
+
+    def _candidatos(self, grupos):
+        """Ids presentes en alguna variante de cada grupo, partiendo del grupo más raro."""
+        listas = sorted(
+            ([self._lista(i) for i, _ in grupo] for grupo in grupos),
+            key=lambda ls: sum(len(l) for l in ls),
+        )
+        candidatos = listas[0][0] if len(listas[0]) == 1 else np.unique(np.concatenate(listas[0]))
+        for grupo in listas[1:]:
+            if len(candidatos) == 0:
+                break
+            presentes = np.zeros(len(candidatos), dtype=bool)
+            for lista in grupo:
+                presentes |= _contiene(lista, candidatos)
+            candidatos = candidatos[presentes]
+        return candidatos
+
+    def _vigentes(self, candidatos):
+        """`candidatos` sin los ids borrados desde el último rearmado."""
+        if len(candidatos) and self._borrados:
+            return candidatos[~np.isin(candidatos, list(self._borrados))]
+        return candidatos
+
+    def buscar(self, nombre: str, limite: int = 5, umbral: float = UMBRAL_SIMILITUD) -> list:
+        """[(clave del store, similitud)] de mayor a menor similitud, hasta `limite`."""
+        consulta = list(dict.fromkeys(clave_difusa(nombre).split()))
+        if not consulta:
+            return []
+        with self._lock:
+            ids = [self._vocabulario.get(p) for p in consulta]
+            grupos = [[(i, 1.0)] for i in ids if i is not None]
+            candidatos = self._vigentes(self._candidatos(grupos)) if len(grupos) == len(consulta) else []
+            # Si todas las coincidencias exactas se borraron se prueban las variantes
+            exacta = len(candidatos) > 0
+            if not exacta:
+                grupos = [g for g in map(self._variantes, consulta) if g]
+                if grupos:
+                    candidatos = self._vigentes(self._candidatos(grupos))
+                if len(candidatos) == 0 and len(grupos) > 1:
+                    # Se tolera una palabra de más o irreconocible en la consulta
+                    candidatos = self._vigentes(np.unique(np.concatenate([
+                        self._candidatos(grupos[:k] + grupos[k + 1:]) for k in range(len(grupos))
+                    ])))
+            if len(candidatos) == 0:
+                return []
+
+            # Dice por palabras, cada una pesada por la similitud de su variante
+            suma = np.full(len(candidatos), float(len(grupos) if exacta else 0))
+            for grupo in ([] if exacta else grupos):
+                mejor = np.zeros(len(candidatos))
+                for id_palabra, similitud in grupo:
+                    mejor = np.maximum(mejor, _contiene(self._lista(id_palabra), candidatos) * similitud)
+                suma += mejor
+            palabras = np.frombuffer(self._num_palabras, dtype=np.uint16)[candidatos]
+            similitud = 2 * suma / (len(consulta) + palabras)
+            elegidos = similitud >= umbral
+            candidatos, similitud = candidatos[elegidos], similitud[elegidos]
+            orden = np.lexsort((candidatos, -similitud))[:limite]
+            return [(self._claves[candidatos[i]], round(float(similitud[i]), 3)) for i in orden]
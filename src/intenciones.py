@@ -0,0 +1,188 @@
+"""
+Ruta rápida sin modelo para los pedidos más frecuentes del chat.
+
+Reconoce con reglas deterministas los saludos, los comandos CRUD simples
+("muéstrame los clientes", "elimina a Juan Pérez, ya pagó", "actualiza la
+deuda de Ana a 500") y los pedidos de speech de un cliente registrado.
+Solo se atienden los pedidos inequívocos: ante cualquier duda
+`detectar_intencion` retorna None y responde el modelo.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+RUTA_LOCAL_ACTIVA = os.environ.get("COBRA_RUTA_LOCAL", "1") != "0"
+
+_NOMBRE = r"(?P<nombre>[a-záéíóúüñ]+(?:\s+[a-záéíóúüñ]+){0,3})"
+_NUMERO = r"(?P<valor>\d[\d.,]*)"
+_FIN = r"\s*[.!?]*\s*$"
+
+# Palabras que indican que no se habla de un cliente concreto: artículos,
+# conectores ("Pedro y Juan"), negaciones ("elimina a Pedro no") y
+# cuantificadores ("borra todo")
+_NO_NOMBRES = {
+    "todos", "todas", "los", "las", "el", "la", "mi", "mis", "cliente", "clientes", "base", "cartera", "deuda", "mora",
+    "y", "e", "o", "u", "ni", "no", "nunca", "todo", "toda", "nada", "nadie", "ninguno", "ninguna", "ningun", "ningún",
+    "alguno", "alguna", "algunos", "algunas", "alguien", "cualquier", "cualquiera", "otro", "otra", "otros", "otras",
+    "varios", "varias", "cada",
+}
+
+_SALUDO = re.compile(
+    r"^[\s¡¿]*(?:hola|holi|buenos\s+d[ií]as|buenas(?:\s+(?:tardes|noches))?|hey|saludos|qu[eé]\s+tal)\b"
+    r"(?:\s+(?:cobra-?bot|bot)\b)?[\s,.!¡?¿]*",
+    re.IGNORECASE,
+)
+
+_LISTAR = re.compile(
+    r"^(?:por\s+favor\s+)?(?:mu[eé]strame|muestra|mostrar|mostrame|ens[eé][ñn]ame|lista|listar|ver|dame|consulta|consultar)"
+    r"\s+(?:(?:todos\s+)?(?:los|las|la|mis|el)\s+)?(?:lista\s+de\s+|registros\s+de\s+)?"
+    r"(?:clientes|registros|cartera|base(?:\s+de\s+datos)?|tabla)(?:\s+registrados)?" + _FIN,
+    re.IGNORECASE,
+)
+
+_ELIMINAR = [
+    re.compile(
+        r"^(?:por\s+favor\s+)?(?:elimina|borra|quita|eliminar|borrar|quitar)\s+(?:al?\s+)?(?:cliente\s+)?" + _NOMBRE +
+        r"(?:\s*[,;.]?\s*(?:que\s+)?ya\s+(?:pag[oó]|cancel[oó])(?:\s+su\s+deuda|\s+todo)?)?" + _FIN,
+        re.IGNORECASE,
+    ),
+    re.compile(r"^(?:el\s+cliente\s+)?" + _NOMBRE + r"\s+ya\s+(?:pag[oó]|cancel[oó])(?:\s+su\s+deuda|\s+todo)?" + _FIN,
+               re.IGNORECASE),
+]
+
+_VERBO_ACTUALIZAR = r"^(?:por\s+favor\s+)?(?:actualiza|cambia|modifica|pon|ajusta)r?\s+"
+_ACTUALIZAR = [
+    (re.compile(_VERBO_ACTUALIZAR + r"(?:la\s+)?deuda\s+(?:de|del\s+cliente)\s+" + _NOMBRE +
+                r"\s+(?:a|en)\s+\$?\s*" + _NUMERO + _FIN, re.IGNORECASE), "nueva_deuda"),
+    (re.compile(r"^(?:la\s+)?deuda\s+de\s+" + _NOMBRE + r"\s+(?:ahora\s+)?es\s+(?:de\s+)?\$?\s*" + _NUMERO + _FIN,
+                re.IGNORECASE), "nueva_deuda"),
+    (re.compile(_VERBO_ACTUALIZAR + r"(?:los\s+)?(?:d[ií]as\s+de\s+)?mora\s+(?:de|del\s+cliente)\s+" + _NOMBRE +
+                r"\s+(?:a|en)\s+" + _NUMERO + r"(?:\s+d[ií]as)?" + _FIN, re.IGNORECASE), "nuevos_dias_mora"),
+]
+
+# "speech creativo" o "premium": lo redacta el modelo en lugar de las plantillas
+_CREATIVO = r"(?:de\s+cobranza\s+)?(?:(?P<creativo>creativo|premium)\s+)?"
+_SPEECH = re.compile(
+    r"^(?:por\s+favor\s+)?(?:genera|gen[eé]rame|hazme|haz|dame|escribe|escr[ií]beme|crea)r?\s+(?:un\s+|el\s+)?"
+    r"speech\s+" + _CREATIVO + r"(?:para|de|a)\s+(?:el\s+cliente\s+)?" + _NOMBRE + _FIN,
+    re.IGNORECASE,
+)
+_REGENERAR = re.compile(
+    r"^(?:por\s+favor\s+)?(?:regenera|rehaz|(?:genera|dame|haz|escribe)(?:me)?\s+otro)\s+(?:el\s+|un\s+)?(?:nuevo\s+)?"
+    r"speech\s+" + _CREATIVO + r"(?:para|de|a)\s+(?:el\s+cliente\s+)?" + _NOMBRE + _FIN,
+    re.IGNORECASE,
+)
+
+RESPUESTA_SALUDO = (
+    "¡Hola! Soy COBRA-BOT. Puedo registrar clientes, consultar o actualizar tu cartera "
+    "y generar speeches de cobranza personalizados. ¿En qué te ayudo?"
+)
+
+
+@dataclass
+class Intencion:
+    """Pedido reconocido sin modelo: una herramienta (o ninguna) y sus argumentos."""
+    tipo: str
+    herramienta: Optional[str] = None
+    args: dict = field(default_factory=dict)
+
+
+def leer_numero(texto: str) -> Optional[float]:
+    """Interpreta montos como 500, 1.500, 1,500.50 o 1.500,50; None si es ambiguo."""
+    if re.fullmatch(r"\d+(?:[.,]\d{1,2})?", texto):
+        return float(texto.replace(",", "."))
+    if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", texto) and len(set(re.findall(r"[.,]", texto))) == 1:
+        return float(re.sub(r"[.,]", "", texto))
+    if re.fullmatch(r"\d{1,3}(?:,\d{3})*\.\d{1,2}", texto):
+        return float(texto.replace(",", ""))
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})*,\d{1,2}", texto):
+        return float(texto.replace(".", "").replace(",", "."))
+    return None
+
+
+def _nombre_valido(nombre: str) -> bool:
+    return not any(palabra in _NO_NOMBRES for palabra in nombre.lower().split())
+
+
+def detectar_intencion(texto: str) -> Optional[Intencion]:
+    """Retorna la intención solo si es inequívoca; None deja el pedido al modelo."""
+    if not RUTA_LOCAL_ACTIVA:
+        return None
+    texto = " ".join(texto.split())
+    saludo = _SALUDO.match(texto)
+    resto = texto[saludo.end():] if saludo else texto
+    if saludo and not resto:
+        return Intencion("saludo")
+
+    if _LISTAR.match(resto):
+        return Intencion("listar", "leer_base_datos")
+
+    for patron in _ELIMINAR:
+        coincidencia = patron.match(resto)
+        if coincidencia and _nombre_valido(coincidencia["nombre"]):
+            return Intencion("eliminar", "eliminar_cliente_pagado", {"nombre": coincidencia["nombre"]})
+
+    for patron, regenerar in [(_SPEECH, False), (_REGENERAR, True)]:
+        coincidencia = patron.match(resto)
+        if coincidencia and _nombre_valido(coincidencia["nombre"]):
+            args = {"nombre": coincidencia["nombre"]}
+            if regenerar:
+                args["regenerar"] = True
+            if coincidencia["creativo"]:
+                args["creativo"] = True
+            return Intencion("speech", "generar_speech", args)
+
+    for patron, campo in _ACTUALIZAR:
+        coincidencia = patron.match(resto)
+        if not coincidencia or not _nombre_valido(coincidencia["nombre"]):
+            continue
+        valor = leer_numero(coincidencia["valor"])
+        if valor is None or (campo == "nuevos_dias_mora" and not valor.is_integer()):
+            return None
+        valor = int(valor) if campo == "nuevos_dias_mora" else valor
+        return Intencion("actualizar", "actualizar_deuda", {"nombre": coincidencia["nombre"], campo: valor})
+
+    return None
+
+
+def respuesta_local(intencion: Intencion, resultado=None) -> str:
+    """Confirmación determinista a partir del ToolMessage de la herramienta."""
+    if intencion.tipo == "saludo":
+        return RESPUESTA_SALUDO
+
+    contenido = resultado.text if resultado is not None else ""
+    nombre = intencion.args.get("nombre", "")
+
+    if contenido.startswith("CLIENTE_AMBIGUO"):
+        candidatos = contenido.split("candidatos=", 1)[1].replace("; ", ", ")
+        return f"Hay varios clientes que coinciden con {nombre}: {candidatos}. ¿A cuál te refieres?"
+    if contenido.startswith("CLIENTE_NO_ENCONTRADO"):
+        if "sugerencias=" in contenido:
+            sugerencias = contenido.split("sugerencias=", 1)[1].replace("; ", ", ")
+            return f"No encontré a {nombre}. ¿Te refieres a alguno de estos clientes? {sugerencias}"
+        return f"No encontré a {nombre} en la base de datos. Revisa el nombre o pídeme ver los registros."
+    # La herramienta confirma con el nombre tal como está registrado
+    registrado = re.search(r"nombre=([^|\n]+)", contenido)
+    if registrado:
+        nombre = registrado.group(1).strip()
+
+    if intencion.tipo == "speech":
+        # El speech se entrega tal cual, sin la cabecera de la herramienta
+        return contenido.split("\n", 1)[1]
+
+    if intencion.tipo == "listar":
+        if not contenido.startswith("TABLA_DATOS"):
+            return "Aún no tienes clientes registrados. ¿Quieres registrar uno?"
+        resumen = resultado.artifact["resumen"]
+        return (f"Aquí están tus registros actuales: {resumen['total']} clientes, "
+                f"deuda total ${resumen['deuda_total']:,.2f}.")
+
+    if intencion.tipo == "eliminar":
+        return f"Listo, eliminé a {nombre} de la cartera. ¿Quieres ver tus registros actualizados?"
+
+    if "nueva_deuda" in intencion.args:
+        cambio = f"la deuda a ${intencion.args['nueva_deuda']:,.2f}"
+    else:
+        cambio = f"los días de mora a {intencion.args['nuevos_dias_mora']}"
+    return f"Listo, actualicé {cambio} para {nombre}. ¿Quieres ver tus registros actualizados?"
@@ -0,0 +1,206 @@
+"""
+Registro de métricas en proceso: latencia por nodo, herramienta y llamada al
+modelo, tokens de entrada/salida, filas tocadas y bytes escritos.
+
+Guarda una ventana móvil de observaciones por serie (para p50/p95) más
+contadores acumulados, y se exporta como texto Prometheus o JSONL. Está
+apagado salvo con COBRA_METRICAS=1: apagado, `cronometrar` devuelve un
+contexto vacío compartido y `observar`/`contar` retornan tras leer una bandera.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+METRICAS_ACTIVAS = os.environ.get("COBRA_METRICAS", "") == "1"
+# Observaciones recientes que se conservan por serie
+VENTANA_METRICAS = int(os.environ.get("COBRA_METRICAS_VENTANA", "1024"))
+PREFIJO = "cobra_"
+CUANTILES = (0.5, 0.95)
+
+_NULO = contextlib.nullcontext()
+
+
+def _percentil(valores, q: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * q))]
+
+
+def _etiquetas_prometheus(etiquetas, extra=()) -> str:
+    pares = [
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in (*etiquetas, *extra)
+    ]
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class RegistroMetricas:
+    """
+    Series de observaciones (duraciones, tamaños) y contadores, identificados
+    por nombre y etiquetas. Seguro entre hilos.
+    """
+
+    def __init__(self, ventana: int = VENTANA_METRICAS):
+        self.ventana = ventana
+        self._series = {}      # (nombre, etiquetas) -> {"ventana", "cuenta", "suma"}
+        self._contadores = {}  # (nombre, etiquetas) -> total
+        self._eventos = deque(maxlen=ventana * 4)
+        self._lock = threading.Lock()
+
+    def observar(self, nombre: str, valor: float, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {"ventana": deque(maxlen=self.ventana), "cuenta": 0, "suma": 0.0}
+            serie["ventana"].append(valor)
+            serie["cuenta"] += 1
+            serie["suma"] += valor
+            self._eventos.append({"ts": time.time(), "metrica": nombre, "valor": valor, **etiquetas})
+
+    def contar(self, nombre: str, valor: float = 1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+            self._eventos.append({"ts": time.time(), "metrica": nombre, "valor": valor, **etiquetas})
+
+    def total(self, nombre: str, **etiquetas) -> float:
+        """Suma de un contador sobre todas las series que coinciden con `etiquetas`."""
+        filtro = set(etiquetas.items())
+        with self._lock:
+            return sum(v for (n, e), v in self._contadores.items() if n == nombre and filtro <= set(e))
+
+    def resumen(self) -> dict:
+        """{"series": {clave: {cuenta, suma, p50, p95}}, "contadores": {clave: total}}"""
+        def clave_texto(nombre, etiquetas):
+            return nombre + "".join(f"[{k}={v}]" for k, v in etiquetas)
+
+        with self._lock:
+            return {
+                "series": {
+                    clave_texto(*clave): {
+                        "cuenta": s["cuenta"],
+                        "suma": s["suma"],
+                        "p50": _percentil(s["ventana"], 0.5),
+                        "p95": _percentil(s["ventana"], 0.95),
+                    }
+                    for clave, s in self._series.items()
+                },
+                "contadores": {clave_texto(*clave): v for clave, v in self._contadores.items()},
+            }
+
+    def exportar_prometheus(self) -> str:
+        """Formato de exposición de texto de Prometheus (series como summary)."""
+        lineas, tipos = [], set()
+        with self._lock:
+            for (nombre, etiquetas), serie in sorted(self._series.items()):
+                metrica = PREFIJO + nombre
+                if metrica not in tipos:
+                    tipos.add(metrica)
+                    lineas.append(f"# TYPE {metrica} summary")
+                for q in CUANTILES:
+                    valor = _percentil(serie["ventana"], q)
+                    lineas.append(f"{metrica}{_etiquetas_prometheus(etiquetas, [('quantile', q)])} {valor:g}")
+                lineas.append(f"{metrica}_sum{_etiquetas_prometheus(etiquetas)} {serie['suma']:g}")
+                lineas.append(f"{metrica}_count{_etiquetas_prometheus(etiquetas)} {serie['cuenta']}")
+            for (nombre, etiquetas), valor in sorted(self._contadores.items()):
+                metrica = PREFIJO + nombre
+                if metrica not in tipos:
+                    tipos.add(metrica)
+                    lineas.append(f"# TYPE {metrica} counter")
+                lineas.append(f"{metrica}{_etiquetas_prometheus(etiquetas)} {valor:g}")
+        return "\n".join(lineas) + "\n"
+
+    def exportar_jsonl(self, destino=None) -> str:
+        """Eventos recientes, uno por línea. Con `destino` (ruta) se agregan al archivo."""
+        with self._lock:
+            texto = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in self._eventos)
+        if destino:
+            with open(destino, "a", encoding="utf-8") as f:
+                f.write(texto)
+        return texto
+
+    def limpiar(self):
+        with self._lock:
+            self._series.clear()
+            self._contadores.clear()
+            self._eventos.clear()
+
+
+class _Cronometro:
+    __slots__ = ("registro", "nombre", "etiquetas", "inicio")
+
+    def __init__(self, registro, nombre, etiquetas):
+        self.registro = registro
+        self.nombre = nombre
+        self.etiquetas = etiquetas
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, exc, tb):
+        estado = "ok" if tipo is None else "error"
+        self.registro.observar(self.nombre, time.perf_counter() - self.inicio, estado=estado, **self.etiquetas)
+        return False
+
+
+_registro = RegistroMetricas()
+
+
+def get_registro() -> RegistroMetricas:
+    return _registro
+
+
+def activar(activas: bool = True):
+    """Enciende o apaga la instrumentación en caliente (p. ej. desde la UI o las pruebas)."""
+    global METRICAS_ACTIVAS
+    METRICAS_ACTIVAS = activas
+
+
+def cronometrar(nombre: str, **etiquetas):
+    """Contexto que registra la duración en segundos; apagado no mide nada."""
+    if not METRICAS_ACTIVAS:
+        return _NULO
+    return _Cronometro(_registro, nombre, etiquetas)
+
+
+def observar(nombre: str, valor: float, **etiquetas):
+    if METRICAS_ACTIVAS:
+        _registro.observar(nombre, valor, **etiquetas)
+
+
+def contar(nombre: str, valor: float = 1, **etiquetas):
+    if METRICAS_ACTIVAS:
+        _registro.contar(nombre, valor, **etiquetas)
+
+
+def contar_tokens(respuesta):
+    """Tokens de entrada/salida según usage_metadata de la respuesta del modelo."""
+    if not METRICAS_ACTIVAS:
+        return
+    uso = getattr(respuesta, "usage_metadata", None) or {}
+    if uso.get("input_tokens"):
+        _registro.contar("modelo_tokens_total", uso["input_tokens"], tipo="entrada")
+    if uso.get("output_tokens"):
+        _registro.contar("modelo_tokens_total", uso["output_tokens"], tipo="salida")
+
+
+def resumen_corto() -> str:
+    """Una línea para el overlay de depuración de la UI."""
+    datos = _registro.resumen()["series"]
+
+    def p50_ms(prefijo):
+        valores = [s["p50"] for clave, s in datos.items() if clave.startswith(prefijo)]
+        return f"{max(valores) * 1000:.0f} ms" if valores else "-"
+
+    return (
+        f"modelo p50 {p50_ms('modelo_segundos')} | agente {p50_ms('nodo_segundos[estado=ok][nodo=agent]')}"
+        f" | tools {p50_ms('nodo_segundos[estado=ok][nodo=tools]')} | UI {p50_ms('ui_segundos')}"
+        f" | tokens {_registro.total('modelo_tokens_total', tipo='entrada'):.0f}"
+        f"/{_registro.total('modelo_tokens_total', tipo='salida'):.0f}"
+        f" | ligero {_registro.total('enrutamiento_total', nivel='ligero'):.0f}"
+        f"/{_registro.total('enrutamiento_total'):.0f}"
+    )
@@ -0,0 +1,83 @@
+"""
+Construcción del modelo de lenguaje. Centraliza la configuración para que el
+chat y los procesos por lote usen los mismos parámetros.
+
+El cliente de Gemini se importa y se crea recién en la primera llamada a
+crear_llm/get_llm: importar este módulo (o el caché de speeches, que lee
+MODELO y TEMPERATURA) no carga langchain_google_genai.
+"""
+import os
+import threading
+from typing import Optional
+
+from resiliencia import ModeloResiliente
+
+MODELO = "gemini-2.5-flash"
+TEMPERATURA = 0.5
+MAX_TOKENS_SALIDA = 700
+# Nivel ligero del agente: elegir herramientas y confirmar acciones (ver enrutamiento.py)
+MODELO_LIGERO = os.environ.get("COBRA_MODELO_LIGERO", "gemini-2.5-flash-lite")
+TEMPERATURA_LIGERO = 0.0
+MAX_TOKENS_SALIDA_LIGERO = 256
+# No olvide configurar su API KEY (variable GOOGLE_API_KEY o aquí)
+API_KEY = os.environ.get("GOOGLE_API_KEY", "SU API KEY AQUI")
+
+
+def crear_llm(**opciones):
+    """Crea el modelo Gemini con la configuración por defecto del proyecto."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    parametros = {
+        "model": MODELO,
+        "temperature": TEMPERATURA,
+        "max_output_tokens": MAX_TOKENS_SALIDA,
+        "google_api_key": API_KEY,
+    }
+    parametros.update(opciones)
+    return ChatGoogleGenerativeAI(**parametros)
+
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """
+    Modelo compartido del chat, con reintentos, circuit breaker y
+    deduplicación de pedidos idénticos en vuelo (ver resiliencia.py).
+    """
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = ModeloResiliente(crear_llm())
+    return _llm
+
+
+def set_llm(modelo: Optional[object]):
+    """Reemplaza el modelo compartido (útil en pruebas y benchmarks)."""
+    global _llm
+    _llm = modelo
+
+
+_llm_ligero = None
+
+
+def get_llm_ligero():
+    """Modelo barato y de respuestas cortas para los turnos que no redactan speeches."""
+    global _llm_ligero
+    if _llm_ligero is None:
+        with _llm_lock:
+            if _llm_ligero is None:
+                _llm_ligero = ModeloResiliente(crear_llm(
+                    model=MODELO_LIGERO,
+                    temperature=TEMPERATURA_LIGERO,
+                    max_output_tokens=MAX_TOKENS_SALIDA_LIGERO,
+                ))
+    return _llm_ligero
+
+
+def set_llm_ligero(modelo: Optional[object]):
+    """Reemplaza el modelo ligero compartido (útil en pruebas y benchmarks)."""
+    global _llm_ligero
+    _llm_ligero = modelo
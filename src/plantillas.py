@@ -0,0 +1,247 @@
+"""
+Speeches de cobranza armados con plantillas locales, sin red ni modelo.
+
+Cada tono tiene variantes para los párrafos que exige el prompt (saludo e
+identificación de la deuda, urgencia y facilidades, llamado a la acción y,
+con deuda alta, un mensaje de ánimo) y se completan con el nombre, el
+producto, el monto y los días de mora del cliente. Un speech se arma en
+microsegundos, así que una campaña queda limitada por la CPU y no por la
+cuota de la API.
+
+Cada cliente parte de una combinación propia (derivada de su nombre) y cada
+regeneración avanza a la siguiente: las versiones no se repiten hasta
+recorrer todas las variantes. Si un párrafo obligatorio no tiene variante
+que aplique (p. ej. deuda alta sin días de mora) se retorna None y el speech
+lo redacta el modelo, igual que cuando se pide un speech creativo.
+"""
+import os
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+from typing import Optional
+
+from cliente_store import normalizar_nombre
+from tonos import DEUDA_ALTA, clasificar_tono
+
+SPEECH_LOCAL_ACTIVO = os.environ.get("COBRA_SPEECH_LOCAL", "1") != "0"
+# Clientes cuya última versión se recuerda (LRU) para no repetirla al regenerar
+MAX_CLIENTES = 10_000
+
+# `cuando` filtra la variante según el cliente (None = aplica siempre)
+Variante = namedtuple("Variante", ["texto", "cuando"], defaults=[None])
+
+PARRAFOS = ("saludo", "urgencia", "accion", "animo")
+OPCIONALES = {"animo"}
+
+
+def _con_mora(cliente) -> bool:
+    return cliente["dias_mora"] >= 1
+
+
+def _sin_mora(cliente) -> bool:
+    return cliente["dias_mora"] < 1
+
+
+def _deuda_alta(cliente) -> bool:
+    return cliente["deuda"] > DEUDA_ALTA
+
+
+PLANTILLAS = {
+    "empatico": {
+        "saludo": [
+            Variante("Hola, {nombre}. Te escribimos de [Empresa] para recordarte, con mucho gusto, que tu "
+                     "{producto} tiene un saldo pendiente de {deuda}, con {mora} de atraso.", _con_mora),
+            Variante("Estimado/a {nombre}, esperamos que te encuentres muy bien. Queremos avisarte que el pago "
+                     "de tu {producto} por {deuda} lleva {mora} pendiente; seguramente se trata de un simple "
+                     "olvido.", _con_mora),
+            Variante("¡Buen día, {nombre}! Soy [Nombre del asesor], de [Empresa]. Te contactamos porque en tu "
+                     "{producto} figura un saldo de {deuda} que se encuentra con {mora} de mora.", _con_mora),
+            Variante("Querido/a {nombre}, un saludo cordial de parte de [Empresa]. Revisando tu {producto}, "
+                     "vimos que hay {deuda} por regularizar desde hace {mora}.", _con_mora),
+            Variante("Hola, {nombre}. Te saludamos de [Empresa] para recordarte que el pago de tu {producto} "
+                     "por {deuda} vence hoy; aún estás a tiempo de mantenerlo al día.", _sin_mora),
+        ],
+        "urgencia": [
+            Variante("Ponerte al día hoy te evita recargos y mantiene intacto tu buen historial crediticio. Si te "
+                     "resulta más cómodo, podemos dividir el monto en cuotas pequeñas sin complicaciones."),
+            Variante("Sabemos que el día a día está lleno de pendientes, por eso queremos ayudarte a resolver "
+                     "este en pocos minutos. Pagar ahora te da tranquilidad y evita intereses adicionales; "
+                     "además, contamos con facilidades de pago si las necesitas."),
+            Variante("Regularizar tu {producto} esta semana te permite seguir disfrutando de todos sus beneficios "
+                     "sin interrupciones. Si el monto completo no te acomoda, con gusto te proponemos un plan a "
+                     "tu medida."),
+            Variante("Cuanto antes lo resuelvas, menos cargos se acumularán y más tranquilidad tendrás. Tenemos "
+                     "opciones flexibles, como pagos parciales o una fecha acordada contigo."),
+        ],
+        "accion": [
+            Variante("Puedes pagar en [Enlace de pago] o escribirnos a [Teléfono de contacto] y te guiamos paso "
+                     "a paso. ¡Gracias por tu confianza, {nombre}!"),
+            Variante("Para ponerte al día, responde este mensaje o llámanos al [Teléfono de contacto]; también "
+                     "puedes pagar directamente en [Enlace de pago]. Quedamos atentos, {nombre}."),
+            Variante("Te dejamos nuestros canales: [Teléfono de contacto] y [Correo de contacto]. Si ya "
+                     "realizaste el pago, por favor ignora este mensaje. ¡Que tengas un excelente día!"),
+            Variante("Cuando quieras, contáctanos en [Teléfono de contacto] de [Horario de atención] y lo "
+                     "resolvemos juntos. Un saludo cordial, [Nombre del asesor], [Empresa]."),
+        ],
+    },
+    "firme": {
+        "saludo": [
+            Variante("{nombre}, le contactamos de [Empresa] porque su {producto} registra una deuda de {deuda} "
+                     "con {mora} de mora, y necesitamos regularizarla a la brevedad.", _con_mora),
+            Variante("Estimado/a {nombre}: le informamos que el saldo de {deuda} de su {producto} permanece "
+                     "impago desde hace {mora}. Es importante atender esta situación cuanto antes.", _con_mora),
+            Variante("Buen día, {nombre}. Le escribe [Nombre del asesor], de [Empresa], en relación con su "
+                     "{producto}: a la fecha mantiene un saldo vencido de {deuda} y {mora} de atraso.", _con_mora),
+            Variante("{nombre}, su cuenta de {producto} presenta {mora} de mora y un monto pendiente de {deuda}. "
+                     "Le pedimos su atención inmediata a este aviso.", _con_mora),
+            Variante("Estimado/a {nombre}: le recordamos desde [Empresa] que hoy vence el pago de {deuda} de su "
+                     "{producto}. Es importante que lo realice dentro del plazo.", _sin_mora),
+        ],
+        "urgencia": [
+            Variante("Cada día de atraso suma intereses y recargos que encarecen su deuda y pueden afectar su "
+                     "calificación crediticia. Si paga ahora, evita estos costos y conserva el acceso a su "
+                     "{producto}."),
+            Variante("Le recomendamos resolverlo esta semana: así evita que la mora siga creciendo y que su "
+                     "historial se vea afectado. Podemos ofrecerle un plan de pagos en cuotas o una fecha de "
+                     "pago comprometida."),
+            Variante("Regularizar su situación ahora le permite mantener su cuenta activa y sin cargos "
+                     "adicionales. Si no puede cubrir el total, conversemos un acuerdo de pago que se ajuste a "
+                     "su presupuesto."),
+            Variante("Es el momento de actuar: mientras más se extienda el atraso, mayores serán los recargos. "
+                     "Tenemos disponibles alternativas como un pago parcial inmediato o el refinanciamiento "
+                     "del saldo."),
+        ],
+        "accion": [
+            Variante("Le pedimos realizar el pago o comunicarse con nosotros dentro de las próximas 72 horas al "
+                     "[Teléfono de contacto] o en [Enlace de pago]. Atentamente, [Nombre del asesor], [Empresa]."),
+            Variante("Comuníquese hoy mismo al [Teléfono de contacto] o escríbanos a [Correo de contacto] para "
+                     "acordar su pago. Si ya lo realizó, envíenos el comprobante para actualizar su cuenta."),
+            Variante("Puede pagar en [Enlace de pago] o acercarse a [Dirección de atención]. Quedamos a la "
+                     "espera de su respuesta antes del [Fecha límite]."),
+            Variante("Responda este mensaje para coordinar una solución o llame al [Teléfono de contacto] en "
+                     "[Horario de atención]. Contamos con su compromiso, {nombre}."),
+        ],
+    },
+    "serio": {
+        "saludo": [
+            Variante("{nombre}: su {producto} mantiene una deuda vencida de {deuda} con {mora} de mora. Este es "
+                     "un aviso formal de [Empresa] para que regularice su situación de inmediato.", _con_mora),
+            Variante("Señor/a {nombre}, le notificamos que el saldo de {deuda} correspondiente a su {producto} "
+                     "acumula {mora} sin pago. La situación de su cuenta requiere atención urgente.", _con_mora),
+            Variante("{nombre}, le escribe [Nombre del asesor], del área de cobranzas de [Empresa]. Su "
+                     "{producto} registra {mora} de atraso y un monto adeudado de {deuda}.", _con_mora),
+            Variante("Aviso importante para {nombre}: su cuenta de {producto} presenta un saldo impago de "
+                     "{deuda} y {mora} de mora, un nivel de atraso que nos obliga a contactarle de forma "
+                     "directa.", _con_mora),
+        ],
+        "urgencia": [
+            Variante("De no recibir su pago, la cuenta podrá ser reportada a las centrales de riesgo y derivada "
+                     "a gestión prejudicial, con los costos que ello implica. Todavía está a tiempo de evitarlo: "
+                     "podemos ofrecerle un convenio de pago o la condonación parcial de intereses."),
+            Variante("Si la deuda no se regulariza, iniciaremos las acciones de cobranza correspondientes, que "
+                     "pueden afectar seriamente su historial crediticio. Antes de llegar a esa instancia, "
+                     "queremos proponerle un acuerdo de pago viable."),
+            Variante("Mantener este atraso puede derivar en un reporte negativo de su historial y en un proceso "
+                     "de cobranza judicial. Pagando ahora, o firmando un convenio, detiene los recargos y evita "
+                     "estas consecuencias."),
+            Variante("Esta es una de las últimas instancias para resolver la deuda de forma amistosa. Sin "
+                     "respuesta, el caso pasará a cobranza externa; si se comunica hoy, podemos estudiar un "
+                     "refinanciamiento o descuentos por pronto pago."),
+        ],
+        "accion": [
+            Variante("Comuníquese en un plazo máximo de 48 horas al [Teléfono de contacto] o pague en [Enlace de "
+                     "pago]. [Nombre del asesor], área de cobranzas de [Empresa]."),
+            Variante("Le solicitamos contactarnos hoy mismo al [Teléfono de contacto] o a [Correo de contacto] "
+                     "para formalizar su pago o convenio antes del [Fecha límite]."),
+            Variante("Para evitar acciones adicionales, realice el pago en [Enlace de pago] o acérquese a "
+                     "[Dirección de atención] antes del [Fecha límite]. Si ya pagó, envíenos su comprobante."),
+            Variante("Responda este aviso o llame al [Teléfono de contacto] en [Horario de atención]. Su "
+                     "respuesta oportuna es indispensable para detener el proceso, {nombre}."),
+        ],
+        "animo": [
+            Variante("Sabemos que un monto así puede parecer difícil de afrontar, pero no tiene que resolverlo "
+                     "sin ayuda: con un plan ordenado, muchos clientes han saldado deudas similares. Estamos "
+                     "para acompañarle a dar el primer paso.", _deuda_alta),
+            Variante("Queremos que sepa que esta situación tiene solución. Dar el primer paso hoy, aunque sea "
+                     "con un pago parcial, marca la diferencia y le devuelve la tranquilidad.", _deuda_alta),
+            Variante("Confiamos en que podemos encontrar juntos una salida. Cada cuota que pague le acerca a "
+                     "cerrar este capítulo y a recuperar su tranquilidad financiera.", _deuda_alta),
+        ],
+    },
+}
+
+
+def campos_speech(cliente: dict) -> dict:
+    """Valores con los que se completan las plantillas."""
+    dias = int(cliente["dias_mora"])
+    return {
+        "nombre": str(cliente["nombre"]).strip(),
+        "producto": str(cliente["producto"]).strip(),
+        "deuda": f"${float(cliente['deuda']):,.2f}",
+        "mora": "1 día" if dias == 1 else f"{dias} días",
+    }
+
+
+class MotorPlantillas:
+    """
+    Arma speeches desde `plantillas` ({tono: {párrafo: [Variante]}}).
+    Recuerda la versión entregada a cada cliente para que regenerar no la
+    repita. Seguro entre hilos.
+    """
+
+    def __init__(self, plantillas: dict = PLANTILLAS, max_clientes: int = MAX_CLIENTES):
+        self.plantillas = plantillas
+        self.max_clientes = max_clientes
+        self._versiones = OrderedDict()  # nombre_norm -> versión entregada
+        self._lock = threading.Lock()
+
+    def generar(self, cliente: dict, regenerar: bool = False) -> Optional[str]:
+        """Speech del cliente, o None si algún párrafo obligatorio no tiene variante que aplique."""
+        cliente = {**cliente, "deuda": float(cliente["deuda"]), "dias_mora": int(cliente["dias_mora"])}
+        parrafos = self.plantillas.get(clasificar_tono(cliente["deuda"], cliente["dias_mora"]), {})
+        opciones = []
+        for parrafo in PARRAFOS:
+            aplicables = [v for v in parrafos.get(parrafo, ()) if v.cuando is None or v.cuando(cliente)]
+            if aplicables:
+                opciones.append((parrafo, aplicables))
+            elif parrafo not in OPCIONALES:
+                return None
+
+        nombre_norm = normalizar_nombre(cliente["nombre"])
+        with self._lock:
+            version = self._versiones.get(nombre_norm, 0) + (1 if regenerar and nombre_norm in self._versiones else 0)
+            self._versiones[nombre_norm] = version
+            self._versiones.move_to_end(nombre_norm)
+            while len(self._versiones) > self.max_clientes:
+                self._versiones.popitem(last=False)
+
+        # Cada párrafo avanza una variante por versión desde un inicio propio del
+        # cliente: dos versiones seguidas no comparten párrafos
+        campos = campos_speech(cliente)
+        return "\n\n".join(
+            aplicables[(zlib.crc32(f"{nombre_norm}|{parrafo}".encode("utf-8")) + version) % len(aplicables)]
+            .texto.format_map(campos)
+            for parrafo, aplicables in opciones
+        )
+
+
+_motor: Optional[MotorPlantillas] = None
+_motor_lock = threading.Lock()
+
+
+def get_motor_plantillas() -> Optional[MotorPlantillas]:
+    """Motor compartido; None si los speeches locales están desactivados (COBRA_SPEECH_LOCAL=0)."""
+    global _motor
+    if not SPEECH_LOCAL_ACTIVO:
+        return None
+    if _motor is None:
+        with _motor_lock:
+            if _motor is None:
+                _motor = MotorPlantillas()
+    return _motor
+
+
+def set_motor_plantillas(motor: Optional[MotorPlantillas]):
+    """Reemplaza el motor compartido (útil en pruebas)."""
+    global _motor
+    _motor = motor
@@ -0,0 +1,293 @@
+"""
+Utilidades para llamar al modelo bajo cuota: limitador de tasa tipo token
+bucket, reintentos con backoff exponencial, circuit breaker y un envoltorio
+del modelo que además une las solicitudes idénticas en vuelo.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from metricas import contar_tokens, cronometrar
+
+# Códigos HTTP que indican un fallo transitorio del proveedor
+CODIGOS_REINTENTABLES = {408, 429, 500, 502, 503, 504}
+NOMBRES_REINTENTABLES = (
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded",
+    "TooManyRequests", "RateLimit", "Timeout", "InternalServerError",
+)
+
+
+class TokenBucket:
+    """
+    Limitador de tasa: permite ráfagas de hasta `capacidad` solicitudes y un
+    promedio sostenido de `tasa` solicitudes por segundo.
+    """
+
+    def __init__(self, tasa: float, capacidad: float = None):
+        self.tasa = tasa
+        self.capacidad = capacidad if capacidad is not None else max(1.0, tasa)
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    async def adquirir(self, cantidad: float = 1.0):
+        async with self._lock:
+            while True:
+                self._recargar()
+                if self._tokens >= cantidad:
+                    self._tokens -= cantidad
+                    return
+                await asyncio.sleep((cantidad - self._tokens) / self.tasa)
+
+
+def codigo_estado(exc: BaseException):
+    """Extrae el código HTTP de la excepción, si el proveedor lo expone."""
+    for atributo in ("status_code", "code", "status"):
+        valor = getattr(exc, atributo, None)
+        if isinstance(valor, int):
+            return valor
+    respuesta = getattr(exc, "response", None)
+    return getattr(respuesta, "status_code", None)
+
+
+def es_reintentable(exc: BaseException) -> bool:
+    """Fallos transitorios: cuota agotada, servicio caído o timeouts."""
+    if isinstance(exc, CircuitoAbierto):
+        return False
+    if isinstance(exc, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    if codigo_estado(exc) in CODIGOS_REINTENTABLES:
+        return True
+    nombre = type(exc).__name__
+    return any(clave in nombre for clave in NOMBRES_REINTENTABLES)
+
+
+def espera_backoff(intento: int, base: float = 0.5, maximo: float = 30.0, exc: BaseException = None) -> float:
+    """
+    Backoff exponencial con jitter completo. Si el proveedor indica
+    Retry-After, se respeta como mínimo.
+    """
+    espera = random.uniform(0, min(maximo, base * (2 ** intento)))
+    retry_after = getattr(exc, "retry_after", None) if exc is not None else None
+    if isinstance(retry_after, (int, float)):
+        espera = max(espera, float(retry_after))
+    return espera
+
+
+async def reintentar_async(funcion, *args, intentos: int = 4, base: float = 0.5, maximo: float = 30.0, **kwargs):
+    """Ejecuta la corrutina `funcion` reintentando los fallos transitorios."""
+    for intento in range(intentos + 1):
+        try:
+            return await funcion(*args, **kwargs)
+        except Exception as exc:
+            if intento >= intentos or not es_reintentable(exc):
+                raise
+            await asyncio.sleep(espera_backoff(intento, base, maximo, exc))
+
+
+def reintentar(funcion, *args, intentos: int = 4, base: float = 0.5, maximo: float = 30.0, **kwargs):
+    """Versión síncrona de reintentar_async."""
+    for intento in range(intentos + 1):
+        try:
+            return funcion(*args, **kwargs)
+        except Exception as exc:
+            if intento >= intentos or not es_reintentable(exc):
+                raise
+            time.sleep(espera_backoff(intento, base, maximo, exc))
+
+
+class CircuitoAbierto(RuntimeError):
+    """El proveedor está fallando: se rechaza la llamada sin intentarla."""
+
+    def __init__(self, reintentar_en: float):
+        super().__init__(f"servicio del modelo no disponible, reintenta en {reintentar_en:.0f} s")
+        self.reintentar_en = reintentar_en
+
+
+class CircuitBreaker:
+    """
+    Tras `umbral` fallos transitorios seguidos el circuito se abre y las
+    llamadas fallan al instante durante `espera_s`. Luego deja pasar una
+    sola llamada de prueba: si funciona se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, umbral: int = 5, espera_s: float = 30.0):
+        self.umbral = umbral
+        self.espera_s = espera_s
+        self.fallos = 0
+        self._abierto_hasta = 0.0
+        self._probando = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        if self.fallos < self.umbral:
+            return "cerrado"
+        return "abierto" if time.monotonic() < self._abierto_hasta else "semiabierto"
+
+    def permitir(self):
+        """Lanza CircuitoAbierto si la llamada no debe intentarse."""
+        with self._lock:
+            if self.fallos < self.umbral:
+                return
+            restante = self._abierto_hasta - time.monotonic()
+            if restante > 0 or self._probando:
+                raise CircuitoAbierto(max(restante, 0.0))
+            self._probando = True
+
+    def registrar_exito(self):
+        with self._lock:
+            self.fallos = 0
+            self._probando = False
+
+    def registrar_fallo(self, exc: BaseException):
+        # Solo los fallos del proveedor cuentan; un pedido inválido no indica caída
+        if not es_reintentable(exc):
+            with self._lock:
+                self._probando = False
+            return
+        with self._lock:
+            self.fallos += 1
+            self._probando = False
+            if self.fallos >= self.umbral:
+                self._abierto_hasta = time.monotonic() + self.espera_s
+
+
+def clave_llamada(mensajes, kwargs=None) -> str:
+    """Huella del pedido al modelo; ignora los ids, que cambian entre sesiones."""
+    partes = [
+        (
+            getattr(m, "type", type(m).__name__),
+            getattr(m, "content", m),
+            [(c["name"], c["args"]) for c in getattr(m, "tool_calls", None) or []],
+        )
+        for m in (mensajes if isinstance(mensajes, list) else [mensajes])
+    ]
+    datos = json.dumps([partes, kwargs or {}], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(datos.encode("utf-8")).hexdigest()
+
+
+class ModeloResiliente:
+    """
+    Envuelve un chat model (o el resultado de bind_tools) con:
+    * deduplicación: pedidos idénticos en vuelo comparten una sola llamada,
+    * reintentos con backoff y jitter ante fallos transitorios,
+    * circuit breaker compartido entre todas las variantes del modelo.
+
+    stream/astream pasan los tokens tal cual y solo respetan el breaker: un
+    stream no se puede repetir a medias ni compartir. Quien espera un pedido
+    idéntico en vuelo (invoke/ainvoke) recibe la respuesta completa al final,
+    sin tokens intermedios.
+    """
+
+    def __init__(self, modelo, intentos: int = 4, base: float = 0.5, maximo: float = 30.0,
+                 breaker: CircuitBreaker = None):
+        self.modelo = modelo
+        self.intentos = intentos
+        self.base = base
+        self.maximo = maximo
+        self.breaker = breaker or CircuitBreaker()
+        self._en_vuelo = {}        # clave -> Future (llamadas síncronas)
+        self._en_vuelo_async = {}  # (loop, clave) -> Task
+        self._lock = threading.Lock()
+
+    def bind_tools(self, tools, **kwargs) -> "ModeloResiliente":
+        return ModeloResiliente(self.modelo.bind_tools(tools, **kwargs), self.intentos, self.base,
+                                self.maximo, self.breaker)
+
+    def _llamar(self, mensajes, config, kwargs):
+        self.breaker.permitir()
+        try:
+            with cronometrar("modelo_segundos"):
+                respuesta = self.modelo.invoke(mensajes, config, **kwargs)
+        except Exception as exc:
+            self.breaker.registrar_fallo(exc)
+            raise
+        self.breaker.registrar_exito()
+        contar_tokens(respuesta)
+        return respuesta
+
+    async def _allamar(self, mensajes, config, kwargs):
+        self.breaker.permitir()
+        try:
+            with cronometrar("modelo_segundos"):
+                respuesta = await self.modelo.ainvoke(mensajes, config, **kwargs)
+        except Exception as exc:
+            self.breaker.registrar_fallo(exc)
+            raise
+        self.breaker.registrar_exito()
+        contar_tokens(respuesta)
+        return respuesta
+
+    def stream(self, mensajes, config=None, **kwargs):
+        self.breaker.permitir()
+        respuesta = None
+        try:
+            with cronometrar("modelo_segundos"):
+                for chunk in self.modelo.stream(mensajes, config, **kwargs):
+                    respuesta = chunk if respuesta is None else respuesta + chunk
+                    yield chunk
+        except BaseException as exc:
+            # También si se abandona el stream: libera la prueba del circuito semiabierto
+            self.breaker.registrar_fallo(exc)
+            raise
+        self.breaker.registrar_exito()
+        contar_tokens(respuesta)
+
+    async def astream(self, mensajes, config=None, **kwargs):
+        self.breaker.permitir()
+        respuesta = None
+        try:
+            with cronometrar("modelo_segundos"):
+                async for chunk in self.modelo.astream(mensajes, config, **kwargs):
+                    respuesta = chunk if respuesta is None else respuesta + chunk
+                    yield chunk
+        except BaseException as exc:
+            self.breaker.registrar_fallo(exc)
+            raise
+        self.breaker.registrar_exito()
+        contar_tokens(respuesta)
+
+    def invoke(self, mensajes, config=None, **kwargs):
+        clave = clave_llamada(mensajes, kwargs)
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = self._en_vuelo[clave] = Future()
+        if not lider:
+            return futuro.result()
+
+        try:
+            respuesta = reintentar(self._llamar, mensajes, config, kwargs,
+                                   intentos=self.intentos, base=self.base, maximo=self.maximo)
+            futuro.set_result(respuesta)
+            return respuesta
+        except BaseException as exc:
+            futuro.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+
+    async def ainvoke(self, mensajes, config=None, **kwargs):
+        clave = (id(asyncio.get_running_loop()), clave_llamada(mensajes, kwargs))
+        tarea = self._en_vuelo_async.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(reintentar_async(
+                self._allamar, mensajes, config, kwargs,
+                intentos=self.intentos, base=self.base, maximo=self.maximo,
+            ))
+            self._en_vuelo_async[clave] = tarea
+            tarea.add_done_callback(lambda _: self._en_vuelo_async.pop(clave, None))
+        # shield: si un solicitante se cancela, los demás siguen esperando el resultado
+        return await asyncio.shield(tarea)
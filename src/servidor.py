@@ -0,0 +1,408 @@
+"""
+Servidor HTTP sin interfaz para atender a varios cobradores con un solo proceso.
+
+Expone el grafo compilado del agente con un hilo de conversación por sesión.
+Los mensajes entran a una cola acotada que atiende un número fijo de workers:
+si la cola está llena el servidor responde 503 con Retry-After en lugar de
+acumular trabajo. La respuesta se transmite como NDJSON (una línea JSON por
+evento) con transfer-encoding chunked.
+
+Rutas:
+    POST   /sesiones                    -> {"sesion": id}
+    POST   /sesiones/<id>/mensajes      {"texto": ...} -> stream NDJSON de eventos
+    DELETE /sesiones/<id>               -> libera la conversación
+    POST   /consultas                   {"consulta", "limite", "offset"} -> página de clientes (máx. 100)
+    GET    /salud                       -> estado de la cola y los workers
+    GET    /metricas                    -> métricas en texto Prometheus (COBRA_METRICAS=1)
+    GET    /metricas/eventos            -> observaciones recientes en JSONL
+
+Con --envejecer-cada-h el mismo proceso actualiza la mora de la cartera al
+arrancar y luego cada tantas horas (ver envejecimiento.py).
+
+Uso:
+    python src/servidor.py --puerto 8765 --trabajadores 8
+    COBRA_SERVIDOR_URL=http://127.0.0.1:8765 python src/agente_cobranza.py
+"""
+import argparse
+import asyncio
+import json
+import re
+import urllib.request
+import uuid
+from typing import AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+MAX_CUERPO = 1_000_000
+_SESION_VALIDA = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_ESTADOS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            409: "Conflict", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _json(datos) -> bytes:
+    return json.dumps(datos, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def evento_json(evento: str, contenido, previo: str = "") -> dict:
+    """Convierte un evento de transmitir_respuesta en un objeto serializable."""
+    if evento == "texto":
+        # Se envía solo lo nuevo; `reinicio` indica que empezó otro turno del agente
+        if contenido.startswith(previo):
+            return {"evento": "texto", "delta": contenido[len(previo):], "reinicio": False}
+        return {"evento": "texto", "delta": contenido, "reinicio": True}
+    if evento == "tabla":
+        return {"evento": "tabla", "contenido": contenido.content, "artifact": contenido.artifact}
+    return {"evento": "fin", "texto": contenido}
+
+
+class ServidorCobranza:
+    """Servidor asyncio con cola acotada y workers para el grafo del agente."""
+
+    def __init__(self, host: str = "127.0.0.1", puerto: int = 8765, trabajadores: int = 8,
+                 max_cola: int = 64, envejecer_cada_s: Optional[float] = None):
+        self.host = host
+        self.puerto = puerto
+        self.trabajadores = trabajadores
+        self.max_cola = max_cola
+        self.envejecer_cada_s = envejecer_cada_s
+        self._cola: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._activas = set()
+        self._servidor = None
+
+    async def iniciar(self):
+        self._cola = asyncio.Queue(maxsize=self.max_cola)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.trabajadores)]
+        if self.envejecer_cada_s:
+            self._workers.append(asyncio.create_task(self._envejecer_periodicamente()))
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        # Con puerto 0 el sistema asigna uno libre
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+
+    async def detener(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def servir(self):
+        # El grafo y el modelo se cargan antes de aceptar el primer mensaje
+        from grafo import get_app, get_modelo_agente
+        await asyncio.to_thread(lambda: (get_app(), get_modelo_agente("ligero"), get_modelo_agente()))
+        await self.iniciar()
+        print(f"COBRA-BOT escuchando en http://{self.host}:{self.puerto}")
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    async def _worker(self):
+        from langchain_core.messages import HumanMessage
+        from grafo import transmitir_respuesta
+
+        while True:
+            trabajo = await self._cola.get()
+            eventos = trabajo["eventos"]
+            previo = ""
+            try:
+                inputs = {"messages": [HumanMessage(content=trabajo["texto"])]}
+                config = {"configurable": {"thread_id": trabajo["sesion"]}}
+                async for evento, contenido in transmitir_respuesta(inputs, config):
+                    if trabajo["cancelado"].is_set():
+                        break
+                    await eventos.put(evento_json(evento, contenido, previo))
+                    if evento == "texto":
+                        previo = contenido
+            except Exception as e:
+                await eventos.put({
+                    "evento": "error",
+                    "tipo": type(e).__name__,
+                    "mensaje": str(e),
+                    "reintentar_en": getattr(e, "reintentar_en", None),
+                })
+            finally:
+                self._activas.discard(trabajo["sesion"])
+                await eventos.put(None)
+                self._cola.task_done()
+
+    async def _envejecer_periodicamente(self):
+        from envejecimiento import envejecer_cartera
+
+        while True:
+            try:
+                resultado = await asyncio.to_thread(envejecer_cartera)
+                print(resultado.resumen())
+            except Exception as e:
+                # Un fallo puntual (p. ej. base bloqueada) se reintenta en el próximo ciclo
+                print(f"Error al envejecer la mora: {type(e).__name__}: {e}")
+            await asyncio.sleep(self.envejecer_cada_s)
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            metodo, ruta, cuerpo = await self._leer_pedido(reader)
+            await self._despachar(metodo, ruta, cuerpo, writer)
+        except ErrorHTTP as e:
+            extra = {"Retry-After": "1"} if e.estado == 503 else None
+            await self._responder(writer, e.estado, {"error": str(e)}, extra)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _leer_pedido(self, reader):
+        linea = (await reader.readline()).decode("latin-1").strip()
+        partes = linea.split(" ")
+        if len(partes) != 3:
+            raise ErrorHTTP(400, "pedido inválido")
+        metodo, ruta, _ = partes
+        cabeceras = {}
+        while True:
+            linea = (await reader.readline()).decode("latin-1").strip()
+            if not linea:
+                break
+            nombre, _, valor = linea.partition(":")
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        try:
+            largo = int(cabeceras.get("content-length", "0") or 0)
+        except ValueError:
+            raise ErrorHTTP(400, "Content-Length inválido")
+        if largo < 0:
+            raise ErrorHTTP(400, "Content-Length inválido")
+        if largo > MAX_CUERPO:
+            raise ErrorHTTP(413, "cuerpo demasiado grande")
+        cuerpo = {}
+        if largo:
+            try:
+                cuerpo = json.loads(await reader.readexactly(largo))
+            except ValueError:
+                raise ErrorHTTP(400, "JSON inválido")
+            if not isinstance(cuerpo, dict):
+                raise ErrorHTTP(400, "el cuerpo debe ser un objeto JSON")
+        return metodo, urlsplit(ruta).path.rstrip("/"), cuerpo
+
+    async def _despachar(self, metodo, ruta, cuerpo, writer):
+        partes = ruta.strip("/").split("/")
+
+        if ruta == "/salud" and metodo == "GET":
+            return await self._responder(writer, 200, {
+                "estado": "ok",
+                "en_cola": self._cola.qsize(),
+                "sesiones_activas": len(self._activas),
+                "trabajadores": self.trabajadores,
+            })
+
+        if ruta == "/metricas" and metodo == "GET":
+            from metricas import get_registro
+            return await self._responder(writer, 200, get_registro().exportar_prometheus(),
+                                         tipo="text/plain; version=0.0.4; charset=utf-8")
+
+        if ruta == "/metricas/eventos" and metodo == "GET":
+            from metricas import get_registro
+            return await self._responder(writer, 200, get_registro().exportar_jsonl(),
+                                         tipo="application/x-ndjson; charset=utf-8")
+
+        if ruta == "/sesiones" and metodo == "POST":
+            return await self._responder(writer, 200, {"sesion": uuid.uuid4().hex})
+
+        if ruta == "/consultas" and metodo == "POST":
+            return await self._responder(writer, 200, await self._consultar(cuerpo))
+
+        if len(partes) >= 2 and partes[0] == "sesiones":
+            sesion = partes[1]
+            if not _SESION_VALIDA.match(sesion):
+                raise ErrorHTTP(400, "id de sesión inválido")
+            if len(partes) == 2 and metodo == "DELETE":
+                from grafo import get_checkpointer
+                if sesion in self._activas:
+                    raise ErrorHTTP(409, "la sesión tiene un mensaje en curso")
+                await asyncio.to_thread(get_checkpointer().delete_thread, sesion)
+                return await self._responder(writer, 200, {"sesion": sesion, "eliminada": True})
+            if len(partes) == 3 and partes[2] == "mensajes" and metodo == "POST":
+                return await self._transmitir(sesion, cuerpo, writer)
+
+        raise ErrorHTTP(404, "ruta no encontrada")
+
+    async def _consultar(self, cuerpo):
+        from cliente_store import get_store
+        from herramientas import LIMITE_PAGINA, acotar_pagina
+
+        # Mismos márgenes que leer_base_datos: nunca la tabla entera de una vez
+        limite, offset = cuerpo.get("limite", LIMITE_PAGINA), cuerpo.get("offset", 0)
+        if not all(isinstance(v, int) and not isinstance(v, bool) for v in (limite, offset)):
+            raise ErrorHTTP(400, "limite y offset deben ser enteros")
+        limite, offset = acotar_pagina(limite, offset)
+        try:
+            pagina, resumen = await asyncio.to_thread(
+                get_store().consultar, **(cuerpo.get("consulta") or {}), limite=limite, offset=offset,
+            )
+        except (TypeError, ValueError) as e:
+            raise ErrorHTTP(400, f"consulta inválida: {e}")
+        datos = pagina.to_dict("split")
+        return {"columnas": datos["columns"], "filas": datos["data"], "resumen": resumen}
+
+    async def _transmitir(self, sesion, cuerpo, writer):
+        texto = str(cuerpo.get("texto", "")).strip()
+        if not texto:
+            raise ErrorHTTP(400, "falta 'texto'")
+        # Un mensaje a la vez por sesión: el historial es secuencial
+        if sesion in self._activas:
+            raise ErrorHTTP(409, "la sesión ya tiene un mensaje en curso")
+
+        trabajo = {
+            "sesion": sesion,
+            "texto": texto,
+            "eventos": asyncio.Queue(maxsize=64),
+            "cancelado": asyncio.Event(),
+        }
+        try:
+            self._cola.put_nowait(trabajo)
+        except asyncio.QueueFull:
+            raise ErrorHTTP(503, "servidor ocupado, reintenta en unos segundos")
+        self._activas.add(sesion)
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson; charset=utf-8\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        while True:
+            evento = await trabajo["eventos"].get()
+            if evento is None:
+                break
+            if trabajo["cancelado"].is_set():
+                continue  # el cliente se fue: solo se vacía la cola hasta el final
+            linea = _json(evento) + b"\n"
+            try:
+                writer.write(f"{len(linea):X}\r\n".encode() + linea + b"\r\n")
+                await writer.drain()
+            except ConnectionError:
+                trabajo["cancelado"].set()
+        if not trabajo["cancelado"].is_set():
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+
+    async def _responder(self, writer, estado, datos, extra=None, tipo="application/json; charset=utf-8"):
+        cuerpo = datos.encode("utf-8") if isinstance(datos, str) else _json(datos)
+        cabeceras = [
+            f"HTTP/1.1 {estado} {_ESTADOS.get(estado, '')}",
+            f"Content-Type: {tipo}",
+            f"Content-Length: {len(cuerpo)}",
+            "Connection: close",
+        ] + [f"{k}: {v}" for k, v in (extra or {}).items()]
+        writer.write(("\r\n".join(cabeceras) + "\r\n\r\n").encode("latin-1") + cuerpo)
+        await writer.drain()
+
+
+class ClienteCobranza:
+    """Cliente del servidor; la UI lo usa en lugar de llamar al grafo en proceso."""
+
+    def __init__(self, url: str):
+        partes = urlsplit(url)
+        self.url = url.rstrip("/")
+        self.host = partes.hostname
+        self.puerto = partes.port or 80
+
+    async def transmitir(self, sesion: str, texto: str) -> AsyncIterator[tuple]:
+        """Produce los mismos eventos que transmitir_respuesta."""
+        reader, writer = await asyncio.open_connection(self.host, self.puerto)
+        try:
+            cuerpo = _json({"texto": texto})
+            writer.write(
+                f"POST /sesiones/{sesion}/mensajes HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(cuerpo)}\r\n\r\n".encode() + cuerpo
+            )
+            await writer.drain()
+
+            estado = int((await reader.readline()).split()[1])
+            cabeceras = {}
+            while (linea := (await reader.readline()).strip()):
+                nombre, _, valor = linea.decode("latin-1").partition(":")
+                cabeceras[nombre.strip().lower()] = valor.strip()
+            if estado != 200:
+                datos = json.loads(await reader.read() or b"{}")
+                raise ErrorHTTP(estado, datos.get("error", "error del servidor"))
+
+            acumulado = ""
+            async for evento in self._eventos(reader):
+                if evento["evento"] == "texto":
+                    acumulado = evento["delta"] if evento["reinicio"] else acumulado + evento["delta"]
+                    yield "texto", acumulado
+                elif evento["evento"] == "tabla":
+                    # Import diferido: la UI remota no necesita cargar LangChain al arrancar
+                    from langchain_core.messages import ToolMessage
+                    yield "tabla", ToolMessage(content=evento["contenido"], artifact=evento["artifact"],
+                                               tool_call_id="remoto")
+                elif evento["evento"] == "fin":
+                    yield "fin", evento["texto"]
+                else:
+                    raise RuntimeError(f"{evento['tipo']}: {evento['mensaje']}")
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _eventos(reader):
+        """Decodifica el cuerpo chunked línea por línea."""
+        pendiente = b""
+        while True:
+            tamano = int((await reader.readline()).strip() or b"0", 16)
+            if tamano == 0:
+                break
+            pendiente += await reader.readexactly(tamano)
+            await reader.readexactly(2)
+            while b"\n" in pendiente:
+                linea, pendiente = pendiente.split(b"\n", 1)
+                if linea.strip():
+                    yield json.loads(linea)
+
+    def _pedir(self, metodo: str, ruta: str, datos=None) -> dict:
+        pedido = urllib.request.Request(
+            self.url + ruta, method=metodo,
+            data=_json(datos) if datos is not None else None,
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(pedido, timeout=30) as respuesta:
+            return json.loads(respuesta.read())
+
+    def consultar(self, consulta: dict, limite: int, offset: int) -> tuple:
+        """Página de una consulta: (filas, total). Misma firma que el paginador local."""
+        datos = self._pedir("POST", "/consultas", {"consulta": consulta, "limite": limite, "offset": offset})
+        return datos["filas"], datos["resumen"]["total"]
+
+    def cerrar_sesion(self, sesion: str):
+        self._pedir("DELETE", f"/sesiones/{sesion}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor COBRA-BOT para varios cobradores.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--trabajadores", type=int, default=8, help="Mensajes atendidos en simultáneo")
+    parser.add_argument("--max-cola", type=int, default=64, help="Mensajes en espera antes de responder 503")
+    parser.add_argument("--envejecer-cada-h", type=float, default=24,
+                        help="Horas entre actualizaciones de la mora (0 = no actualizar)")
+    args = parser.parse_args()
+
+    servidor = ServidorCobranza(args.host, args.puerto, args.trabajadores, args.max_cola,
+                                envejecer_cada_s=args.envejecer_cada_h * 3600 or None)
+    try:
+        asyncio.run(servidor.servir())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
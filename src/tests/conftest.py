@@ -0,0 +1,50 @@
+"""
+Configuración compartida de las pruebas: deja src/ en el path y arma los
+stores temporales que usan los distintos archivos.
+"""
+import sys
+import os
+
+import pytest
+
+ruta_src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ruta_src)
+
+import grafo
+from cache_speech import CacheSpeech, set_cache
+from checkpointer import SQLiteSaverAcotado
+from cliente_store import SQLiteClienteStore, CSVClienteStore, set_store
+
+
+def _store_configurado(backend, tmp_path):
+    """Store temporal instalado como el de la app, con un caché en memoria."""
+    if backend == "sqlite":
+        s = SQLiteClienteStore(str(tmp_path / "clientes.db"))
+    else:
+        s = CSVClienteStore(str(tmp_path / "clientes.csv"))
+    set_store(s)
+    set_cache(CacheSpeech(""))
+    yield s
+    set_store(None)
+    set_cache(None)
+    s.cerrar()
+
+
+@pytest.fixture(params=["sqlite", "csv"])
+def store(request, tmp_path):
+    """Un store por backend: las pruebas que lo usan corren en ambos."""
+    yield from _store_configurado(request.param, tmp_path)
+
+
+@pytest.fixture
+def store_sqlite(tmp_path):
+    yield from _store_configurado("sqlite", tmp_path)
+
+
+@pytest.fixture
+def store_grafo(store_sqlite):
+    """Store SQLite para el grafo, con conversaciones aisladas en memoria."""
+    grafo.set_checkpointer(SQLiteSaverAcotado(":memory:"))
+    yield store_sqlite
+    grafo.set_checkpointer(None)
+    grafo.set_modelo_agente(None)
@@ -0,0 +1,45 @@
+"""Modelo de chat falso para pruebas sin red."""
+import json
+import re
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel, GenericFakeChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+
+class ModeloGuionado(GenericFakeChatModel):
+    """
+    Responde con los AIMessage de `messages` en orden. A diferencia de
+    GenericFakeChatModel, conserva los tool_calls también en streaming.
+    """
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        mensaje = next(self.messages)
+        for parte in re.split(r"(\s)", mensaje.content or ""):
+            if not parte:
+                continue
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=parte))
+            if run_manager:
+                run_manager.on_llm_new_token(parte, chunk=chunk)
+            yield chunk
+        if mensaje.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+                for i, tc in enumerate(mensaje.tool_calls)
+            ]))
+
+
+class ModeloContador(FakeListChatModel):
+    """Modelo falso que cuenta cuántas veces se le pidió un speech."""
+    llamadas: int = 0
+
+    def invoke(self, *args, **kwargs):
+        self.llamadas += 1
+        return super().invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        self.llamadas += 1
+        return await super().ainvoke(*args, **kwargs)
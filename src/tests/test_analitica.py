@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+import herramientas
+from analitica import AgregadosCartera, tramo_mora
+from cliente_store import SQLiteClienteStore, CSVClienteStore
+
+
+def recalculado(store):
+    agregados = AgregadosCartera()
+    agregados.cargar(store.listar())
+    return agregados.resumen()
+
+
+def test_tramos_de_mora():
+    assert [tramo_mora(d) for d in (0, 14, 15, 30, 31, 45, 46, 90, 91)] == [
+        "0-14", "0-14", "15-30", "15-30", "31-45", "31-45", "46-90", "46-90", "91+"
+    ]
+
+
+def test_agregados_incrementales_coinciden_con_recalculo(store):
+    store.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    store.registrar("Luis Gómez", 1500.0, 60, "Préstamo")
+    assert store.agregados()["clientes"] == 2  # a partir de aquí se mantienen incrementalmente
+
+    store.registrar("Eva Sol", 500.0, 20, " tarjeta")
+    store.registrar("ana ruiz", 400.0, 10, "Tarjeta")
+    store.actualizar("Luis Gómez", deuda=900.0, dias_mora=30)
+    store.eliminar("Eva Sol")
+    store.registrar_lote(pd.DataFrame({
+        "nombre": ["Max Paz", "Ana Ruiz"], "deuda": [2000.0, 100.0],
+        "dias_mora": [100, 5], "producto": ["Hipoteca", "Tarjeta"],
+    }))
+    assert store.agregados() == recalculado(store)
+    with pytest.raises(RuntimeError):
+        with store.transaccion():
+            store.registrar("Fantasma", 99999.0, 999, "Tarjeta")
+            raise RuntimeError("falla")
+
+    resumen = store.agregados()
+    assert resumen == recalculado(store)
+    assert resumen["clientes"] == 3 and resumen["deuda_total"] == 3000.0
+    assert resumen["por"]["tono"] == {
+        "empatico": {"clientes": 1, "deuda_total": 100.0, "deuda_promedio": 100.0, "mora_promedio": 5.0},
+        "firme": {"clientes": 1, "deuda_total": 900.0, "deuda_promedio": 900.0, "mora_promedio": 30.0},
+        "serio": {"clientes": 1, "deuda_total": 2000.0, "deuda_promedio": 2000.0, "mora_promedio": 100.0},
+    }
+    assert list(resumen["por"]["producto"]) == ["hipoteca", "préstamo", "tarjeta"]
+    assert list(store.agregados("tramo_mora")["por"]) == ["tramo_mora"]
+
+
+def test_agregados_ven_escrituras_de_otra_instancia(tmp_path):
+    for clase, archivo in [(SQLiteClienteStore, "clientes.db"), (CSVClienteStore, "clientes.csv")]:
+        a, b = clase(str(tmp_path / archivo)), clase(str(tmp_path / archivo))
+        try:
+            a.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+            assert a.agregados()["clientes"] == 1
+            b.registrar("Luis Gómez", 1500.0, 60, "Préstamo")
+            b.actualizar("Ana Ruiz", deuda=300.0)
+            assert a.agregados() == recalculado(b)
+        finally:
+            a.cerrar()
+            b.cerrar()
+
+
+def test_herramienta_analizar_cartera(store_sqlite):
+    assert herramientas.analizar_cartera.invoke({}) == "SIN_CLIENTES"
+    store_sqlite.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    store_sqlite.registrar("Luis Gómez", 1500.0, 60, "Préstamo")
+
+    texto = herramientas.analizar_cartera.invoke({"por": "tono"})
+    assert texto.splitlines() == [
+        "ANALITICA | cartera: clientes=2 | deuda_total=$1,750.00 | deuda_promedio=$875.00 | mora_promedio=35.0",
+        "[tono]",
+        "- empatico: clientes=1 | deuda_total=$250.00 | deuda_promedio=$250.00 | mora_promedio=10.0",
+        "- serio: clientes=1 | deuda_total=$1,500.00 | deuda_promedio=$1,500.00 | mora_promedio=60.0",
+    ]
+    assert herramientas.analizar_cartera.invoke({"por": "color"}).startswith("CONSULTA_INVALIDA")
@@ -0,0 +1,18 @@
+from benchmark import comparar, ejecutar_benchmark
+
+
+def test_benchmark_pequeno_sin_red():
+    resultados = ejecutar_benchmark(filas=[50], repeticiones=3, filas_tabla=[20], repeticiones_arranque=1)
+
+    herramientas = resultados["herramientas"]["50"]
+    for nombre in ("registrar_cliente", "actualizar_deuda", "eliminar_cliente_pagado", "leer_base_datos"):
+        assert herramientas[nombre]["n"] == 3
+    assert set(resultados["grafo"]) == {"respuesta_directa", "con_herramienta", "ruta_local"}
+    assert "render_table_20" in resultados["ui"] and "mensaje_20" in resultados["ui"]
+    assert set(resultados["arranque"]) == {"herramientas", "ui", "grafo"}
+
+
+def test_comparar_reporta_solo_regresiones():
+    anterior = {"meta": {}, "grafo": {"a": {"mediana_ms": 10.0}, "b": {"mediana_ms": 10.0}, "c": {"mediana_ms": 0.01}}}
+    actual = {"meta": {}, "grafo": {"a": {"mediana_ms": 20.0}, "b": {"mediana_ms": 11.0}, "c": {"mediana_ms": 0.05}}}
+    assert comparar(actual, anterior) == [("grafo.a", 10.0, 20.0)]
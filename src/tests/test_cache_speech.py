@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import grafo
+import plantillas
+from cache_speech import CacheSpeech, clave_speech
+from generacion_lote import SinkLista, generar_speeches
+from modelo_falso import ModeloContador, ModeloGuionado
+from modelos import set_llm
+
+ANA = {"nombre": "Ana Ruiz", "deuda": 250.0, "dias_mora": 10, "producto": "Tarjeta"}
+
+
+def test_clave_depende_del_perfil_y_la_version():
+    assert clave_speech(ANA) == clave_speech({**ANA, "nombre": "  ana   RUIZ"})
+    assert clave_speech(ANA) != clave_speech({**ANA, "deuda": 251.0})
+    assert clave_speech(ANA) != clave_speech(ANA, version="otro_prompt")
+
+
+def test_memoria_y_disco(tmp_path):
+    ruta = str(tmp_path / "cache.db")
+    cache = CacheSpeech(ruta, max_memoria=1)
+    cache.guardar(ANA, "speech de Ana")
+    cache.guardar({**ANA, "nombre": "Luis"}, "speech de Luis")
+
+    # Ana salió del LRU en memoria pero sigue en disco, también para otro proceso
+    assert cache.obtener(ANA) == "speech de Ana"
+    assert CacheSpeech(ruta).obtener(ANA) == "speech de Ana"
+    assert cache.obtener({**ANA, "dias_mora": 11}) is None
+
+    assert cache.invalidar("ANA RUIZ") == 1
+    assert cache.obtener(ANA) is None
+
+
+def test_ttl_y_limite_de_disco(tmp_path):
+    cache = CacheSpeech(str(tmp_path / "cache.db"), max_disco=2, ttl_s=0.05)
+    for i in range(3):
+        cache.guardar({**ANA, "nombre": f"Cliente {i}"}, f"speech {i}")
+    assert cache.contar() == 2
+
+    time.sleep(0.1)
+    assert cache.obtener({**ANA, "nombre": "Cliente 2"}) is None
+
+
+@pytest.fixture
+def entorno(store_grafo, monkeypatch):
+    # El caché guarda lo que redacta el modelo: sin plantillas locales
+    monkeypatch.setattr(plantillas, "SPEECH_LOCAL_ACTIVO", False)
+    grafo.set_modelo_agente(ModeloGuionado(messages=iter([])))
+    modelo = ModeloContador(responses=["Estimada Ana, primera versión.", "Estimada Ana, segunda versión."])
+    set_llm(modelo)
+    store_grafo.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    yield modelo
+    set_llm(None)
+
+
+def pedir(texto, hilo="cache_1"):
+    estado = grafo.get_app().invoke({"messages": [HumanMessage(content=texto)]},
+                                    {"configurable": {"thread_id": hilo}})
+    return estado["messages"][-1].content
+
+
+def test_speech_repetido_sale_del_cache(entorno):
+    assert pedir("genera un speech para Ana Ruiz") == "Estimada Ana, primera versión."
+    assert pedir("genera un speech para ana ruiz") == "Estimada Ana, primera versión."
+    assert entorno.llamadas == 1
+
+    assert pedir("genera otro speech para Ana Ruiz") == "Estimada Ana, segunda versión."
+    assert entorno.llamadas == 2
+
+
+def test_actualizar_deuda_invalida_el_speech(entorno):
+    pedir("genera un speech para Ana Ruiz")
+    pedir("actualiza la deuda de Ana Ruiz a 900")
+
+    assert pedir("genera un speech para Ana Ruiz") == "Estimada Ana, segunda versión."
+    assert entorno.llamadas == 2
+
+
+def test_lote_reutiliza_el_cache():
+    cache = CacheSpeech("")
+    clientes = [{**ANA, "id": 1}, {**ANA, "id": 2, "nombre": "Luis Mora"}]
+    modelo = ModeloContador(responses=["uno", "dos"])
+
+    asyncio.run(generar_speeches(modelo, clientes, SinkLista(), cache=cache))
+    sink = SinkLista()
+    resumen = asyncio.run(generar_speeches(modelo, clientes, sink, cache=cache))
+
+    assert modelo.llamadas == 2
+    assert resumen["desde_cache"] == 2
+    assert sorted(r["speech"] for r in sink.resultados) == ["dos", "uno"]
+
+
+def test_lote_guarda_el_texto_de_respuestas_por_bloques():
+    # Gemini puede responder con una lista de bloques en lugar de un texto
+    cache = CacheSpeech("")
+    modelo = ModeloGuionado(messages=iter([AIMessage(content=[{"type": "text", "text": "Estimada Ana."}])]))
+    sink = SinkLista()
+
+    asyncio.run(generar_speeches(modelo, [{**ANA, "id": 1}], sink, cache=cache))
+
+    assert sink.resultados[0]["speech"] == "Estimada Ana."
+    assert cache.obtener(ANA) == "Estimada Ana."
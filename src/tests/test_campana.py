@@ -0,0 +1,60 @@
+import asyncio
+import csv
+import json
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from campana import ejecutar_campana
+
+
+class ModeloConCorte(FakeListChatModel):
+    """Deja de responder después de `limite` llamadas exitosas."""
+    limite: int = 10**9
+    llamadas: int = 0
+
+    async def ainvoke(self, *args, **kwargs):
+        if self.llamadas >= self.limite:
+            raise ValueError("cuota diaria agotada")
+        self.llamadas += 1
+        return await super().ainvoke(*args, **kwargs)
+
+
+def clientes(n):
+    return (
+        {"id": i, "nombre": f"Cliente {i}", "deuda": 50.0 * i, "dias_mora": i, "producto": "Tarjeta"}
+        for i in range(n)
+    )
+
+
+def test_campana_se_reanuda_sin_repetir(tmp_path):
+    salida = str(tmp_path / "campana.jsonl")
+
+    primera = asyncio.run(ejecutar_campana(
+        ModeloConCorte(responses=["speech"], limite=7), clientes(20), salida, concurrencia=3, reintentos=0
+    ))
+    assert primera["procesados"] == 20
+    assert primera["fallidos"] == 13
+
+    segunda = asyncio.run(ejecutar_campana(
+        ModeloConCorte(responses=["speech"]), clientes(20), salida, concurrencia=3
+    ))
+    assert segunda["omitidos_por_checkpoint"] == 7
+    assert segunda["procesados"] == 13
+    assert segunda["fallidos"] == 0
+
+    with open(salida, encoding="utf-8") as f:
+        filas = [json.loads(linea) for linea in f]
+    assert sorted(f["id"] for f in filas) == list(range(20))
+    assert {"nombre", "tono", "speech", "latencia_s", "tokens_entrada", "tokens_salida"} <= set(filas[0])
+
+
+def test_campana_csv_escribe_cabecera_una_vez(tmp_path):
+    salida = str(tmp_path / "campana.csv")
+
+    asyncio.run(ejecutar_campana(ModeloConCorte(responses=["a"], limite=2), clientes(5), salida, concurrencia=1, reintentos=0))
+    asyncio.run(ejecutar_campana(ModeloConCorte(responses=["b"]), clientes(5), salida, concurrencia=1))
+
+    with open(salida, encoding="utf-8", newline="") as f:
+        filas = list(csv.DictReader(f))
+    assert [f["id"] for f in filas] == ["0", "1", "2", "3", "4"]
+    assert [f["speech"] for f in filas] == ["a", "a", "b", "b", "b"]
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cartera_compacta import CarteraCompacta
+from cliente_store import CSVClienteStore, SQLiteClienteStore
+
+CARTERA = pd.DataFrame({
+    "nombre": ["Ana Ruiz", "Émile Roy", "luis Mora", "Zoe Paz"],
+    "deuda": [0.1, 1500.2, 0.2, 300.0],
+    "dias_mora": [5, 60, 40000, 15],
+    "producto": ["Tarjeta", "Préstamo", "tarjeta", None],
+    "fecha_registro": ["2024-01-02 10:00:00", "2024-01-01 09:30:00", None, "2023-12-31 08:00:00"],
+})
+
+
+def test_columnas_tipadas_y_consulta():
+    cartera = CarteraCompacta.desde_dataframe(CARTERA)
+
+    assert cartera.deuda_centavos.dtype == np.int64 and list(cartera.deuda_centavos) == [10, 150020, 20, 30000]
+    assert cartera.dias_mora.dtype == np.int16 and cartera.dias_mora[2] == np.iinfo(np.int16).max
+    assert cartera.categorias == ("Préstamo", "Tarjeta", "tarjeta")
+    assert cartera.fecha_registro.dtype == np.dtype("datetime64[s]")
+    assert cartera.nombre(1) == "Émile Roy" and not cartera.deuda_centavos.flags.writeable
+
+    pagina, resumen = cartera.consultar(producto="TARJETA ", ordenar_por="deuda", descendente=True)
+    assert resumen == {"total": 2, "deuda_total": 0.3}  # centavos: suma exacta
+    assert list(pagina["nombre"]) == ["luis Mora", "Ana Ruiz"]
+    assert pagina.loc[1].to_dict() == {
+        "nombre": "Ana Ruiz", "deuda": 0.1, "dias_mora": 5, "producto": "Tarjeta",
+        "fecha_registro": "2024-01-02 10:00:00",
+    }
+    # Sin fecha o sin producto van al final en ambos sentidos, como en pandas
+    for descendente in (False, True):
+        assert cartera.consultar(ordenar_por="fecha_registro", descendente=descendente)[0]["nombre"].iloc[-1] == "luis Mora"
+        assert cartera.consultar(ordenar_por="producto", descendente=descendente)[0]["producto"].iloc[-1] is None
+    assert list(cartera.consultar(ordenar_por="nombre", limite=2, offset=1)[0]["nombre"]) == ["Zoe Paz", "luis Mora"]
+    assert cartera.consultar(deuda_min=300, mora_max=60)[1]["total"] == 2
+
+
+def test_instantanea_se_mapea_en_memoria(tmp_path):
+    ruta = str(tmp_path / "cartera.bin")
+    CarteraCompacta.desde_dataframe(CARTERA, version="v1").guardar(ruta)
+
+    cartera = CarteraCompacta.abrir(ruta)
+    assert cartera.version == "v1" and isinstance(cartera.deuda_centavos.base, np.memmap)
+    esperado = CarteraCompacta.desde_dataframe(CARTERA).consultar(ordenar_por="nombre")
+    pd.testing.assert_frame_equal(cartera.consultar(ordenar_por="nombre")[0], esperado[0])
+
+    (tmp_path / "otro.bin").write_bytes(b"no es una instantanea")
+    with pytest.raises(ValueError):
+        CarteraCompacta.abrir(str(tmp_path / "otro.bin"))
+
+
+def test_sqlite_comparte_la_cartera_y_la_recarga_de_la_instantanea(tmp_path):
+    ruta = str(tmp_path / "clientes.db")
+    store = SQLiteClienteStore(ruta)
+    store.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    cartera = store.cartera()
+    assert store.cartera() is cartera and os.path.exists(ruta + ".cartera")
+
+    otro = SQLiteClienteStore(ruta)
+    recargada = otro.cartera()
+    assert recargada.version == cartera.version and isinstance(recargada.deuda_centavos.base, np.memmap)
+
+    # Una escritura confirmada en otra conexión cambia la versión: se rearma
+    otro.registrar("Luis Mora", 1500.0, 60, "Préstamo")
+    assert store.cartera() is not cartera and len(store.cartera()) == 2
+    assert store.agregados()["clientes"] == 2
+    with store.transaccion():
+        store.eliminar("Ana Ruiz")
+        assert len(store.cartera()) == 1
+    assert len(store.cartera()) == 1 and len(otro.cartera()) == 1
+    otro.cerrar()
+    store.cerrar()
+
+
+def test_csv_comparte_la_cartera_hasta_la_proxima_escritura(tmp_path):
+    store = CSVClienteStore(str(tmp_path / "clientes.csv"))
+    store.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    cartera = store.cartera()
+    assert store.cartera() is cartera
+
+    with pytest.raises(RuntimeError):
+        with store.transaccion():
+            store.registrar("Luis Mora", 1500.0, 60, "Préstamo")
+            assert store.consultar()[1]["total"] == 2
+            raise RuntimeError("se revierte")
+    assert store.cartera() is cartera
+
+    store.actualizar("Ana Ruiz", deuda=300.0)
+    assert store.consultar(deuda_min=300)[1] == {"total": 1, "deuda_total": 300.0}
+    store.cerrar()
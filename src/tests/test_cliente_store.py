@@ -0,0 +1,193 @@
+import os
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from cliente_store import SQLiteClienteStore, CSVClienteStore, normalizar_nombre
+
+
+def test_normalizar_nombre():
+    assert normalizar_nombre("  Juan   PÉREZ ") == "juan pérez"
+
+
+def test_registro_es_upsert_por_nombre_normalizado(store):
+    assert store.registrar("Juan Pérez", 500.0, 30, "Tarjeta") is True
+    assert store.registrar("  juan   pérez", 650.0, 35, "Tarjeta") is False
+
+    assert store.contar() == 1
+    cliente = store.obtener("JUAN PÉREZ")
+    assert cliente["deuda"] == 650.0
+    assert cliente["dias_mora"] == 35
+
+
+def test_actualizar_y_eliminar(store):
+    store.registrar("Ana Ruiz", 100.0, 5, "Préstamo")
+
+    assert store.actualizar("ana ruiz", dias_mora=20) is True
+    assert store.obtener("Ana Ruiz")["dias_mora"] == 20
+    assert store.obtener("Ana Ruiz")["deuda"] == 100.0
+
+    assert store.actualizar("Nadie", deuda=1.0) is False
+    assert store.eliminar("Nadie") is False
+    assert store.eliminar("ANA RUIZ") is True
+    assert store.contar() == 0
+
+
+def test_transaccion_revierte_en_error(tmp_path):
+    store = SQLiteClienteStore(str(tmp_path / "clientes.db"))
+    store.registrar("Ana Ruiz", 100.0, 5, "Préstamo")
+
+    with pytest.raises(RuntimeError):
+        with store.transaccion():
+            store.eliminar("Ana Ruiz")
+            store.registrar("Luis Mora", 50.0, 1, "Tarjeta")
+            raise RuntimeError("falla a mitad de la transacción")
+
+    assert store.obtener("Ana Ruiz") is not None
+    assert store.obtener("Luis Mora") is None
+
+
+def test_importar_y_exportar_csv(store, tmp_path):
+    origen = tmp_path / "origen.csv"
+    pd.DataFrame([
+        {"nombre": "Ana Ruiz", "deuda": 100.0, "dias_mora": 5, "producto": "Préstamo", "fecha_registro": "2024-01-01"},
+        {"nombre": "Luis Mora", "deuda": 1500.0, "dias_mora": 60, "producto": "Tarjeta", "fecha_registro": "2024-01-02"},
+    ]).to_csv(origen, index=False)
+
+    assert store.importar_csv(str(origen)) == 2
+    # Se conserva la fecha del CSV y la mora corre desde ella
+    assert store.obtener("Ana Ruiz")["fecha_registro"] == "2024-01-01 00:00:00"
+    store.envejecer_mora(date(2024, 1, 11))
+    assert store.obtener("Ana Ruiz")["dias_mora"] == 15
+
+    destino = tmp_path / "destino.csv"
+    assert store.exportar_csv(str(destino)) == 2
+    assert list(pd.read_csv(destino)["nombre"]) == ["Ana Ruiz", "Luis Mora"]
+
+
+def test_migracion_del_csv_ocurre_una_sola_vez(tmp_path, monkeypatch):
+    import cliente_store
+
+    pd.DataFrame([{"nombre": "Ana Ruiz", "deuda": 100.0, "dias_mora": 5, "producto": "Préstamo"}]).to_csv(
+        tmp_path / "clientes.csv", index=False
+    )
+    monkeypatch.setattr(cliente_store, "CSV_PATH", str(tmp_path / "clientes.csv"))
+    monkeypatch.setattr(cliente_store, "DB_PATH", str(tmp_path / "clientes.db"))
+
+    store = cliente_store.crear_store("sqlite")
+    assert store.eliminar("Ana Ruiz") is True
+    store.cerrar()
+
+    store = cliente_store.crear_store("sqlite")
+    assert store.contar() == 0
+    store.cerrar()
+
+
+def test_consultar_filtra_ordena_y_pagina(store):
+    for i in range(30):
+        store.registrar(f"Cliente {i:02d}", 100.0 * i, i * 2, "Tarjeta" if i % 2 else "Préstamo")
+
+    pagina, resumen = store.consultar(deuda_min=1000, producto="tarjeta", ordenar_por="deuda",
+                                      descendente=True, limite=3, offset=1)
+
+    # Impares con deuda >= 1000: 11, 13, ..., 29 -> 10 clientes
+    assert resumen == {"total": 10, "deuda_total": sum(100.0 * i for i in range(11, 30, 2))}
+    assert list(pagina["nombre"]) == ["Cliente 27", "Cliente 25", "Cliente 23"]
+
+
+def test_consultar_por_tono(store):
+    store.registrar("Empático", 100.0, 5, "Tarjeta")
+    store.registrar("Firme", 500.0, 5, "Tarjeta")
+    store.registrar("Serio", 100.0, 60, "Tarjeta")
+
+    for tono, esperado in [("empatico", "Empático"), ("firme", "Firme"), ("serio", "Serio")]:
+        pagina, resumen = store.consultar(tono=tono)
+        assert resumen["total"] == 1 and pagina["nombre"][0] == esperado
+
+    with pytest.raises(ValueError):
+        store.consultar(ordenar_por="deuda; DROP TABLE clientes")
+
+
+def test_csv_escrituras_concurrentes_en_commits_agrupados(tmp_path):
+    store = CSVClienteStore(str(tmp_path / "clientes.csv"), ventana_commit_s=0.01)
+
+    def registrar(i):
+        store.registrar(f"Cliente {i}", 100.0, 1, "Tarjeta")
+        store.actualizar(f"Cliente {i}", deuda=200.0 + i)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(registrar, range(64)))
+    store.cerrar()
+
+    assert store.contar() == 64
+    assert store.obtener("cliente 7")["deuda"] == 207.0
+    # 128 escrituras confirmadas con muchos menos fsync
+    assert store.commits < 128
+
+
+def test_csv_dos_instancias_no_pierden_actualizaciones(tmp_path):
+    ruta = str(tmp_path / "clientes.csv")
+    a, b = CSVClienteStore(ruta), CSVClienteStore(ruta)
+
+    a.registrar("Ana Ruiz", 100.0, 5, "Préstamo")
+    b.registrar("Luis Mora", 50.0, 1, "Tarjeta")
+    assert b.actualizar("ana ruiz", deuda=80.0) is True
+    a.actualizar("Luis Mora", dias_mora=9)
+
+    for store in (a, b, CSVClienteStore(ruta)):
+        assert store.contar() == 2
+        assert store.obtener("Ana Ruiz")["deuda"] == 80.0
+        assert store.obtener("Luis Mora")["dias_mora"] == 9
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere fork")
+def test_csv_procesos_concurrentes(tmp_path):
+    ruta = str(tmp_path / "clientes.csv")
+
+    def escribir(proceso):
+        store = CSVClienteStore(ruta, max_registros_diario=7)
+        for i in range(20):
+            store.registrar(f"P{proceso} Cliente {i}", 10.0, 1, "Tarjeta")
+        store.cerrar()
+
+    contexto = multiprocessing.get_context("fork")
+    procesos = [contexto.Process(target=escribir, args=(p,)) for p in range(3)]
+    for proceso in procesos:
+        proceso.start()
+    for proceso in procesos:
+        proceso.join()
+
+    assert CSVClienteStore(ruta).contar() == 60
+
+
+def test_csv_recupera_diario_y_descarta_commit_incompleto(tmp_path):
+    ruta = str(tmp_path / "clientes.csv")
+    store = CSVClienteStore(ruta)
+    store.registrar("Ana Ruiz", 100.0, 5, "Préstamo")
+    with store.transaccion():
+        store.registrar("Luis Mora", 50.0, 1, "Tarjeta")
+        store.eliminar("Ana Ruiz")
+    store.cerrar()
+
+    # Caída a mitad de un commit: la última línea quedó cortada
+    with open(ruta + ".journal", "ab") as f:
+        f.write(b'0badc0de {"ops":[{"op":"borrar","clave":"luis')
+
+    recuperado = CSVClienteStore(ruta)
+    assert list(recuperado.listar()["nombre"]) == ["Luis Mora"]
+    assert open(ruta + ".journal", "rb").read().endswith(b"\n")
+
+
+def test_csv_compacta_el_diario(tmp_path):
+    ruta = str(tmp_path / "clientes.csv")
+    store = CSVClienteStore(ruta, max_registros_diario=3)
+    for i in range(5):
+        store.registrar(f"Cliente {i}", 10.0 * i, i, "Tarjeta")
+    store.cerrar()
+
+    assert len(pd.read_csv(ruta)) == 3
+    assert len(open(ruta + ".journal", "rb").read().splitlines()) == 2
+    assert CSVClienteStore(ruta).contar() == 5
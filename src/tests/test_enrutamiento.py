@@ -0,0 +1,113 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import grafo
+import metricas
+from enrutamiento import elegir_nivel, resumen_enrutamiento
+from metricas import get_registro
+from modelo_falso import ModeloGuionado
+from prompts import SYSTEM_PROMPT, SYSTEM_PROMPT_LIGERO
+
+
+class ModeloRegistrado(ModeloGuionado):
+    """Modelo guionado que guarda el prompt de sistema de cada llamada."""
+    prompts: list = []
+
+    def invoke(self, mensajes, *args, **kwargs):
+        self.prompts.append(mensajes[0].content)
+        return super().invoke(mensajes, *args, **kwargs)
+
+
+def uso(entrada, salida):
+    return {"input_tokens": entrada, "output_tokens": salida, "total_tokens": entrada + salida}
+
+
+@pytest.fixture
+def modelos(store_grafo):
+    get_registro().limpiar()
+    metricas.activar(True)
+
+    def guionar(ligero, completo):
+        modelos = ModeloRegistrado(messages=iter(ligero), prompts=[]), ModeloRegistrado(messages=iter(completo), prompts=[])
+        grafo.set_modelo_agente(modelos[0], "ligero")
+        grafo.set_modelo_agente(modelos[1], "completo")
+        return modelos
+
+    yield guionar
+    metricas.activar(False)
+    get_registro().limpiar()
+
+
+def pedir(texto, hilo):
+    estado = grafo.get_app().invoke({"messages": [HumanMessage(content=texto)]}, {"configurable": {"thread_id": hilo}})
+    return estado["messages"][-1].content
+
+
+def test_elegir_nivel():
+    llamada = AIMessage(content="", tool_calls=[{"name": "leer_base_datos", "args": {}, "id": "c1"}])
+    assert elegir_nivel([HumanMessage(content="¿quiénes deben más de 500?")]) == ("ligero", "seleccion_herramienta")
+    assert elegir_nivel([HumanMessage(content="Redacta un mensaje para Ana")]) == ("completo", "redaccion")
+    assert elegir_nivel([llamada, ToolMessage(content="TABLA_DATOS | ...", tool_call_id="c1")]) == (
+        "ligero", "confirmacion"
+    )
+    assert elegir_nivel([
+        llamada,
+        ToolMessage(content="CLIENTE_REGISTRADO | nombre=Ana | deuda=250.0", tool_call_id="c1"),
+        ToolMessage(content="DATOS_ACTUALIZADOS | nombre=Luis", tool_call_id="c2"),
+    ]) == ("ligero", "confirmacion")
+
+
+def test_consulta_y_confirmacion_van_al_nivel_ligero(modelos):
+    ligero, completo = modelos([
+        AIMessage(content="", tool_calls=[{"name": "analizar_cartera", "args": {}, "id": "c1"}],
+                  usage_metadata=uso(900, 10)),
+        AIMessage(content="Tu cartera está vacía.", usage_metadata=uso(950, 8)),
+    ], [])
+
+    assert pedir("¿cómo va la cartera en total?", "ruta_1") == "Tu cartera está vacía."
+    assert ligero.prompts == [SYSTEM_PROMPT_LIGERO] * 2 and completo.prompts == []
+    assert len(SYSTEM_PROMPT_LIGERO) < len(SYSTEM_PROMPT)
+    registro = get_registro()
+    assert registro.total("enrutamiento_total", nivel="ligero", motivo="seleccion_herramienta") == 1
+    assert registro.total("enrutamiento_total", nivel="ligero", motivo="confirmacion") == 1
+    assert registro.total("enrutamiento_tokens_total", nivel="ligero", tipo="entrada") == 1850
+
+
+def test_las_decisiones_se_registran_sin_metricas(modelos, caplog):
+    modelos([AIMessage(content="¡Hola! ¿En qué te ayudo?")], [])
+    metricas.activar(False)
+
+    with caplog.at_level("INFO", logger="enrutamiento"):
+        pedir("¿qué puedes hacer?", "ruta_3")
+
+    assert [r.getMessage().split(" segundos=")[0] for r in caplog.records] == [
+        "turno del agente: nivel=ligero motivo=seleccion_herramienta"
+    ]
+    assert get_registro().total("enrutamiento_total") == 0
+
+
+def test_registro_encadena_generar_speech_y_la_redaccion_usa_el_nivel_completo(modelos):
+    ligero, completo = modelos([
+        AIMessage(content="", tool_calls=[{
+            "name": "registrar_cliente",
+            "args": {"nombre": "Ana Ruiz", "deuda": 250.0, "dias_mora": 10, "producto": "Tarjeta"},
+            "id": "c1",
+        }], usage_metadata=uso(900, 20)),
+        AIMessage(content="", tool_calls=[{"name": "generar_speech", "args": {"nombre": "Ana Ruiz"}, "id": "c2"}],
+                  usage_metadata=uso(950, 15)),
+    ], [
+        AIMessage(content="Asunto: recordatorio de pago...", usage_metadata=uso(1250, 280)),
+    ])
+
+    # El speech sale de la plantilla y se entrega tal cual, sin otra vuelta al modelo
+    speech = pedir("Ana Ruiz debe 250 de tarjeta, 10 días", "ruta_2")
+    assert "Ana Ruiz" in speech and not speech.startswith("SPEECH |")
+    assert pedir("escribe un correo de cobranza para Ana", "ruta_2").startswith("Asunto:")
+    assert ligero.prompts == [SYSTEM_PROMPT_LIGERO] * 2 and completo.prompts == [SYSTEM_PROMPT]
+
+    resumen = resumen_enrutamiento()
+    assert (resumen["ligero"]["turnos"], resumen["completo"]["turnos"]) == (2, 1)
+    assert get_registro().total("enrutamiento_total", nivel="ligero", motivo="confirmacion") == 1
+    assert resumen["completo"]["tokens_salida_promedio"] == 280
+    assert resumen["ahorro"]["tokens_salida_promedio"] == 525
+    assert resumen["ahorro"]["tokens_entrada_promedio"] == 650
@@ -0,0 +1,118 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pandas as pd
+
+from analitica import AgregadosCartera
+from cache_speech import CacheSpeech
+from cliente_store import SQLiteClienteStore, CSVClienteStore
+from envejecimiento import envejecer_cartera, envejecer_si_pendiente
+
+HOY = date.today()
+
+
+def test_envejecer_avanza_la_mora_y_reporta_cambios_de_tono(store):
+    cache = CacheSpeech("")
+    store.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    store.registrar("Luis Gómez", 200.0, 44, "Préstamo")
+    store.registrar_lote(pd.DataFrame({
+        "nombre": ["Max Paz"], "deuda": [2000.0], "dias_mora": [100], "producto": ["Hipoteca"],
+    }))
+    store.agregados()
+    for nombre in ("Ana Ruiz", "Luis Gómez"):
+        cache.guardar(store.obtener(nombre), f"speech de {nombre}")
+
+    resultado = envejecer_cartera(HOY + timedelta(days=5), store=store, cache=cache)
+
+    assert (resultado.revisados, resultado.actualizados) == (3, 3)
+    assert sorted(resultado.cambios_tono) == [
+        ("Ana Ruiz", "empatico", "firme"), ("Luis Gómez", "firme", "serio"),
+    ]
+    assert resultado.speeches_invalidados == 2 and cache.contar() == 0
+    assert resultado.resumen().startswith("MORA_ACTUALIZADA | corte=")
+    assert store.obtener("Max Paz")["dias_mora"] == 105
+    assert set(store.obtener("Ana Ruiz")) == {"nombre", "deuda", "dias_mora", "producto", "fecha_registro"}
+
+    agregados = AgregadosCartera()
+    agregados.cargar(store.listar())
+    assert store.agregados() == agregados.resumen()
+    assert store.agregados()["mora_promedio"] == round((15 + 49 + 105) / 3, 1)
+
+
+def test_envejecer_es_idempotente_y_respeta_correcciones(store):
+    cache = CacheSpeech("")
+    store.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    store.registrar("Luis Gómez", 200.0, 0, "Préstamo")
+    corte = HOY + timedelta(days=3)
+    assert envejecer_cartera(corte, store=store, cache=cache).actualizados == 2
+
+    otra_vez = envejecer_cartera(corte, store=store, cache=cache)
+    assert (otra_vez.actualizados, otra_vez.cambios_tono) == (0, [])
+
+    # Corregir la mora a mano mueve el vencimiento: el conteo sigue desde ahí
+    store.actualizar("Ana Ruiz", dias_mora=1)
+    envejecer_cartera(corte, store=store, cache=cache)
+    assert store.obtener("Ana Ruiz")["dias_mora"] == 4
+    assert store.obtener("Luis Gómez")["dias_mora"] == 3
+
+    # Un corte anterior al vencimiento no deja mora negativa
+    envejecer_cartera(HOY - timedelta(days=30), store=store, cache=cache)
+    assert store.obtener("Luis Gómez")["dias_mora"] == 0
+
+
+def test_envejecer_si_pendiente_corre_una_vez_por_dia(store_sqlite):
+    cache = CacheSpeech("")
+    store_sqlite.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    assert store_sqlite.envejecido_al() is None
+
+    assert envejecer_si_pendiente(HOY, store=store_sqlite, cache=cache) is not None
+    assert store_sqlite.envejecido_al() == HOY
+    cambios = store_sqlite._conn.total_changes
+    assert envejecer_si_pendiente(HOY, store=store_sqlite, cache=cache) is None
+    assert store_sqlite._conn.total_changes == cambios
+
+    # Otra conexión ve el corte guardado; al día siguiente vuelve a correr
+    otro = SQLiteClienteStore(store_sqlite.ruta)
+    try:
+        assert otro.envejecido_al() == HOY
+        assert envejecer_si_pendiente(HOY + timedelta(days=1), store=otro, cache=cache).actualizados == 1
+    finally:
+        otro.cerrar()
+
+
+def test_base_anterior_toma_el_vencimiento_de_la_fecha_de_registro(tmp_path):
+    ruta = str(tmp_path / "clientes.db")
+    registro = HOY - timedelta(days=10)
+    with sqlite3.connect(ruta) as conn:
+        conn.execute("""
+            CREATE TABLE clientes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL, nombre_norm TEXT NOT NULL UNIQUE,
+                deuda REAL NOT NULL, dias_mora INTEGER NOT NULL, producto TEXT NOT NULL, fecha_registro TEXT NOT NULL
+            )
+        """)
+        conn.execute(
+            "INSERT INTO clientes (nombre, nombre_norm, deuda, dias_mora, producto, fecha_registro)"
+            " VALUES ('Ana Ruiz', 'ana ruiz', 250.0, 5, 'Tarjeta', ?)",
+            (f"{registro.isoformat()} 09:30:00",),
+        )
+    conn.close()
+
+    store = SQLiteClienteStore(ruta)
+    try:
+        resultado = envejecer_cartera(store=store, cache=CacheSpeech(""))
+        assert store.obtener("Ana Ruiz")["dias_mora"] == 15
+        assert resultado.cambios_tono == [("Ana Ruiz", "empatico", "firme")]
+    finally:
+        store.cerrar()
+
+    ruta_csv = str(tmp_path / "clientes.csv")
+    pd.DataFrame([{
+        "nombre": "Ana Ruiz", "deuda": 250.0, "dias_mora": 5, "producto": "Tarjeta",
+        "fecha_registro": f"{registro.isoformat()} 09:30:00",
+    }]).to_csv(ruta_csv, index=False)
+    store = CSVClienteStore(ruta_csv)
+    try:
+        envejecer_cartera(store=store, cache=CacheSpeech(""))
+        assert store.obtener("Ana Ruiz")["dias_mora"] == 15
+    finally:
+        store.cerrar()
@@ -0,0 +1,91 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from generacion_lote import SinkLista, generar_speeches
+from resiliencia import TokenBucket, es_reintentable
+
+
+class ErrorCuota(Exception):
+    status_code = 429
+
+
+class ModeloLento(FakeListChatModel):
+    """Modelo falso que mide la concurrencia y falla las primeras llamadas."""
+    activos: int = 0
+    max_activos: int = 0
+    fallos_pendientes: int = 0
+
+    async def ainvoke(self, *args, **kwargs):
+        self.activos += 1
+        self.max_activos = max(self.max_activos, self.activos)
+        try:
+            await asyncio.sleep(0.01)
+            if self.fallos_pendientes > 0:
+                self.fallos_pendientes -= 1
+                raise ErrorCuota("429 quota exceeded")
+            return await super().ainvoke(*args, **kwargs)
+        finally:
+            self.activos -= 1
+
+
+def clientes(n):
+    return [
+        {"id": i, "nombre": f"Cliente {i}", "deuda": 100.0 * i, "dias_mora": i, "producto": "Tarjeta"}
+        for i in range(n)
+    ]
+
+
+def test_respeta_limite_de_concurrencia():
+    modelo = ModeloLento(responses=["Estimado cliente..."])
+    sink = SinkLista()
+
+    resumen = asyncio.run(generar_speeches(modelo, iter(clientes(40)), sink, concurrencia=4))
+
+    assert resumen["procesados"] == 40
+    assert resumen["fallidos"] == 0
+    assert modelo.max_activos == 4
+    assert len(sink.resultados) == 40
+    assert {r["tono"] for r in sink.resultados} == {"empatico", "firme", "serio"}
+
+
+def test_reintenta_errores_de_cuota():
+    modelo = ModeloLento(responses=["ok"], fallos_pendientes=3)
+    sink = SinkLista()
+
+    resumen = asyncio.run(generar_speeches(
+        modelo, iter(clientes(3)), sink, concurrencia=1, reintentos=4, backoff_base=0.001
+    ))
+
+    assert resumen["fallidos"] == 0
+    assert all(r["speech"] == "ok" for r in sink.resultados)
+
+
+def test_registra_fallo_sin_detener_el_lote():
+    modelo = ModeloLento(responses=["ok"], fallos_pendientes=2)
+    sink = SinkLista()
+
+    resumen = asyncio.run(generar_speeches(
+        modelo, iter(clientes(3)), sink, concurrencia=1, reintentos=1, backoff_base=0.001
+    ))
+
+    assert resumen["procesados"] == 3
+    assert resumen["fallidos"] == 1
+    assert "ErrorCuota" in sink.resultados[0]["error"]
+
+
+def test_token_bucket_limita_la_tasa():
+    async def escenario():
+        limitador = TokenBucket(tasa=100, capacidad=1)
+        inicio = asyncio.get_running_loop().time()
+        for _ in range(11):
+            await limitador.adquirir()
+        return asyncio.get_running_loop().time() - inicio
+
+    assert asyncio.run(escenario()) >= 0.09
+
+
+def test_es_reintentable():
+    assert es_reintentable(ErrorCuota())
+    assert es_reintentable(TimeoutError())
+    assert not es_reintentable(ValueError("prompt inválido"))
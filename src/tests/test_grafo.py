@@ -0,0 +1,219 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import grafo
+import herramientas
+import ui
+from modelo_falso import ModeloGuionado
+
+
+def modelo_guionado(respuestas):
+    """Sustituye al modelo con herramientas por uno que responde en orden."""
+    modelo = ModeloGuionado(messages=iter(respuestas))
+    grafo.set_modelo_agente(modelo)
+    return modelo
+
+
+def test_grafo_async_ejecuta_herramientas(store_grafo):
+    modelo_guionado([
+        AIMessage(content="", tool_calls=[{
+            "name": "registrar_cliente",
+            "args": {"nombre": "Ana Ruiz", "deuda": 250.0, "dias_mora": 10, "producto": "Tarjeta"},
+            "id": "call_1",
+        }]),
+        AIMessage(content="Cliente registrado."),
+    ])
+
+    config = {"configurable": {"thread_id": "test_async_1"}}
+    resultado = asyncio.run(grafo.get_app().ainvoke(
+        {"messages": [HumanMessage(content="Registra a Ana Ruiz")]}, config
+    ))
+
+    tool_msg = next(m for m in resultado["messages"] if isinstance(m, ToolMessage))
+    assert tool_msg.content.startswith("CLIENTE_REGISTRADO")
+    assert resultado["messages"][-1].content == "Cliente registrado."
+    assert store_grafo.obtener("ana ruiz")["deuda"] == 250.0
+
+
+def test_registrar_cliente_no_pisa_un_cliente_existente(store_grafo):
+    datos = {"nombre": "Ana Ruiz", "deuda": 250.0, "dias_mora": 10, "producto": "Tarjeta"}
+    assert herramientas.registrar_cliente.invoke(datos).startswith("CLIENTE_REGISTRADO")
+
+    respuesta = herramientas.registrar_cliente.invoke({**datos, "nombre": "ana ruiz", "deuda": 900.0})
+    assert respuesta == "CLIENTE_EXISTENTE | nombre=Ana Ruiz | deuda=250.0 | dias_mora=10 | producto=Tarjeta"
+    assert store_grafo.obtener("Ana Ruiz")["deuda"] == 250.0
+
+    respuesta = herramientas.registrar_cliente.invoke({**datos, "deuda": 900.0, "reemplazar": True})
+    assert respuesta.startswith("CLIENTE_ACTUALIZADO") and store_grafo.obtener("Ana Ruiz")["deuda"] == 900.0
+
+
+def test_sesiones_concurrentes_en_un_solo_loop(store_grafo):
+    modelo_guionado([AIMessage(content="Hola") for _ in range(20)])
+
+    async def sesiones():
+        return await asyncio.gather(*[
+            grafo.get_app().ainvoke(
+                {"messages": [HumanMessage(content="hola, ¿qué puedes hacer?")]},
+                {"configurable": {"thread_id": f"sesion_{i}"}},
+            )
+            for i in range(20)
+        ])
+
+    resultados = asyncio.run(sesiones())
+    assert all(r["messages"][-1].content == "Hola" for r in resultados)
+
+
+def test_herramienta_desconocida(store_grafo):
+    modelo_guionado([
+        AIMessage(content="", tool_calls=[{"name": "no_existe", "args": {}, "id": "call_x"}]),
+        AIMessage(content="Lo siento."),
+    ])
+
+    resultado = grafo.get_app().invoke(
+        {"messages": [HumanMessage(content="?")]}, {"configurable": {"thread_id": "test_sync_x"}}
+    )
+    tool_msg = next(m for m in resultado["messages"] if isinstance(m, ToolMessage))
+    assert tool_msg.content == "ERROR_TOOL"
+
+
+def recolectar(inputs, config):
+    async def consumir():
+        return [evento async for evento in grafo.transmitir_respuesta(inputs, config)]
+    return asyncio.run(consumir())
+
+
+def test_streaming_entrega_texto_incremental(store_grafo):
+    modelo_guionado([AIMessage(content="Estimada Ana, le recordamos su saldo pendiente.")])
+
+    eventos = recolectar(
+        {"messages": [HumanMessage(content="speech para Ana")]},
+        {"configurable": {"thread_id": "test_stream_1"}},
+    )
+
+    parciales = [c for e, c in eventos if e == "texto"]
+    assert len(parciales) > 1
+    assert parciales[-1] == "Estimada Ana, le recordamos su saldo pendiente."
+    assert eventos[-1] == ("fin", "Estimada Ana, le recordamos su saldo pendiente.")
+
+
+def test_streaming_emite_tabla_y_reinicia_texto_por_turno(store_grafo):
+    store_grafo.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    modelo_guionado([
+        AIMessage(content="Consultando", tool_calls=[{"name": "leer_base_datos", "args": {}, "id": "call_1"}]),
+        AIMessage(content="Aquí están tus registros actuales."),
+    ])
+
+    eventos = recolectar(
+        {"messages": [HumanMessage(content="¿quiénes tienen tarjeta?")]},
+        {"configurable": {"thread_id": "test_stream_2"}},
+    )
+
+    tablas = [c for e, c in eventos if e == "tabla"]
+    assert len(tablas) == 1 and "Ana Ruiz" in tablas[0].content
+    assert eventos[-1] == ("fin", "Aquí están tus registros actuales.")
+    ultimo_texto = [c for e, c in eventos if e == "texto"][-1]
+    assert ultimo_texto == "Aquí están tus registros actuales."
+
+
+def test_limpiar_tablas():
+    texto = "Resumen:\n| nombre | deuda |\n|---|---|\n| Ana | 10 |\nFin"
+    assert ui.limpiar_tablas(texto) == "Resumen:\nFin"
+    assert ui.limpiar_tablas("Sin tabla | pipe") == "Sin tabla | pipe"
+
+
+def test_escrituras_del_turno_en_un_solo_commit(store_grafo):
+    commits = []
+    store_grafo._conn.set_trace_callback(lambda sql: commits.append(sql) if sql == "COMMIT" else None)
+    llamadas = [
+        {"name": "registrar_cliente", "id": f"call_{i}",
+         "args": {"nombre": f"Cliente {i}", "deuda": 100.0 + i, "dias_mora": i, "producto": "Tarjeta"}}
+        for i in range(5)
+    ]
+    llamadas.append({"name": "leer_base_datos", "args": {}, "id": "call_lectura"})
+    modelo_guionado([
+        AIMessage(content="", tool_calls=llamadas),
+        AIMessage(content="Listo."),
+    ])
+
+    resultado = asyncio.run(grafo.get_app().ainvoke(
+        {"messages": [HumanMessage(content="registra estos cinco")]},
+        {"configurable": {"thread_id": "test_group_commit"}},
+    ))
+
+    tool_msgs = [m for m in resultado["messages"] if isinstance(m, ToolMessage)]
+    assert [m.tool_call_id for m in tool_msgs] == [c["id"] for c in llamadas]
+    assert all(m.content.startswith("CLIENTE_REGISTRADO") for m in tool_msgs[:5])
+    assert "Cliente 4" in tool_msgs[5].content
+    assert len(commits) == 1
+
+
+def test_segmentos_respetan_el_orden():
+    llamadas = [{"name": n, "args": {}, "id": str(i)} for i, n in enumerate(
+        ["leer_base_datos", "registrar_cliente", "actualizar_deuda", "leer_base_datos"]
+    )]
+    segmentos = grafo._segmentos(llamadas)
+    assert [(escribe, [c["id"] for c in calls]) for escribe, calls in segmentos] == [
+        (False, ["0"]), (True, ["1", "2"]), (False, ["3"])
+    ]
+
+
+def test_leer_base_datos_devuelve_pagina_y_consulta(store_grafo):
+    for i in range(50):
+        store_grafo.registrar(f"Cliente {i:02d}", 10.0 * i, i, "Tarjeta")
+
+    mensaje = herramientas.leer_base_datos.invoke({
+        "name": "leer_base_datos", "args": {"mora_min": 10, "limite": 5}, "id": "c1", "type": "tool_call"
+    })
+
+    assert mensaje.content.startswith("TABLA_DATOS | total=40 |")
+    assert mensaje.content.count("Cliente") == 5
+    assert mensaje.artifact["consulta"] == {"mora_min": 10}
+    df, _ = store_grafo.consultar(**mensaje.artifact["consulta"])
+    assert len(df) == 40
+
+    # El modelo puede pedir un offset negativo: se lee desde el principio
+    negativo = herramientas.leer_base_datos.invoke({"mora_min": 10, "limite": 5, "offset": -10})
+    assert "mostrando=1-5\n" in negativo
+
+
+def test_tabla_paginada_construye_solo_la_pagina_visible(store_grafo, monkeypatch):
+    for i in range(1000):
+        store_grafo.registrar(f"Cliente {i:04d}", 10.0 * i, i % 90, "Tarjeta")
+    mensaje = herramientas.leer_base_datos.invoke({
+        "name": "leer_base_datos", "args": {"limite": 25}, "id": "c1", "type": "tool_call"
+    })
+
+    tabla = ui.TablaPaginada(mensaje.artifact)
+    assert len(tabla.tabla.rows) == 25
+    assert tabla.etiqueta.value == "1-25 de 1000"
+    assert tabla.anterior.disabled and not tabla.siguiente.disabled
+
+    monkeypatch.setattr(type(tabla.control), "update", lambda self: None)
+    tabla.ir_a(975)
+    assert len(tabla.tabla.rows) == 25
+    assert tabla.etiqueta.value == "976-1000 de 1000"
+    assert tabla.tabla.rows[-1].cells[0].content.value == "Cliente 0999"
+    assert tabla.siguiente.disabled
+
+
+def test_historial_acota_las_burbujas_visibles():
+    import flet as ft
+
+    lista = ft.ListView()
+    historial = ui.HistorialChat(
+        lista, lambda texto, autor: ft.Text(texto), maximo=10
+    )
+    for i in range(35):
+        historial.agregar(ft.Text(f"m{i}"), (f"m{i}", "bot"))
+
+    assert lista.controls[0] is historial.boton_anteriores
+    assert [c.value for c in lista.controls[1:]] == [f"m{i}" for i in range(25, 35)]
+    assert len(historial.archivo) == 25
+
+    historial.cargar_anteriores(5)
+    assert [c.value for c in lista.controls[1:6]] == [f"m{i}" for i in range(20, 25)]
+
+    historial.cargar_anteriores(100)
+    assert historial.boton_anteriores not in lista.controls
+    assert [c.value for c in lista.controls] == [f"m{i}" for i in range(35)]
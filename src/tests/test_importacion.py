@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from importacion import importar_clientes, validar_lote, cargar_fuente
+
+
+def test_validar_lote_rechaza_y_deduplica():
+    df = cargar_fuente([
+        {"nombre": "Ana Ruiz", "deuda": 100, "dias_mora": 5, "producto": "Préstamo"},
+        {"nombre": " ", "deuda": 100, "dias_mora": 5, "producto": "Préstamo"},
+        {"nombre": "Luis Mora", "deuda": "abc", "dias_mora": 5, "producto": "Tarjeta"},
+        {"nombre": "Eva Sol", "deuda": 10, "dias_mora": -1, "producto": "Tarjeta"},
+        {"nombre": "ANA  RUIZ", "deuda": 150, "dias_mora": 7, "producto": "Préstamo"},
+    ])
+
+    validos, motivos, duplicados = validar_lote(df)
+
+    assert motivos == {"nombre_vacio": 1, "deuda_invalida": 1, "mora_invalida": 1}
+    assert duplicados == 1
+    assert validos.to_dict("records") == [
+        {"nombre": "ANA  RUIZ", "deuda": 150.0, "dias_mora": 7, "producto": "Préstamo"}
+    ]
+
+
+def test_importar_lista_reporta_insertados_y_actualizados(store_sqlite):
+    store_sqlite.registrar("Ana Ruiz", 100.0, 5, "Préstamo")
+
+    resultado = importar_clientes([
+        {"nombre": "ana ruiz", "deuda": 80, "dias_mora": 9, "producto": "Préstamo"},
+        {"nombre": "Luis Mora", "deuda": 1500, "dias_mora": 60, "producto": "Tarjeta"},
+        {"nombre": "", "deuda": 1, "dias_mora": 1, "producto": "Tarjeta"},
+    ], store=store_sqlite)
+
+    assert (resultado.insertados, resultado.actualizados, resultado.rechazados) == (1, 1, 1)
+    assert store_sqlite.obtener("Ana Ruiz")["deuda"] == 80.0
+    assert store_sqlite.contar() == 2
+
+
+def test_importar_xlsx(store_sqlite, tmp_path):
+    ruta = tmp_path / "cartera.xlsx"
+    pd.DataFrame({
+        "Nombre": [f"Cliente {i}" for i in range(500)],
+        "Deuda": [100.5] * 500,
+        "Dias_Mora": [10] * 500,
+        "Producto": ["Tarjeta"] * 500,
+    }).to_excel(ruta, index=False)
+
+    resultado = importar_clientes(str(ruta), store=store_sqlite)
+
+    assert resultado.insertados == 500
+    assert store_sqlite.contar() == 500
+
+
+def test_fuente_sin_columnas_obligatorias():
+    with pytest.raises(ValueError):
+        cargar_fuente([{"nombre": "Ana"}])
+
+
+def test_herramienta_solo_lee_la_carpeta_de_importaciones(store_sqlite, tmp_path, monkeypatch):
+    import herramientas
+    import importacion
+
+    carpeta = tmp_path / "importaciones"
+    carpeta.mkdir()
+    monkeypatch.setattr(importacion, "DIRECTORIO_IMPORTACION", str(carpeta))
+    pd.DataFrame([{"nombre": "Ana Ruiz", "deuda": 100, "dias_mora": 5, "producto": "Tarjeta"}]).to_csv(
+        carpeta / "cartera.csv", index=False
+    )
+    (tmp_path / "secreto.csv").write_text("nombre,deuda,dias_mora,producto\nX,1,1,Y\n")
+    lote = herramientas.registrar_clientes_lote.invoke
+    assert lote({"ruta_archivo": "cartera.csv"}).startswith("LOTE_REGISTRADO | insertados=1")
+    for ruta in ("../secreto.csv", str(tmp_path / "secreto.csv")):
+        assert lote({"ruta_archivo": ruta}).startswith("LOTE_INVALIDO | Solo se importan archivos")
+    (carpeta / "viejo.xls").write_bytes(b"")
+    assert "guarde el archivo como .xlsx" in lote({"ruta_archivo": "viejo.xls"})
+    assert store_sqlite.contar() == 1
@@ -0,0 +1,68 @@
+import herramientas
+from cliente_store import normalizar_nombre
+from indice_nombres import IndiceNombres, clave_difusa
+
+
+def test_clave_difusa():
+    assert clave_difusa("  María-José  LÓPEZ ") == "maria jose lopez"
+
+
+def test_indice_ordena_por_similitud_y_se_mantiene():
+    indice = IndiceNombres()
+    indice.cargar(normalizar_nombre(n) for n in ["María López", "Juan Pérez", "Ana Ruiz", "Cliente 0051234"])
+
+    assert indice.buscar("maria lopez") == [("maría lópez", 1.0)]
+    assert indice.buscar("Juan Peres")[0] == ("juan pérez", 0.833)
+    assert indice.buscar("Clinete 0051234") == []  # los números no admiten variantes
+    assert indice.buscar("xyz") == []
+
+    indice.cambiar("maria lopez", None, {"nombre": "Maria Lopez"})
+    indice.cambiar("juan pérez", {"nombre": "Juan Pérez"}, None)
+    assert [c for c, _ in indice.buscar("María López")] == ["maría lópez", "maria lopez"]
+    assert indice.buscar("Juan Pérez") == []
+
+
+def test_borrar_la_coincidencia_exacta_deja_las_variantes():
+    indice = IndiceNombres()
+    indice.cargar(["juan perez", "juan peres"])
+    indice.cambiar("juan perez", {"nombre": "Juan Perez"}, None)
+    assert indice.buscar("Juan Perez") == [("juan peres", 0.833)]
+
+
+def test_store_busca_nombres_y_ve_otras_instancias(store):
+    store.registrar("María López", 500.0, 20, "Tarjeta")
+    store.registrar("Juan Pérez", 100.0, 5, "Préstamo")
+    assert store.buscar_nombres("Maria Lopez") == [("María López", 1.0)]
+
+    store.eliminar("María López")
+    store.registrar("Juana Pérez", 100.0, 5, "Préstamo")
+    assert store.buscar_nombres("juan perez") == [("Juan Pérez", 1.0)]
+    assert [n for n, _ in store.buscar_nombres("Juanna Peres")] == ["Juana Pérez", "Juan Pérez"]
+    assert store.buscar_nombres("Maria Lopez") == []
+
+    otro = type(store)(store.ruta)
+    try:
+        otro.registrar("Mario Lopez", 50.0, 1, "Tarjeta")
+        assert store.buscar_nombres("Mario López")[0] == ("Mario Lopez", 1.0)
+    finally:
+        otro.cerrar()
+
+
+def test_herramientas_resuelven_acentos_y_reportan_ambiguedad(store):
+    store.registrar("María López", 500.0, 20, "Tarjeta")
+    store.registrar("Juan Pérez", 100.0, 5, "Préstamo")
+    store.registrar("Juan Perez", 300.0, 10, "Tarjeta")
+
+    assert herramientas.actualizar_deuda.invoke({"nombre": "Maria Lopez", "nueva_deuda": 450.0}) == (
+        "DATOS_ACTUALIZADOS | nombre=María López | deuda=450.0"
+    )
+    assert store.obtener("María López")["deuda"] == 450.0
+
+    ambiguo = herramientas.eliminar_cliente_pagado.invoke({"nombre": "JUAN PEREZ!"})
+    assert ambiguo == "CLIENTE_AMBIGUO | candidatos=Juan Pérez; Juan Perez"
+    assert store.contar() == 3
+
+    sugerencia = herramientas.eliminar_cliente_pagado.invoke({"nombre": "Maria Lopes"})
+    assert sugerencia.startswith("CLIENTE_NO_ENCONTRADO | sugerencias=María López (")
+    assert herramientas.eliminar_cliente_pagado.invoke({"nombre": "Pedro Soto"}) == "CLIENTE_NO_ENCONTRADO"
+    assert store.contar() == 3
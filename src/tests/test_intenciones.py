@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import grafo
+from intenciones import RESPUESTA_SALUDO, detectar_intencion, leer_numero
+from modelo_falso import ModeloGuionado
+
+
+@pytest.fixture
+def store(store_grafo):
+    # Cualquier llamada al modelo haría fallar la prueba: el guion está vacío
+    grafo.set_modelo_agente(ModeloGuionado(messages=iter([])))
+    return store_grafo
+
+
+@pytest.mark.parametrize("texto, tipo, args", [
+    ("hola", "saludo", {}),
+    ("¡Buenos días!", "saludo", {}),
+    ("buenas tardes", "saludo", {}),
+    ("Buenas noches bot", "saludo", {}),
+    ("muéstrame los clientes", "listar", {}),
+    ("Hola, ver la base de datos", "listar", {}),
+    ("elimina a Juan Pérez, ya pagó", "eliminar", {"nombre": "Juan Pérez"}),
+    ("Ana Ruiz ya pagó su deuda", "eliminar", {"nombre": "Ana Ruiz"}),
+    ("actualiza la deuda de Ana Ruiz a $1.500,50", "actualizar", {"nombre": "Ana Ruiz", "nueva_deuda": 1500.5}),
+    ("cambia los días de mora de Luis a 40 días", "actualizar", {"nombre": "Luis", "nuevos_dias_mora": 40}),
+])
+def test_detecta_intenciones_inequivocas(texto, tipo, args):
+    intencion = detectar_intencion(texto)
+    assert intencion.tipo == tipo and intencion.args == args
+
+
+@pytest.mark.parametrize("texto", [
+    "hola, ¿cómo redacto un buen speech?",
+    "holanda",
+    "genera un speech para todos los clientes",
+    "elimina a todos los clientes",
+    "elimina a Pedro y a Juan",
+    "elimina a Pedro no",
+    "borra todo",
+    "elimina a nadie",
+    "Pedro o Juan ya pagó",
+    "¿quiénes deben más de 500?",
+    "actualiza la deuda de Ana a 1.5.0",
+    "cambia la mora de Luis a 4.5",
+])
+def test_lo_dudoso_queda_para_el_modelo(texto):
+    assert detectar_intencion(texto) is None
+
+
+def test_leer_numero():
+    assert leer_numero("1,500.50") == 1500.5
+    assert leer_numero("1.500") == 1500
+    assert leer_numero("12.5") == 12.5
+    assert leer_numero("1.50.0") is None
+
+
+def test_ruta_local_responde_sin_modelo(store):
+    store.registrar("Juan Pérez", 500.0, 30, "Tarjeta")
+    config = {"configurable": {"thread_id": "local_1"}}
+
+    saludo = grafo.get_app().invoke({"messages": [HumanMessage(content="hola")]}, config)
+    assert saludo["messages"][-1].content == RESPUESTA_SALUDO
+
+    estado = grafo.get_app().invoke(
+        {"messages": [HumanMessage(content="elimina a juan pérez, ya pagó")]}, config
+    )
+    llamada, resultado, respuesta = estado["messages"][-3:]
+    assert llamada.tool_calls[0]["name"] == "eliminar_cliente_pagado"
+    assert isinstance(resultado, ToolMessage) and resultado.tool_call_id == llamada.tool_calls[0]["id"]
+    assert "eliminé a Juan Pérez" in respuesta.content
+    assert store.contar() == 0
+
+
+def test_ruta_local_en_streaming_emite_tabla(store):
+    store.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+
+    async def recolectar():
+        return [e async for e in grafo.transmitir_respuesta(
+            {"messages": [HumanMessage(content="muéstrame los clientes")]},
+            {"configurable": {"thread_id": "local_2"}},
+        )]
+
+    eventos = asyncio.run(recolectar())
+
+    assert [e for e, _ in eventos] == ["tabla", "fin"]
+    assert eventos[-1][1] == "Aquí están tus registros actuales: 1 clientes, deuda total $250.00."
+
+
+def test_sin_intencion_sigue_al_agente(store):
+    grafo.set_modelo_agente(ModeloGuionado(messages=iter([AIMessage(content="Claro, te ayudo.")])))
+    estado = grafo.get_app().invoke(
+        {"messages": [HumanMessage(content="¿qué puedes hacer?")]}, {"configurable": {"thread_id": "local_3"}}
+    )
+    assert estado["messages"][-1].content == "Claro, te ayudo."
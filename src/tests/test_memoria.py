@@ -0,0 +1,105 @@
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+
+import grafo
+from checkpointer import SQLiteSaverAcotado
+from compactacion import MAX_CARACTERES_RESUMEN, TABLA_OMITIDA, compactar_historial
+from modelo_falso import ModeloGuionado
+
+
+@pytest.fixture(autouse=True)
+def grafo_aislado():
+    yield
+    grafo.set_checkpointer(None)
+    grafo.set_modelo_agente(None)
+
+
+def turno(i, tabla=False):
+    contenido = "TABLA_DATOS | total=1\n| nombre |\n| --- |\n| Ana |" if tabla else f"CLIENTE_REGISTRADO | nombre=C{i}"
+    return [
+        HumanMessage(content=f"pedido {i}", id=f"h{i}"),
+        AIMessage(content="", id=f"a{i}", tool_calls=[{"name": "leer_base_datos", "args": {}, "id": f"c{i}"}]),
+        ToolMessage(content=contenido, tool_call_id=f"c{i}", id=f"t{i}"),
+        AIMessage(content=f"respuesta {i}", id=f"r{i}"),
+    ]
+
+
+def test_tablas_de_turnos_anteriores_se_reemplazan():
+    mensajes = turno(0, tabla=True) + turno(1, tabla=True)[:3]
+
+    visibles, resumen, cambios = compactar_historial(mensajes)
+
+    assert resumen == ""
+    assert [m.id for m in cambios] == ["t0"]
+    assert visibles[2].content == TABLA_OMITIDA
+    # La tabla del turno actual llega intacta al modelo
+    assert "TABLA_DATOS" in visibles[-1].content
+
+
+def test_presupuesto_recorta_turnos_antiguos_con_resumen():
+    mensajes = [m for i in range(10) for m in turno(i)]
+
+    visibles, resumen, cambios = compactar_historial(mensajes, presupuesto=60)
+
+    assert isinstance(visibles[0], HumanMessage)
+    assert len(visibles) < len(mensajes)
+    assert "- Usuario: pedido 0" in resumen and "CLIENTE_REGISTRADO | nombre=C0" in resumen
+    eliminados = {m.id for m in cambios if isinstance(m, RemoveMessage)}
+    assert eliminados == {m.id for m in mensajes[:len(mensajes) - len(visibles)]}
+
+
+def test_turno_actual_nunca_se_recorta():
+    mensajes = turno(0) + [HumanMessage(content="x" * 4000, id="h1")]
+
+    visibles, _, _ = compactar_historial(mensajes, presupuesto=10)
+
+    assert [m.id for m in visibles] == ["h1"]
+
+
+def test_conversacion_larga_queda_acotada(store_grafo, monkeypatch):
+    monkeypatch.setattr(grafo, "compactar_historial",
+                        lambda m, r: compactar_historial(m, r, presupuesto=40))
+    respuestas = [AIMessage(content=f"respuesta número {i} " * 5) for i in range(30)]
+    grafo.set_modelo_agente(ModeloGuionado(messages=iter(respuestas)))
+    config = {"configurable": {"thread_id": "larga"}}
+    for i in range(30):
+        estado = grafo.get_app().invoke({"messages": [HumanMessage(content=f"mensaje {i}")]}, config)
+
+    assert len(estado["messages"]) < 10
+    # El resumen también está acotado: conserva los turnos más recientes
+    assert len(estado["resumen"]) <= MAX_CARACTERES_RESUMEN
+    assert "mensaje 28" in estado["resumen"] and "mensaje 0\n" not in estado["resumen"]
+
+
+def test_checkpointer_persiste_y_desaloja(tmp_path):
+    ruta = str(tmp_path / "conversaciones.db")
+    app = grafo.crear_grafo(SQLiteSaverAcotado(ruta, max_hilos=2))
+    respuestas = [AIMessage(content=f"hola {i}") for i in range(3)]
+    grafo.set_modelo_agente(ModeloGuionado(messages=iter(respuestas)))
+    for hilo in ["a", "b", "c"]:
+        app.invoke({"messages": [HumanMessage(content="¿qué puedes hacer?")]}, {"configurable": {"thread_id": hilo}})
+        time.sleep(0.01)
+
+    # Otro proceso (nueva instancia) ve los hilos recientes; el más antiguo fue desalojado
+    saver = SQLiteSaverAcotado(ruta, max_hilos=2)
+    assert saver.contar_hilos() == 2
+    assert saver.get_tuple({"configurable": {"thread_id": "a", "checkpoint_ns": ""}}) is None
+    tupla = saver.get_tuple({"configurable": {"thread_id": "c", "checkpoint_ns": ""}})
+    assert tupla.checkpoint["channel_values"]["messages"][-1].content == "hola 2"
+
+    saver.delete_thread("c")
+    assert saver.contar_hilos() == 1
+
+
+def test_checkpointer_desaloja_por_ttl():
+    saver = SQLiteSaverAcotado(":memory:", ttl_s=0.05)
+    app = grafo.crear_grafo(saver)
+    respuestas = [AIMessage(content="uno"), AIMessage(content="dos")]
+    grafo.set_modelo_agente(ModeloGuionado(messages=iter(respuestas)))
+    app.invoke({"messages": [HumanMessage(content="¿qué puedes hacer?")]}, {"configurable": {"thread_id": "viejo"}})
+    time.sleep(0.1)
+    app.invoke({"messages": [HumanMessage(content="¿qué puedes hacer?")]}, {"configurable": {"thread_id": "nuevo"}})
+
+    assert [t.config["configurable"]["thread_id"] for t in saver.list(None)] == ["nuevo"]
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import grafo
+import metricas
+from metricas import RegistroMetricas, cronometrar, get_registro
+from modelo_falso import ModeloGuionado
+from resiliencia import ModeloResiliente
+
+
+@pytest.fixture
+def entorno(store_grafo):
+    grafo.set_modelo_agente(ModeloResiliente(ModeloGuionado(messages=iter([
+        AIMessage(content="", tool_calls=[{"name": "leer_base_datos", "args": {}, "id": "call_1"}],
+                  usage_metadata={"input_tokens": 120, "output_tokens": 8, "total_tokens": 128}),
+        AIMessage(content="Ahí tienes la cartera.",
+                  usage_metadata={"input_tokens": 300, "output_tokens": 12, "total_tokens": 312}),
+    ]))))
+    store_grafo.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    get_registro().limpiar()
+    yield
+    metricas.activar(False)
+    get_registro().limpiar()
+
+
+def consultar_cartera():
+    grafo.get_app().invoke({"messages": [HumanMessage(content="¿quiénes tienen tarjeta?")]},
+                           {"configurable": {"thread_id": "metricas_1"}})
+
+
+def test_apagado_no_registra_nada(entorno):
+    metricas.activar(False)
+    assert cronometrar("x") is cronometrar("y", etiqueta=1)
+
+    consultar_cartera()
+
+    assert get_registro().resumen() == {"series": {}, "contadores": {}}
+
+
+def test_turno_instrumentado(entorno):
+    metricas.activar(True)
+    consultar_cartera()
+
+    registro = get_registro()
+    series = registro.resumen()["series"]
+    assert series["nodo_segundos[estado=ok][nodo=agent]"]["cuenta"] == 2
+    assert series["nodo_segundos[estado=ok][nodo=tools]"]["cuenta"] == 1
+    assert series["herramienta_segundos[estado=ok][herramienta=leer_base_datos]"]["cuenta"] == 1
+    assert series["modelo_segundos[estado=ok]"]["cuenta"] == 2
+    assert registro.total("modelo_tokens_total", tipo="entrada") == 420
+    assert registro.total("modelo_tokens_total", tipo="salida") == 20
+    assert registro.total("store_filas_total", operacion="lectura") == 1
+    assert registro.total("bytes_escritos_total", destino="checkpoints") > 0
+
+
+def test_exportacion_prometheus_y_jsonl(tmp_path):
+    registro = RegistroMetricas(ventana=3)
+    for valor in (0.1, 0.2, 0.3, 0.4):
+        registro.observar("nodo_segundos", valor, nodo="agent")
+    registro.contar("modelo_tokens_total", 50, tipo="entrada")
+
+    texto = registro.exportar_prometheus()
+    assert "# TYPE cobra_nodo_segundos summary" in texto
+    # La ventana conserva las últimas 3 observaciones; suma y cuenta son acumuladas
+    assert 'cobra_nodo_segundos{nodo="agent",quantile="0.5"} 0.3' in texto
+    assert 'cobra_nodo_segundos_count{nodo="agent"} 4' in texto
+    assert 'cobra_modelo_tokens_total{tipo="entrada"} 50' in texto
+
+    ruta = tmp_path / "metricas.jsonl"
+    registro.exportar_jsonl(str(ruta))
+    eventos = [json.loads(linea) for linea in ruta.read_text(encoding="utf-8").splitlines()]
+    assert len(eventos) == 5 and eventos[-1]["metrica"] == "modelo_tokens_total"
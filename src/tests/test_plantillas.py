@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+import herramientas
+from generacion_lote import SinkLista, generar_speeches
+from intenciones import detectar_intencion
+from modelo_falso import ModeloContador
+from modelos import set_llm
+from plantillas import MotorPlantillas, set_motor_plantillas
+
+ANA = {"nombre": "Ana Ruiz", "deuda": 250.0, "dias_mora": 10, "producto": "Tarjeta"}
+LUIS = {"nombre": "Luis Gómez", "deuda": 1500.0, "dias_mora": 60, "producto": "Préstamo"}
+
+
+def test_completa_los_datos_del_cliente_por_tono():
+    motor = MotorPlantillas()
+    for cliente, parrafos in [(ANA, 3), ({**ANA, "deuda": 500.0}, 3), (LUIS, 4)]:
+        speech = motor.generar(cliente)
+        assert len(speech.split("\n\n")) == parrafos
+        for dato in (cliente["nombre"], cliente["producto"], f"${cliente['deuda']:,.2f}", f"{cliente['dias_mora']} días"):
+            assert dato in speech
+        assert "{" not in speech
+    assert "1 día de" in motor.generar({**ANA, "dias_mora": 1})
+
+
+def test_regenerar_no_repite_y_sin_regenerar_es_estable():
+    motor = MotorPlantillas()
+    primera = motor.generar(LUIS)
+    assert motor.generar(LUIS) == primera
+
+    versiones = [primera] + [motor.generar(LUIS, regenerar=True) for _ in range(3)]
+    for anterior, siguiente in zip(versiones, versiones[1:]):
+        # Versiones seguidas no comparten ningún párrafo
+        assert not set(anterior.split("\n\n")) & set(siguiente.split("\n\n"))
+    assert len(set(versiones)) == 4
+
+    # Clientes distintos no reciben todos el mismo texto
+    otros = {motor.generar({**ANA, "nombre": f"Cliente {i}"}).split("\n\n")[0].split(",")[1] for i in range(20)}
+    assert len(otros) > 1
+
+
+def test_sin_variante_que_aplique_retorna_none():
+    assert MotorPlantillas().generar({**LUIS, "dias_mora": 0}) is None
+    assert MotorPlantillas({"empatico": {"urgencia": []}}).generar(ANA) is None
+
+
+@pytest.fixture
+def modelo(store_sqlite):
+    modelo = ModeloContador(responses=["Speech del modelo."])
+    set_llm(modelo)
+    set_motor_plantillas(MotorPlantillas())
+    store_sqlite.registrar(**ANA)
+    store_sqlite.registrar(**{**LUIS, "dias_mora": 0})
+    yield modelo
+    set_llm(None)
+    set_motor_plantillas(None)
+
+
+def test_herramienta_usa_plantillas_y_el_modelo_solo_si_hace_falta(modelo):
+    speech = herramientas.generar_speech.invoke({"nombre": "Ana Ruiz"})
+    assert speech.startswith("SPEECH | nombre=Ana Ruiz\n") and "$250.00" in speech
+    otra = herramientas.generar_speech.invoke({"nombre": "ana ruiz", "regenerar": True})
+    assert otra != speech and modelo.llamadas == 0
+
+    assert herramientas.generar_speech.invoke({"nombre": "Ana Ruiz", "creativo": True}) == (
+        "SPEECH | nombre=Ana Ruiz\nSpeech del modelo."
+    )
+    # Deuda alta sin días de mora: ninguna plantilla aplica
+    assert herramientas.generar_speech.invoke({"nombre": "Luis Gómez"}).endswith("Speech del modelo.")
+    assert modelo.llamadas == 2
+
+
+def test_herramienta_async_no_bloquea_en_el_modelo(modelo, monkeypatch):
+    monkeypatch.setattr(ModeloContador, "invoke", lambda *a, **k: pytest.fail("llamada síncrona al modelo"))
+
+    for _ in range(2):
+        speech = asyncio.run(herramientas.generar_speech.ainvoke({"nombre": "Luis Gómez"}))
+        assert speech == "SPEECH | nombre=Luis Gómez\nSpeech del modelo."
+    assert modelo.llamadas == 1  # la segunda sale del caché
+
+
+def test_lote_con_plantillas_llama_al_modelo_solo_sin_variante(modelo):
+    clientes = [{**ANA, "id": 1}, {**LUIS, "id": 2}, {**LUIS, "id": 3, "nombre": "Eva Sol", "dias_mora": 0}]
+    sink = SinkLista()
+
+    resumen = asyncio.run(generar_speeches(modelo, clientes, sink, motor=MotorPlantillas()))
+
+    assert (resumen["procesados"], resumen["desde_plantilla"], resumen["fallidos"]) == (3, 2, 0)
+    assert modelo.llamadas == 1
+    assert {r["id"]: r["plantilla"] for r in sink.resultados} == {1: True, 2: True, 3: False}
+
+
+def test_intencion_de_speech_creativo():
+    assert detectar_intencion("genera un speech creativo para Ana Ruiz").args == {"nombre": "Ana Ruiz", "creativo": True}
+    assert detectar_intencion("dame un speech de cobranza premium para Ana").args["creativo"] is True
+    assert detectar_intencion("genera un speech para Ana Ruiz").args == {"nombre": "Ana Ruiz"}
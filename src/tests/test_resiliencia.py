@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+from resiliencia import CircuitBreaker, CircuitoAbierto, ModeloResiliente, clave_llamada
+
+
+class ErrorServicio(Exception):
+    status_code = 503
+
+
+class ErrorPedido(Exception):
+    status_code = 400
+
+
+class ModeloInestable(FakeListChatModel):
+    """Modelo falso con latencia, contador de llamadas y fallos inyectados."""
+    llamadas: int = 0
+    fallos_pendientes: int = 0
+    error: type = ErrorServicio
+    latencia: float = 0.0
+
+    def invoke(self, *args, **kwargs):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+        if self.fallos_pendientes > 0:
+            self.fallos_pendientes -= 1
+            raise self.error("fallo inyectado")
+        return super().invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        self.llamadas += 1
+        await asyncio.sleep(self.latencia)
+        if self.fallos_pendientes > 0:
+            self.fallos_pendientes -= 1
+            raise self.error("fallo inyectado")
+        return await super().ainvoke(*args, **kwargs)
+
+
+class StreamCortado(FakeListChatModel):
+    """Modelo falso cuyo stream se corta con un error del proveedor tras el primer token."""
+
+    async def astream(self, *args, **kwargs):
+        async for chunk in super().astream(*args, **kwargs):
+            yield chunk
+            raise ErrorServicio("stream cortado")
+
+
+def test_clave_ignora_ids():
+    assert clave_llamada([HumanMessage(content="hola", id="a")]) == clave_llamada([HumanMessage(content="hola", id="b")])
+    assert clave_llamada([HumanMessage(content="hola")]) != clave_llamada([HumanMessage(content="chau")])
+
+
+def test_reintenta_fallos_transitorios():
+    modelo = ModeloInestable(responses=["ok"], fallos_pendientes=2)
+    resiliente = ModeloResiliente(modelo, base=0.001)
+
+    assert resiliente.invoke([HumanMessage(content="hola")]).content == "ok"
+    assert modelo.llamadas == 3
+
+
+def test_no_reintenta_pedidos_invalidos():
+    modelo = ModeloInestable(responses=["ok"], fallos_pendientes=1, error=ErrorPedido)
+    resiliente = ModeloResiliente(modelo, base=0.001)
+
+    with pytest.raises(ErrorPedido):
+        resiliente.invoke([HumanMessage(content="hola")])
+    assert modelo.llamadas == 1
+    assert resiliente.breaker.estado == "cerrado"
+
+
+def test_pedidos_identicos_en_vuelo_comparten_llamada():
+    modelo = ModeloInestable(responses=["ok"], latencia=0.05)
+    resiliente = ModeloResiliente(modelo)
+
+    async def varios():
+        return await asyncio.gather(*[resiliente.ainvoke([HumanMessage(content="igual")]) for _ in range(5)]
+                                    + [resiliente.ainvoke([HumanMessage(content="distinto")])])
+
+    respuestas = asyncio.run(varios())
+    assert [r.content for r in respuestas] == ["ok"] * 6
+    assert modelo.llamadas == 2
+
+
+def test_pedidos_identicos_en_hilos_comparten_llamada():
+    modelo = ModeloInestable(responses=["ok"], latencia=0.05)
+    resiliente = ModeloResiliente(modelo)
+    respuestas = []
+
+    hilos = [threading.Thread(target=lambda: respuestas.append(resiliente.invoke([HumanMessage(content="igual")])))
+             for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(respuestas) == 4 and modelo.llamadas == 1
+
+
+def test_circuit_breaker_falla_rapido_y_se_recupera():
+    modelo = ModeloInestable(responses=["ok"], fallos_pendientes=3)
+    breaker = CircuitBreaker(umbral=3, espera_s=0.05)
+    resiliente = ModeloResiliente(modelo, intentos=5, base=0.001, breaker=breaker)
+
+    # El circuito se abre a mitad de los reintentos y corta la espera
+    with pytest.raises(CircuitoAbierto):
+        resiliente.invoke([HumanMessage(content="hola")])
+    assert modelo.llamadas == 3 and breaker.estado == "abierto"
+
+    # Otro modelo con el mismo breaker (p. ej. el de herramientas) tampoco llama
+    otro = ModeloInestable(responses=["ok"])
+    with pytest.raises(CircuitoAbierto):
+        ModeloResiliente(otro, breaker=breaker).invoke([HumanMessage(content="hola")])
+    assert otro.llamadas == 0
+
+    time.sleep(0.06)
+    assert breaker.estado == "semiabierto"
+    assert resiliente.invoke([HumanMessage(content="hola")]).content == "ok"
+    assert breaker.estado == "cerrado"
+
+
+def test_stream_pasa_los_tokens_y_respeta_el_breaker():
+    breaker = CircuitBreaker(umbral=1, espera_s=60)
+    resiliente = ModeloResiliente(FakeListChatModel(responses=["hola mundo"]), breaker=breaker)
+
+    async def tokens(modelo):
+        return [chunk.text async for chunk in modelo.astream([HumanMessage(content="hola")])]
+
+    partes = asyncio.run(tokens(resiliente))
+    assert len(partes) > 1 and "".join(partes) == "hola mundo"
+    assert "".join(c.text for c in resiliente.stream([HumanMessage(content="hola")])) == "hola mundo"
+
+    # Un fallo del proveedor a mitad del stream abre el circuito para todas las variantes
+    with pytest.raises(ErrorServicio):
+        asyncio.run(tokens(ModeloResiliente(StreamCortado(responses=["hola mundo"]), breaker=breaker)))
+    assert breaker.estado == "abierto"
+    with pytest.raises(CircuitoAbierto):
+        asyncio.run(tokens(resiliente))
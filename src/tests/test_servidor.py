@@ -0,0 +1,131 @@
+import asyncio
+import urllib.error
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import grafo
+from herramientas import LIMITE_PAGINA_MAX
+from modelo_falso import ModeloGuionado
+from servidor import ClienteCobranza, ErrorHTTP, ServidorCobranza
+
+
+async def con_servidor(prueba, **opciones):
+    servidor = ServidorCobranza(puerto=0, **opciones)
+    await servidor.iniciar()
+    try:
+        return await prueba(servidor, ClienteCobranza(f"http://127.0.0.1:{servidor.puerto}"))
+    finally:
+        await servidor.detener()
+
+
+async def recolectar(cliente, sesion, texto):
+    return [e async for e in cliente.transmitir(sesion, texto)]
+
+
+def test_transmite_eventos_por_sesion(store_grafo):
+    store_grafo.registrar("Ana Ruiz", 250.0, 10, "Tarjeta")
+    grafo.set_modelo_agente(ModeloGuionado(messages=iter([
+        AIMessage(content="Estimada Ana, le recordamos su saldo."),
+    ])))
+
+    async def prueba(servidor, cliente):
+        tabla = await recolectar(cliente, "s1", "muéstrame los clientes")
+        speech = await recolectar(cliente, "s2", "¿qué puedes hacer?")
+        filas, total = await asyncio.to_thread(cliente.consultar, {"producto": "tarjeta"}, 10, 0)
+        return tabla, speech, filas, total
+
+    tabla, speech, filas, total = asyncio.run(con_servidor(prueba))
+
+    assert tabla[0][0] == "tabla" and tabla[0][1].artifact["resumen"]["total"] == 1
+    textos = [c for e, c in speech if e == "texto"]
+    assert len(textos) > 1 and textos[-1] == "Estimada Ana, le recordamos su saldo."
+    assert speech[-1] == ("fin", "Estimada Ana, le recordamos su saldo.")
+    assert total == 1 and filas[0][0] == "Ana Ruiz"
+
+
+def test_cola_llena_y_sesion_ocupada(store_grafo, monkeypatch):
+    bloqueo = asyncio.Event()
+
+    async def lento(inputs, config):
+        await bloqueo.wait()
+        yield "fin", "listo"
+
+    monkeypatch.setattr(grafo, "transmitir_respuesta", lento)
+
+    async def prueba(servidor, cliente):
+        # Un worker ocupado y un lugar en la cola: el tercer mensaje se rechaza
+        primero = asyncio.create_task(recolectar(cliente, "a", "hola?"))
+        await asyncio.sleep(0.05)
+        segundo = asyncio.create_task(recolectar(cliente, "b", "hola?"))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(ErrorHTTP) as ocupado:
+            await recolectar(cliente, "a", "otra vez")
+        with pytest.raises(ErrorHTTP) as lleno:
+            await recolectar(cliente, "c", "hola?")
+        # No se borra el historial de una sesión con un mensaje en vuelo
+        with pytest.raises(urllib.error.HTTPError) as borrar:
+            await asyncio.to_thread(cliente.cerrar_sesion, "a")
+        assert borrar.value.code == 409
+
+        bloqueo.set()
+        return ocupado.value.estado, lleno.value.estado, await primero, await segundo
+
+    ocupado, lleno, primero, segundo = asyncio.run(con_servidor(prueba, trabajadores=1, max_cola=1))
+
+    assert (ocupado, lleno) == (409, 503)
+    assert primero == segundo == [("fin", "listo")]
+
+
+def test_salud_y_rutas_invalidas(store_grafo):
+    async def prueba(servidor, cliente):
+        salud = await asyncio.to_thread(cliente._pedir, "GET", "/salud")
+        sesion = await asyncio.to_thread(cliente._pedir, "POST", "/sesiones")
+        try:
+            await asyncio.to_thread(cliente._pedir, "GET", "/nada")
+        except Exception as e:
+            return salud, sesion, e.code
+
+    salud, sesion, codigo = asyncio.run(con_servidor(prueba, trabajadores=2))
+
+    assert salud == {"estado": "ok", "en_cola": 0, "sesiones_activas": 0, "trabajadores": 2}
+    assert len(sesion["sesion"]) == 32
+    assert codigo == 404
+
+
+def test_pedidos_malformados_responden_400(store_grafo):
+    async def pedir_crudo(servidor, cabeceras, cuerpo=b""):
+        reader, writer = await asyncio.open_connection("127.0.0.1", servidor.puerto)
+        writer.write(b"POST /consultas HTTP/1.1\r\n" + cabeceras + b"\r\n" + cuerpo)
+        await writer.drain()
+        respuesta = await reader.read()
+        writer.close()
+        return int(respuesta.split(b" ")[1])
+
+    async def prueba(servidor, cliente):
+        return [
+            await pedir_crudo(servidor, b"Content-Length: abc\r\n"),
+            await pedir_crudo(servidor, b"Content-Length: 2\r\n", b"[]"),
+            await pedir_crudo(servidor, b"Content-Length: 2\r\n", b"{}"),
+            await pedir_crudo(servidor, b"Content-Length: 15\r\n", b'{"limite": "x"}'),
+            await pedir_crudo(servidor, b"Content-Length: 15\r\n", b'{"offset": 1.5}'),
+        ]
+
+    assert asyncio.run(con_servidor(prueba)) == [400, 400, 200, 400, 400]
+
+
+def test_consultas_se_acotan_a_una_pagina(store_grafo):
+    with store_grafo.transaccion():
+        for i in range(150):
+            store_grafo.registrar(f"Cliente {i:03d}", 10.0, 5, "Tarjeta")
+
+    async def prueba(servidor, cliente):
+        return [
+            await asyncio.to_thread(cliente.consultar, {}, 10_000, 0),
+            await asyncio.to_thread(cliente.consultar, {"ordenar_por": "nombre"}, 5, -3),
+        ]
+
+    (todas, total), (primeras, _) = asyncio.run(con_servidor(prueba))
+    assert total == 150 and len(todas) == LIMITE_PAGINA_MAX
+    assert [f[0] for f in primeras] == [f"Cliente {i:03d}" for i in range(5)]
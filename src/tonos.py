@@ -0,0 +1,57 @@
+"""
+Niveles de tono del speech según deuda y días de mora. Son las mismas reglas
+que describe el prompt del agente:
+
+* empatico: deuda < $300 y mora < 15 días
+* firme:    deuda $300-$1000 o mora 15-45 días
+* serio:    deuda > $1000 o mora > 45 días
+"""
+
+TONOS = ("empatico", "firme", "serio")
+
+DEUDA_MEDIA = 300
+DEUDA_ALTA = 1000
+MORA_MEDIA = 15
+MORA_ALTA = 45
+
+
+def clasificar_tono(deuda: float, dias_mora: int) -> str:
+    """Nivel de tono según las reglas de deuda y mora del prompt."""
+    if deuda > DEUDA_ALTA or dias_mora > MORA_ALTA:
+        return "serio"
+    if deuda >= DEUDA_MEDIA or dias_mora >= MORA_MEDIA:
+        return "firme"
+    return "empatico"
+
+
+def condicion_sql_tono(tono: str) -> str:
+    """Cláusula WHERE equivalente a clasificar_tono (columnas deuda y dias_mora)."""
+    serio = f"(deuda > {DEUDA_ALTA} OR dias_mora > {MORA_ALTA})"
+    firme = f"(deuda >= {DEUDA_MEDIA} OR dias_mora >= {MORA_MEDIA})"
+    if tono == "serio":
+        return serio
+    if tono == "firme":
+        return f"(NOT {serio} AND {firme})"
+    if tono == "empatico":
+        return f"(NOT {serio} AND NOT {firme})"
+    raise ValueError(f"Tono desconocido: {tono}")
+
+
+def clasificar_tono_vectorizado(deuda, dias_mora):
+    """clasificar_tono sobre arreglos completos (numpy/pandas), sin bucles."""
+    import numpy as np
+
+    deuda = np.asarray(deuda)
+    dias_mora = np.asarray(dias_mora)
+    serio = (deuda > DEUDA_ALTA) | (dias_mora > MORA_ALTA)
+    firme = (deuda >= DEUDA_MEDIA) | (dias_mora >= MORA_MEDIA)
+    return np.select([serio, firme], ["serio", "firme"], default="empatico")
+
+
+def expresion_sql_tono(deuda: str = "deuda", dias_mora: str = "dias_mora") -> str:
+    """Expresión SQL que vale el nombre del tono (equivalente a clasificar_tono)."""
+    return (
+        f"CASE WHEN {deuda} > {DEUDA_ALTA} OR {dias_mora} > {MORA_ALTA} THEN 'serio'"
+        f" WHEN {deuda} >= {DEUDA_MEDIA} OR {dias_mora} >= {MORA_MEDIA} THEN 'firme'"
+        f" ELSE 'empatico' END"
+    )
@@ -0,0 +1,613 @@
+"""
+Interfaz Flet del agente de cobranzas.
+
+Solo importa flet y módulos livianos: la ventana se pinta primero y el grafo
+(LangGraph, pandas, Gemini) se carga en segundo plano con precargar_backend,
+o ni siquiera se carga si la UI trabaja contra el servidor (COBRA_SERVIDOR_URL).
+"""
+import asyncio
+import os
+import time
+import urllib.error
+import uuid
+from collections import deque
+
+import flet as ft
+
+import metricas
+from metricas import cronometrar, observar
+from resiliencia import CircuitoAbierto
+from servidor import ClienteCobranza
+
+# Refrescos de pantalla por segundo mientras llegan tokens
+FPS_STREAMING = 15
+
+def limpiar_tablas(texto: str) -> str:
+    """Quita las líneas de tabla markdown del texto del bot (la tabla la muestra la UI)."""
+    if "|" not in texto or "---" not in texto:
+        return texto
+    lineas = [linea for linea in texto.split("\n") if "|" not in linea and "---" not in linea]
+    return "\n".join(lineas).strip()
+
+def precargar_backend():
+    """
+    Importa el grafo y construye el modelo antes del primer mensaje, y pone
+    al día la mora de la cartera (a lo sumo una vez por día).
+    """
+    from envejecimiento import envejecer_si_pendiente
+    from grafo import get_app, get_modelo_agente
+
+    get_app()
+    get_modelo_agente("ligero")
+    get_modelo_agente()
+    envejecer_si_pendiente()
+
+# ==========================================
+# 🎨 UI CON FLET
+# ==========================================
+
+def paginar_local(consulta: dict, limite: int, offset: int) -> tuple:
+    """Página de una consulta al ClienteStore: (filas, total)."""
+    from cliente_store import get_store
+
+    pagina, resumen = get_store().consultar(**consulta, limite=limite, offset=offset)
+    return pagina.to_dict("split")["data"], resumen["total"]
+
+class TablaPaginada:
+    """
+    Tabla de resultados que solo construye controles para la página visible.
+    Las demás páginas se piden con la misma consulta a `paginar` (el
+    ClienteStore local o el servidor).
+    """
+
+    def __init__(self, artifact: dict, paginar=paginar_local):
+        self.paginar = paginar
+        self.consulta = artifact["consulta"]
+        self.total = artifact["resumen"]["total"]
+        self.limite = artifact["limite"]
+        self.offset = artifact["offset"]
+        columnas = artifact["columnas"]
+
+        self.tabla = ft.DataTable(
+            columns=[ft.DataColumn(ft.Text(c, weight="bold", color="#F1F5F9")) for c in columnas],
+            rows=[],
+            border=ft.border.all(1, "#475569"),
+            border_radius=8,
+            heading_row_color="#0F172A",
+            data_row_color={"hovered": "#1E293B"},
+        )
+        self.etiqueta = ft.Text(size=12, color="#94A3B8")
+        self.anterior = ft.IconButton(icon=ft.Icons.CHEVRON_LEFT, icon_color="#94A3B8",
+                                      on_click=lambda e: self.ir_a(self.offset - self.limite))
+        self.siguiente = ft.IconButton(icon=ft.Icons.CHEVRON_RIGHT, icon_color="#94A3B8",
+                                       on_click=lambda e: self.ir_a(self.offset + self.limite))
+        self.control = ft.Column(
+            spacing=5,
+            controls=[
+                ft.Row(scroll=ft.ScrollMode.AUTO, controls=[self.tabla]),
+                ft.Row(
+                    alignment=ft.MainAxisAlignment.END,
+                    controls=[self.anterior, self.etiqueta, self.siguiente],
+                ),
+            ],
+        )
+        self._mostrar(artifact["filas"])
+
+    def _mostrar(self, filas):
+        self.tabla.rows = [
+            ft.DataRow(cells=[ft.DataCell(ft.Text(str(c), color="#E2E8F0")) for c in fila])
+            for fila in filas
+        ]
+        hasta = self.offset + len(filas)
+        self.etiqueta.value = f"{self.offset + 1}-{hasta} de {self.total}" if filas else f"0 de {self.total}"
+        self.anterior.disabled = self.offset <= 0
+        self.siguiente.disabled = hasta >= self.total
+
+    def ir_a(self, offset):
+        """Carga la página que empieza en `offset` y refresca solo esta tabla."""
+        offset = max(0, min(offset, max(self.total - 1, 0)))
+        filas, self.total = self.paginar(self.consulta, self.limite, offset)
+        self.offset = offset
+        self._mostrar(filas)
+        self.control.update()
+
+
+# URL del servidor (servidor.py); vacío = el grafo corre dentro de la UI
+SERVIDOR_URL = os.environ.get("COBRA_SERVIDOR_URL", "")
+
+# Burbujas visibles como máximo; las anteriores se archivan y se cargan a pedido
+MAX_BURBUJAS = int(os.environ.get("COBRA_MAX_BURBUJAS", "50"))
+BURBUJAS_POR_CARGA = 20
+MAX_ARCHIVO = 2000
+
+
+class HistorialChat:
+    """
+    Ventana acotada sobre el ListView del chat. Cuando hay más de `maximo`
+    burbujas, las más antiguas salen de pantalla y se guardan solo sus datos
+    (texto, autor); el botón "Cargar anteriores" las reconstruye a pedido.
+    Los refrescos se envían al ListView, no a toda la página.
+    """
+
+    def __init__(self, lista: ft.ListView, construir, maximo: int = MAX_BURBUJAS):
+        self.lista = lista
+        self.construir = construir
+        self.maximo = maximo
+        self.archivo = deque(maxlen=MAX_ARCHIVO)
+        self._datos = {}
+        self._burbujas = []
+        self.boton_anteriores = ft.TextButton(
+            "⬆ Cargar mensajes anteriores",
+            on_click=lambda e: self.cargar_anteriores(),
+        )
+
+    def agregar(self, control, datos):
+        self._burbujas.append(control)
+        self._datos[id(control)] = datos
+        self.lista.controls.append(control)
+        while len(self._burbujas) > self.maximo:
+            antigua = self._burbujas.pop(0)
+            self.lista.controls.remove(antigua)
+            self.archivo.append(self._datos.pop(id(antigua)))
+        self._sincronizar_boton()
+        self.refrescar()
+
+    def fijar_datos(self, control, datos):
+        """Actualiza lo que se archivará de una burbuja que cambió (p. ej. streaming)."""
+        if id(control) in self._datos:
+            self._datos[id(control)] = datos
+
+    def quitar(self, control):
+        if control in self._burbujas:
+            self._burbujas.remove(control)
+            self._datos.pop(id(control), None)
+        if control in self.lista.controls:
+            self.lista.controls.remove(control)
+
+    def cargar_anteriores(self, cantidad: int = BURBUJAS_POR_CARGA):
+        recuperadas = []
+        while self.archivo and len(recuperadas) < cantidad:
+            recuperadas.insert(0, self.archivo.pop())
+
+        inicio = 1 if self.boton_anteriores in self.lista.controls else 0
+        controles = []
+        for datos in recuperadas:
+            control = self.construir(*datos)
+            if control is not None:
+                self._datos[id(control)] = datos
+                controles.append(control)
+        self._burbujas[:0] = controles
+        self.lista.controls[inicio:inicio] = controles
+        self._sincronizar_boton()
+        self.refrescar()
+
+    def limpiar(self):
+        self.lista.controls.clear()
+        self.archivo.clear()
+        self._datos.clear()
+        self._burbujas.clear()
+
+    def refrescar(self):
+        if self.lista.page:
+            self.lista.update()
+
+    def _sincronizar_boton(self):
+        visible = self.boton_anteriores in self.lista.controls
+        if self.archivo and not visible:
+            self.lista.controls.insert(0, self.boton_anteriores)
+        elif not self.archivo and visible:
+            self.lista.controls.remove(self.boton_anteriores)
+
+
+def render_table(md):
+    """Renderiza una tabla markdown como DataTable de Flet."""
+    try:
+        lines = [line for line in md.split("\n") if line.strip()]
+        
+        if len(lines) < 2:
+            return ft.Markdown(md, selectable=True)
+        
+        headers = [h.strip() for h in lines[0].split("|")[1:-1]]
+        
+        data_rows = []
+        for line in lines[2:]:
+            if "|" in line:
+                cells = [c.strip() for c in line.split("|")[1:-1]]
+                if len(cells) == len(headers):
+                    data_rows.append(cells)
+        
+        if not data_rows:
+            return ft.Markdown(md, selectable=True)
+        
+        return ft.DataTable(
+            columns=[ft.DataColumn(ft.Text(h, weight="bold", color="#F1F5F9")) for h in headers],
+            rows=[
+                ft.DataRow(cells=[ft.DataCell(ft.Text(c, color="#E2E8F0")) for c in row])
+                for row in data_rows
+            ],
+            border=ft.border.all(1, "#475569"),
+            border_radius=8,
+            heading_row_color="#0F172A",
+            data_row_color={"hovered": "#1E293B"},
+        )
+    except Exception as e:
+        print(f"⚠️ Error rendering table: {e}")
+        return ft.Markdown(md, selectable=True, extension_set=ft.MarkdownExtensionSet.GITHUB_WEB)
+
+def crear_burbuja(texto, autor="bot", ancho=None):
+    """Construye la burbuja de un mensaje. Solo renderiza tabla si tiene el marcador TABLA_DATOS"""
+    
+    # Contenido ya construido (p. ej. una TablaPaginada)
+    if isinstance(texto, ft.Control):
+        bubble_content = texto
+    # Si el texto contiene TABLA_DATOS, extraer solo la tabla
+    elif isinstance(texto, str) and "TABLA_DATOS" in texto:
+        partes = texto.split("TABLA_DATOS")
+        if len(partes) > 1:
+            tabla_md = partes[1].strip()
+            bubble_content = render_table(tabla_md)
+        else:
+            return None  # No mostrar nada si no hay tabla después del marcador
+    else:
+        # Texto normal sin tabla
+        bubble_content = ft.Markdown(
+            texto,
+            selectable=True,
+            extension_set=ft.MarkdownExtensionSet.GITHUB_WEB
+        )
+    
+    fila = ft.Row(
+        alignment=ft.MainAxisAlignment.END if autor == "user" else ft.MainAxisAlignment.START,
+        controls=[
+            ft.Container(
+                width=ancho,
+                content=bubble_content,
+                bgcolor="#1E293B" if autor == "bot" else "#3B82F6",
+                padding=15,
+                border_radius=15,
+                shadow=ft.BoxShadow(
+                    spread_radius=1,
+                    blur_radius=10,
+                    color=ft.Colors.with_opacity(0.2, "#000000"),
+                    offset=ft.Offset(0, 2),
+                )
+            )
+        ]
+    )
+    return fila
+
+
+def main(page: ft.Page):
+    page.title = "COBRA-BOT AI - Speech Generator"
+    page.window_width = 500
+    page.window_height = 800
+    page.window_always_on_top = True
+    page.theme_mode = ft.ThemeMode.DARK
+    page.padding = 0
+    page.bgcolor = "#0A0E27"
+
+    chat = ft.ListView(
+        expand=True,
+        spacing=10,
+        auto_scroll=True,
+        scroll=ft.ScrollMode.ADAPTIVE,
+        padding=10
+    )
+
+    input_box = ft.TextField(
+        hint_text="Escribe tu solicitud o pide generar un speech...",
+        expand=True,
+        on_submit=lambda e: enviar(),
+        border_color="#475569",
+        focused_border_color="#3B82F6",
+        bgcolor="#0F172A",
+        text_style=ft.TextStyle(color="#F1F5F9"),
+        hint_style=ft.TextStyle(color="#64748B"),
+        content_padding=15,
+        multiline=False,
+        max_lines=1
+    )
+
+    # Con COBRA_SERVIDOR_URL la UI es un cliente más del servidor (servidor.py)
+    remoto = ClienteCobranza(SERVIDOR_URL) if SERVIDOR_URL else None
+
+    # El checkpointer es durable: cada sesión de la UI usa hilos propios
+    thread_counter = {"count": 0, "sesion": uuid.uuid4().hex[:8]}
+
+    def hilo_actual():
+        return f"ui_flet_{thread_counter['sesion']}_{thread_counter['count']}"
+
+    async def limpiar_chat():
+        """Limpia el historial del chat y reinicia la conversación"""
+        # La conversación anterior no se retoma: se libera su checkpoint (fuera del hilo de la UI)
+        try:
+            if remoto:
+                await asyncio.to_thread(remoto.cerrar_sesion, hilo_actual())
+            else:
+                from grafo import get_checkpointer
+                await asyncio.to_thread(get_checkpointer().delete_thread, hilo_actual())
+        except urllib.error.HTTPError as e:
+            if e.code == 409:
+                mensaje("⏳ Espera a que termine la respuesta en curso para reiniciar el chat.", "bot")
+            else:
+                mensaje(f"⚠️ No se pudo reiniciar el chat: el servidor respondió {e.code}.", "bot")
+            return
+        except urllib.error.URLError as e:
+            mensaje(f"⚠️ No se pudo reiniciar el chat: servidor no disponible ({e.reason}).", "bot")
+            return
+        historial.limpiar()
+        thread_counter["count"] += 1
+        chat.update()
+        mensaje("✨ Chat reiniciado. ¿En qué puedo ayudarte ahora?", "bot")
+
+    def construir_burbuja(texto, autor="bot"):
+        return crear_burbuja(texto, autor, page.width * 0.85 if page.width else None)
+
+    historial = HistorialChat(chat, construir_burbuja)
+
+    def mensaje(texto, autor="bot"):
+        """Muestra un mensaje en el chat (ventana acotada por HistorialChat)."""
+        with cronometrar("ui_segundos", etapa="mensaje"):
+            fila = construir_burbuja(texto, autor)
+            if fila is not None:
+                historial.agregar(fila, (texto, autor))
+        return fila
+
+    # Overlay de depuración: latencias y tokens del registro de métricas
+    overlay_metricas = ft.Text(size=11, color="#94A3B8", font_family="monospace")
+    panel_metricas = ft.Container(
+        visible=metricas.METRICAS_ACTIVAS,
+        bgcolor="#0F172A",
+        padding=ft.padding.only(left=15, right=15, top=4, bottom=4),
+        content=overlay_metricas,
+    )
+
+    def refrescar_metricas():
+        if panel_metricas.visible:
+            overlay_metricas.value = metricas.resumen_corto()
+            panel_metricas.update()
+
+    def alternar_metricas():
+        metricas.activar(not metricas.METRICAS_ACTIVAS)
+        panel_metricas.visible = metricas.METRICAS_ACTIVAS
+        overlay_metricas.value = metricas.resumen_corto()
+        panel_metricas.update()
+        
+    def mostrar_tabla(tool_message):
+        """Tabla paginada sobre el resultado completo de la consulta (filas del artifact)."""
+        if not tool_message.artifact:
+            return mensaje(tool_message.content, "bot")
+        paginar = remoto.consultar if remoto else paginar_local
+        return mensaje(TablaPaginada(tool_message.artifact, paginar).control, "bot")
+
+    async def procesar(texto):
+        loading = None
+        burbuja = None
+        tabla = None
+        ultimo_refresco = 0.0
+        inicio = time.perf_counter()
+
+        def quitar_loading():
+            if loading and loading in chat.controls:
+                chat.controls.remove(loading)
+
+        try:
+            loading = ft.Text("⏳ Generando respuesta...", italic=True, color="#94A3B8")
+            chat.controls.append(loading)
+            chat.update()
+
+            # CONTROL TOTAL: Solo mostrar tabla si el usuario EXPLÍCITAMENTE pidió consultar
+            palabras_clave_consulta = [
+                "consultar", "mostrar", "ver", "listar", "muestra", "dame",
+                "cuál", "cuáles", "qué clientes", "mis registros", "base de datos",
+                "tabla", "clientes"
+            ]
+            
+            solicita_tabla = any(palabra in texto.lower() for palabra in palabras_clave_consulta)
+
+            if remoto:
+                eventos = remoto.transmitir(hilo_actual(), texto)
+            else:
+                # Ya cargado por precargar_backend salvo que el primer mensaje le gane
+                from langchain_core.messages import HumanMessage
+                from grafo import transmitir_respuesta
+
+                inputs = {"messages": [HumanMessage(content=texto)]}
+                config = {"configurable": {"thread_id": hilo_actual()}}
+                eventos = transmitir_respuesta(inputs, config)
+
+            async for evento, contenido in eventos:
+                if evento == "tabla":
+                    # Solo procesar tablas si el usuario las solicitó, y mostrar solo la más reciente
+                    if solicita_tabla:
+                        quitar_loading()
+                        if tabla is not None:
+                            historial.quitar(tabla)
+                        tabla = mostrar_tabla(contenido)
+
+                elif evento == "texto":
+                    # Limpiar cualquier tabla que pudiera venir en el texto del bot
+                    visible = limpiar_tablas(contenido)
+                    if not visible.strip():
+                        continue
+                    if burbuja is None:
+                        quitar_loading()
+                        burbuja = mensaje(visible, "bot")
+                        ultimo_refresco = time.monotonic()
+                        continue
+                    texto_md = burbuja.controls[0].content
+                    texto_md.value = visible
+                    # Limitar los refrescos a FPS_STREAMING por segundo, solo del texto que cambia
+                    ahora = time.monotonic()
+                    if ahora - ultimo_refresco >= 1 / FPS_STREAMING:
+                        texto_md.update()
+                        ultimo_refresco = ahora
+
+                else:
+                    # Respuesta final del bot (sin tablas, ya que no debe incluirlas)
+                    texto_final = limpiar_tablas(contenido) if contenido else ""
+                    if texto_final.strip():
+                        if burbuja is None:
+                            quitar_loading()
+                            burbuja = mensaje(texto_final, "bot")
+                        else:
+                            burbuja.controls[0].content.value = texto_final
+                            historial.fijar_datos(burbuja, (texto_final, "bot"))
+                    elif burbuja is not None:
+                        historial.quitar(burbuja)
+
+            quitar_loading()
+            chat.update()
+            input_box.disabled = False
+            input_box.update()
+
+        except CircuitoAbierto as e:
+            quitar_loading()
+            chat.update()
+            mensaje(f"⏳ El modelo no está disponible en este momento. Intenta de nuevo en {e.reintentar_en:.0f} s.", "bot")
+            input_box.disabled = False
+            input_box.update()
+
+        except Exception as e:
+            quitar_loading()
+            chat.update()
+            mensaje(f" Error: {e}", "bot")
+            input_box.disabled = False
+            input_box.update()
+
+        finally:
+            observar("ui_segundos", time.perf_counter() - inicio, etapa="procesar")
+            refrescar_metricas()
+
+    def enviar():
+        texto = input_box.value.strip()
+        if not texto:
+            return
+
+        input_box.value = ""
+        input_box.disabled = True
+        input_box.update()
+        mensaje(texto, "user")
+
+        page.run_task(procesar, texto)
+
+    page.add(
+        ft.Container(
+            expand=True,
+            bgcolor="#0A0E27",
+            content=ft.Column(
+                expand=True,
+                spacing=0,
+                controls=[
+                    # Header
+                    ft.Container(
+                        bgcolor="#1E293B",
+                        padding=15,
+                        content=ft.Row(
+                            alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                            controls=[
+                                ft.Row(
+                                    spacing=10,
+                                    controls=[
+                                        ft.Icon(ft.Icons.CHAT_BUBBLE, color="#3B82F6", size=24),
+                                        ft.Text(
+                                            "COBRA-BOT AI",
+                                            size=20,
+                                            weight="bold",
+                                            color="#F1F5F9"
+                                        ),
+                                    ]
+                                ),
+                                ft.Row(
+                                    spacing=0,
+                                    controls=[
+                                        ft.IconButton(
+                                            icon=ft.Icons.SPEED,
+                                            tooltip="Métricas de rendimiento",
+                                            icon_color="#94A3B8",
+                                            on_click=lambda e: alternar_metricas()
+                                        ),
+                                        ft.IconButton(
+                                            icon=ft.Icons.DELETE_SWEEP,
+                                            tooltip="Limpiar chat",
+                                            icon_color="#94A3B8",
+                                            on_click=lambda e: page.run_task(limpiar_chat)
+                                        ),
+                                    ]
+                                )
+                            ]
+                        )
+                    ),
+                    # Subtitle
+                    ft.Container(
+                        bgcolor="#0F172A",
+                        padding=ft.padding.only(left=15, right=15, top=8, bottom=8),
+                        content=ft.Text(
+                            "🎯 Generador de Speech Hiperpersonalizados",
+                            size=12,
+                            color="#94A3B8",
+                            italic=True
+                        )
+                    ),
+                    panel_metricas,
+                    # Chat área
+                    ft.Container(
+                        expand=True,
+                        bgcolor="#0A0E27",
+                        content=chat
+                    ),
+                    # Input área
+                    ft.Container(
+                        bgcolor="#1E293B",
+                        padding=12,
+                        content=ft.Row(
+                            spacing=10,
+                            controls=[
+                                input_box,
+                                ft.Container(
+                                    content=ft.TextButton(
+                                        content=ft.Row(
+                                            spacing=5,
+                                            controls=[
+                                                ft.Icon(ft.Icons.SEND, size=18),
+                                                ft.Text("Enviar", size=14)
+                                            ]
+                                        ),
+                                        style=ft.ButtonStyle(
+                                            bgcolor="#3B82F6",
+                                            color="white",
+                                            padding=15,
+                                        ),
+                                        on_click=lambda e: enviar()
+                                    )
+                                )
+                            ]
+                        )
+                    )
+                ]
+            )
+        )
+    )
+
+    # --- MODIFICACIÓN: SALUDO INICIAL ---
+    # Mostramos el mensaje de bienvenida al cargar la UI
+    mensaje(
+        """👋 **¡Hola! Soy COBRA-BOT AI**
+
+Soy tu asistente inteligente especializado en gestión de cobranzas.
+
+Mis principales características son:
+
+🔹 **Generación de Speeches:** Creo guiones de cobro persuasivos y personalizados (Empático, Firme o Serio).
+
+🔹 **Gestión de Cartera:** Puedo registrar, actualizar y eliminar clientes de tu base de datos.
+
+🔹 **Consultas Rápidas:** Pídeme ver la lista de deudores cuando lo necesites.
+
+**¿En qué puedo ayudarte hoy?**""",
+        "bot"
+    )
+
+    # La ventana ya está pintada: el grafo y el modelo se cargan en segundo plano
+    if not remoto:
+        page.run_thread(precargar_backend)